@@ -0,0 +1,418 @@
+import math
+import os
+import re
+import threading
+from collections import namedtuple
+
+from flask import Request, g, jsonify, request
+
+# Policy for scalar size parameters above their limit: 'clamp' or 'reject'
+ADMISSION_POLICY = os.environ.get('ADMISSION_POLICY', 'clamp')
+# Hard budget per request, beyond which it is rejected outright (413)
+MAX_CPU_SECONDS = float(os.environ.get('ADMISSION_MAX_CPU_SECONDS', 10))
+MAX_RESPONSE_BYTES = int(os.environ.get('ADMISSION_MAX_RESPONSE_BYTES', 16 * 1024 * 1024))
+# Out-of-core blocked operations run for minutes by design: they get their
+# own CPU budget (in line with ENGINE_BLOCKED_TASK_TIMEOUT) but still take an
+# expensive slot
+MAX_BLOCKED_SECONDS = float(os.environ.get('ADMISSION_MAX_BLOCKED_SECONDS', 3600))
+CPU_BUDGETS = {'api_array_operation': MAX_BLOCKED_SECONDS}
+# Requests estimated above this go through the bounded queue of expensive slots
+QUEUE_THRESHOLD_SECONDS = float(os.environ.get('ADMISSION_QUEUE_THRESHOLD_SECONDS', 0.5))
+EXPENSIVE_SLOTS = int(os.environ.get('ADMISSION_EXPENSIVE_SLOTS', 2))
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2))
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+# Endpoints that stream their body to disk and enforce their own size limit
+UNBOUNDED_BODY_ENDPOINTS = {'api_upload_array'}
+
+Cost = namedtuple('Cost', ['cpu_seconds', 'response_bytes'])
+
+# Rough per-float size of a JSON encoded number
+FLOAT_BYTES = 20
+
+
+def _int_param(data, name, default):
+    value = data.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise AdmissionError(f"'{name}' must be a number", 400)
+    return int(value)
+
+
+def _rows(value):
+    return len(value) if isinstance(value, list) else 0
+
+
+def _cols(value):
+    if isinstance(value, list) and value and isinstance(value[0], list):
+        return len(value[0])
+    return 1
+
+
+# --- Cost estimators ---
+# Each takes the request JSON and predicts CPU time and response size. The
+# coefficients are deliberately conservative round numbers measured on a
+# single core; they only need to be right within a small factor.
+
+def estimate_gradient_descent(data):
+    steps = _int_param(data, 'steps', 50)
+    return Cost(2e-6 * steps + 1e-3, 90 * steps + 8 * 1024)
+
+
+def estimate_train_iterative(data):
+    n_iterations = _int_param(data, 'n_iterations', 50)
+    X = data.get('X')
+    n, d = _rows(X), _cols(X)
+    return Cost(
+        n_iterations * (5e-6 + 4e-9 * n * (d + 1)),
+        n_iterations * (d + 2) * FLOAT_BYTES + n * FLOAT_BYTES
+    )
+
+
+def estimate_pca(data):
+    if 'data' in data:
+        n, d = _rows(data['data']), _cols(data['data'])
+    else:
+        n, d = _int_param(data, 'n_points', 100), 3
+    return Cost(5e-3 + 2e-7 * n * d, 3 * n * d * FLOAT_BYTES)
+
+
+def estimate_generate_classification(data):
+    n_samples = _int_param(data, 'n_samples', 100)
+    return Cost(1e-3 + 1e-6 * n_samples, 2 * n_samples * 3 * FLOAT_BYTES)
+
+
+def estimate_generate_dataset(data):
+    n_samples = _int_param(data, 'n_samples', 100)
+    return Cost(1e-3 + 5e-7 * n_samples, n_samples * 2 * FLOAT_BYTES)
+
+
+def estimate_train_classifier(data):
+    n = _rows(data.get('X'))
+    if data.get('classifier_type', 'logistic') == 'svm':
+        # SVC is roughly quadratic, probability=True adds 5-fold internal CV
+        cpu = 6 * 2e-7 * n * n + 1e-5 * n
+    else:
+        cpu = 1e-2 + 2e-5 * n
+    # Four 100x100 decision boundary grids plus the echoed samples
+    return Cost(cpu, 4 * 100 * 100 * FLOAT_BYTES + 4 * n * FLOAT_BYTES)
+
+
+def estimate_train_model(data):
+    n = _rows(data.get('X'))
+    return Cost(2e-3 + 1e-6 * n, 4 * n * FLOAT_BYTES)
+
+
+def estimate_solve_system(data):
+    n = _rows(data.get('A'))
+    # O(n^2) row operations of O(n) each; the step log holds one small
+    # descriptor per operation plus the initial and final matrices
+    return Cost(1e-4 + 2e-6 * n ** 2 + 1e-9 * n ** 3, 60 * n ** 2 + 2 * n * n * FLOAT_BYTES)
+
+
+def estimate_solve_system_steps(data):
+    n = _rows(data.get('A'))
+    limit = _int_param(data, 'limit', 20)
+    # The elimination is rerun and replayed up to the page; only the page's
+    # matrices are sent
+    return Cost(1e-4 + 4e-6 * n ** 2 + 2e-9 * n ** 3, limit * n * n * FLOAT_BYTES)
+
+
+def estimate_calculate_vectors(data):
+    n = max(_rows(data.get('v1')), _rows(data.get('v2')))
+    return Cost(1e-4 + 1e-7 * n, 4 * n * FLOAT_BYTES)
+
+
+def estimate_calculate_eigen(data):
+    matrix = data.get('matrix')
+    n = max(_rows(matrix), _cols(matrix))
+    # Only 2x2 matrices are decomposed, but any input is converted first
+    return Cost(1e-4 + 1e-7 * n * n, 2 * n * n * FLOAT_BYTES)
+
+
+def estimate_neural_forward(data):
+    W1, W2 = data.get('W1'), data.get('W2')
+    weights = _rows(W1) * _cols(W1) + _rows(W2) * _cols(W2)
+    # The weights are echoed back along with the activations
+    return Cost(1e-4 + 1e-8 * weights, 2 * weights * FLOAT_BYTES)
+
+
+def estimate_calculate_matrices(data):
+    n = max(_rows(data.get('m1')), _cols(data.get('m1')), _rows(data.get('m2')))
+    return Cost(1e-8 * n ** 3 + 1e-4, n * n * FLOAT_BYTES)
+
+
+def estimate_matrix_expression(data):
+    operands = data.get('operands')
+    operands = operands if isinstance(operands, dict) else {}
+    n = max([max(_rows(v), _cols(v)) for v in operands.values()] + [1])
+    intermediates = data.get('intermediates')
+    outputs = 1 + (len(intermediates) if isinstance(intermediates, list) else 0)
+    # Every operand reference or function call is at most one O(n^3) step
+    expressions = [data.get('expression')] + (intermediates if outputs > 1 else [])
+    steps = sum(len(re.findall(r'[A-Za-z_]\w*', e)) for e in expressions if isinstance(e, str))
+    return Cost(1e-4 + 1e-8 * n ** 3 * steps, outputs * n * n * FLOAT_BYTES)
+
+
+def estimate_array_operation(data):
+    # Operands are on disk: the cost comes from their headers, not the body
+    from array_store import array_info, matrix_shape
+    shapes = [matrix_shape(array_info(data[name])['shape']) for name in ('a', 'b') if data.get(name)]
+    if not shapes:
+        return Cost(1e-4, 256)
+    touched = sum(m * n for m, n in shapes) * 8
+    cpu = 2e-9 * touched
+    if data.get('operation') == 'multiply' and len(shapes) == 2:
+        (m, k), (_, n) = shapes
+        # Blocked products re-read each operand tile once per output tile
+        cpu += 2e-10 * m * k * n
+    return Cost(cpu, 256)
+
+
+def _shape_points(shape, resolution=0):
+    if shape == 'grid':
+        return (resolution or 9) ** 2
+    if shape == 'circle':
+        return (resolution or 64) + 1
+    return 8
+
+
+def estimate_transform(data):
+    points = _shape_points(data.get('shape', 'square'))
+    return Cost(1e-4 + 1e-8 * _rows(data.get('matrix')) * points,
+                (2 + _rows(data.get('matrix'))) * points * FLOAT_BYTES)
+
+
+def estimate_transform_pipeline(data):
+    frames = _int_param(data, 'frames', 30)
+    resolution = _int_param(data, 'resolution', 0) if data.get('resolution') is not None else 0
+    points = _shape_points(data.get('shape', 'square'), resolution)
+    return Cost(1e-4 + 2e-9 * frames * points, 2 * frames * points * FLOAT_BYTES)
+
+
+def estimate_vectors_batch(data):
+    v1 = data.get('v1')
+    n, d = _rows(v1), _cols(v1)
+    return Cost(1e-4 + 1e-7 * n * d, 6 * n * d * FLOAT_BYTES)
+
+
+# Batch op name -> estimator for the equivalent single-op request
+BATCH_ESTIMATORS = {
+    'vector_properties': estimate_calculate_vectors,
+    'matrix': estimate_calculate_matrices,
+    'transform': estimate_transform,
+    'eigen': estimate_calculate_eigen,
+    'forward_pass': estimate_neural_forward,
+}
+
+
+def estimate_batch(data):
+    operations = data.get('operations')
+    cpu, size = 1e-3, 0
+    for op in operations if isinstance(operations, list) else []:
+        estimator = BATCH_ESTIMATORS.get(op.get('op')) if isinstance(op, dict) else None
+        # Unknown operations only cost their error entry
+        cost = estimator(op) if estimator else Cost(2e-5, 64)
+        cpu += cost.cpu_seconds
+        size += cost.response_bytes
+    return Cost(cpu, size)
+
+
+ESTIMATORS = {
+    'api_gradient_descent': estimate_gradient_descent,
+    'api_train_iterative': estimate_train_iterative,
+    'api_gradient_descent_stream': estimate_gradient_descent,
+    'api_train_iterative_stream': estimate_train_iterative,
+    'api_pca_analyze': estimate_pca,
+    'api_generate_classification': estimate_generate_classification,
+    'api_generate_dataset': estimate_generate_dataset,
+    'api_train_classifier': estimate_train_classifier,
+    'api_train_model': estimate_train_model,
+    'api_solve_system': estimate_solve_system,
+    'api_solve_system_steps': estimate_solve_system_steps,
+    'api_calculate_vectors': estimate_calculate_vectors,
+    'api_calculate_matrices': estimate_calculate_matrices,
+    'api_transform': estimate_transform,
+    'api_calculate_eigen': estimate_calculate_eigen,
+    'api_neural_forward': estimate_neural_forward,
+    'api_matrix_expression': estimate_matrix_expression,
+    'api_array_operation': estimate_array_operation,
+    'api_transform_pipeline': estimate_transform_pipeline,
+    'api_batch': estimate_batch,
+    'api_calculate_vectors_batch': estimate_vectors_batch,
+}
+
+# Limits for scalar size parameters, applied before cost estimation
+PARAM_LIMITS = {
+    'api_gradient_descent': {'steps': int(os.environ.get('MAX_GRADIENT_STEPS', 10000))},
+    'api_train_iterative': {'n_iterations': int(os.environ.get('MAX_TRAIN_ITERATIONS', 5000))},
+    'api_gradient_descent_stream': {'steps': int(os.environ.get('MAX_GRADIENT_STEPS', 10000))},
+    'api_train_iterative_stream': {'n_iterations': int(os.environ.get('MAX_TRAIN_ITERATIONS', 5000))},
+    'api_pca_analyze': {'n_points': int(os.environ.get('MAX_PCA_POINTS', 20000))},
+    'api_generate_classification': {'n_samples': int(os.environ.get('MAX_CLASSIFICATION_SAMPLES', 20000))},
+    'api_generate_dataset': {'n_samples': int(os.environ.get('MAX_DATASET_SAMPLES', 50000))},
+    'api_transform_pipeline': {'frames': int(os.environ.get('MAX_TRANSFORM_FRAMES', 240)),
+                               'resolution': int(os.environ.get('MAX_TRANSFORM_RESOLUTION', 201))},
+    'api_solve_system_steps': {'limit': 100},  # solver_logic.MAX_STEP_PAGE
+}
+
+
+class AdmissionError(Exception):
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Gatekeeper for expensive requests.
+
+    Requests above the hard budget are rejected. Requests above the queue
+    threshold must take one of a small number of expensive slots, waiting
+    up to queue_timeout seconds; cheap requests are never queued.
+    """
+
+    def __init__(self, slots=EXPENSIVE_SLOTS, queue_timeout=QUEUE_TIMEOUT):
+        self.slots = slots
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+        self._inflight_cost = 0.0
+        self.admitted = 0
+        self.clamped = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def clamp(self, endpoint, data):
+        """Apply PARAM_LIMITS to the request body; returns the clamped names."""
+        clamped = []
+        for name, limit in PARAM_LIMITS.get(endpoint, {}).items():
+            value = data.get(name)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > limit:
+                if ADMISSION_POLICY != 'clamp':
+                    self.rejected += 1
+                    raise AdmissionError(f"'{name}' must be at most {limit}", 413)
+                data[name] = limit
+                clamped.append(f'{name}={limit}')
+        if clamped:
+            self.clamped += 1
+        return clamped
+
+    def check(self, cost, endpoint=None):
+        limit = CPU_BUDGETS.get(endpoint, MAX_CPU_SECONDS)
+        if cost.cpu_seconds > limit:
+            self.rejected += 1
+            raise AdmissionError(
+                f'Request too expensive (estimated {cost.cpu_seconds:.1f}s CPU, limit {limit:g}s)', 413)
+        if cost.response_bytes > MAX_RESPONSE_BYTES:
+            self.rejected += 1
+            raise AdmissionError(
+                f'Response too large (estimated {cost.response_bytes} bytes, limit {MAX_RESPONSE_BYTES})', 413)
+
+    def acquire(self, cost):
+        """Take an expensive slot; returns True if one must be released later."""
+        if cost.cpu_seconds < QUEUE_THRESHOLD_SECONDS:
+            self.admitted += 1
+            return False
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            self.throttled += 1
+            raise AdmissionError('Server busy with expensive requests, please retry.', 429,
+                                 retry_after=self.retry_after())
+        with self._lock:
+            self._inflight_cost += cost.cpu_seconds
+        self.admitted += 1
+        return True
+
+    def release(self, cost):
+        with self._lock:
+            self._inflight_cost = max(0.0, self._inflight_cost - cost.cpu_seconds)
+        self._semaphore.release()
+
+    def retry_after(self):
+        with self._lock:
+            return max(1, math.ceil(self._inflight_cost / self.slots))
+
+    def stats(self):
+        return {
+            'admitted': self.admitted,
+            'clamped': self.clamped,
+            'rejected': self.rejected,
+            'throttled': self.throttled,
+            'inflight_cpu_seconds': round(self._inflight_cost, 3)
+        }
+
+
+controller = AdmissionController()
+
+
+def metrics_samples():
+    """Admission controller counters for the /metrics endpoint."""
+    stats = controller.stats()
+    for outcome in ('admitted', 'clamped', 'rejected', 'throttled'):
+        yield ('admission_decisions_total', 'counter', 'Admission decisions by outcome.',
+               {'outcome': outcome}, stats[outcome])
+    yield ('admission_inflight_cpu_seconds', 'gauge', 'Estimated CPU seconds of admitted expensive requests.',
+           {}, float(stats['inflight_cpu_seconds']))
+
+
+class AdmissionRequest(Request):
+    """Request that applies MAX_CONTENT_LENGTH except on UNBOUNDED_BODY_ENDPOINTS."""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint in UNBOUNDED_BODY_ENDPOINTS:
+            return None
+        return super().max_content_length
+
+
+def init_admission(app):
+    """Register admission control hooks on the Flask app"""
+
+    # Flask's default config already has MAX_CONTENT_LENGTH = None, so
+    # setdefault() would never apply the limit
+    if app.config.get('MAX_CONTENT_LENGTH') is None:
+        app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+    app.request_class = AdmissionRequest
+
+    @app.before_request
+    def admit_request():
+        estimator = ESTIMATORS.get(request.endpoint)
+        if estimator is None:
+            return None
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return None
+
+        # The parsed body is cached on the request, so clamping it here is
+        # what the view will see
+        clamped = controller.clamp(request.endpoint, data)
+        cost = estimator(data)
+        controller.check(cost, request.endpoint)
+        if controller.acquire(cost):
+            g.admission_cost = cost
+        g.admission_clamped = clamped
+        return None
+
+    @app.after_request
+    def report_clamping(response):
+        clamped = g.get('admission_clamped')
+        if clamped:
+            response.headers['X-Admission-Clamped'] = ', '.join(clamped)
+        return response
+
+    @app.teardown_request
+    def release_slot(exc):
+        cost = g.pop('admission_cost', None)
+        if cost is not None:
+            controller.release(cost)
+
+    @app.errorhandler(AdmissionError)
+    def admission_error(e):
+        response = jsonify({"error": str(e)})
+        response.status_code = e.status_code
+        if e.retry_after is not None:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response
+
+    @app.errorhandler(413)
+    def body_too_large(e):
+        return jsonify({"error": f"Request body is larger than {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
@@ -1,17 +1,27 @@
 from flask import Flask, render_template, request, jsonify
 from flask_cors import CORS
-from math_engine.vector_logic import calculate_vector_properties
+from math_engine.vector_logic import calculate_vector_properties, calculate_vector_properties_batch
 from math_engine.matrix_logic import matrix_operations
-from math_engine.transform_logic import apply_transform
-from math_engine.solver_logic import solve_system
+from math_engine.expression_logic import evaluate_expression, metrics_samples as expression_metrics
+from math_engine.transform_logic import apply_transform, transform_pipeline
+from math_engine.solver_logic import solve_system, solve_system_steps
 from math_engine.eigen_logic import calculate_eigen
-from math_engine.gradient_logic import gradient_descent, compare_learning_rates
+from math_engine.gradient_logic import gradient_descent, iter_gradient_descent, compare_learning_rates
 from math_engine.neural_logic import forward_pass, initialize_network, visualize_network_structure
-from math_engine.pca_logic import perform_pca, generate_sample_data as pca_generate_data
-from math_engine.feature_logic import generate_classification_data, train_classifier
-from math_engine.convolution_logic import apply_convolution, generate_sample_image, get_predefined_kernels
-from math_engine.ml_model_logic import generate_sample_dataset, train_linear_regression, train_with_iterations
-from chatbot import create_chat_routes
+from math_engine.batch_logic import run_batch
+from math_engine import preload_engine_modules
+from chatbot import create_chat_routes, metrics_samples as chat_metrics
+from llm_client import metrics_samples as llm_metrics
+from chat_sessions import metrics_samples as session_metrics
+from array_store import create_array_routes, metrics_samples as array_metrics
+from array_codec import encode_response, encode_stream
+from json_provider import NumpyJSONProvider, json_precision
+from caching import cached_response, create_cache_routes, metrics_samples as cache_metrics
+from executor import run_engine, EngineExecutionError
+from admission import init_admission, metrics_samples as admission_metrics
+from metrics import init_metrics, registry as metrics_registry
+from profiling import init_profiling
+from warmup import WARMUP_ENABLED, init_warmup, start_warmup
 from datetime import datetime
 from dotenv import load_dotenv
 import os
@@ -20,17 +30,49 @@ import os
 load_dotenv()
 
 app = Flask(__name__)
+app.json = NumpyJSONProvider(app)
 CORS(app)
 
+# Engine modules backed by scikit-learn/scipy are imported inside their routes
+# on first use. Production can pay that cost at startup instead by listing
+# them, e.g. PRELOAD_ENGINE_MODULES=feature_logic,pca_logic (or 'all').
+preload_engine_modules(os.environ.get('PRELOAD_ENGINE_MODULES', ''))
+
 # Production configuration
 if os.environ.get('ENVIRONMENT') == 'production':
     app.config['DEBUG'] = False
 else:
     app.config['DEBUG'] = True
 
+# Request metrics must be registered first so they see every other hook
+init_metrics(app)
+metrics_registry.register_collector(cache_metrics)
+metrics_registry.register_collector(admission_metrics)
+metrics_registry.register_collector(chat_metrics)
+metrics_registry.register_collector(llm_metrics)
+metrics_registry.register_collector(session_metrics)
+metrics_registry.register_collector(expression_metrics)
+metrics_registry.register_collector(array_metrics)
+
+# Reject, clamp or queue requests whose estimated cost exceeds the budget
+init_admission(app)
+
+# Opt-in per-request profiling (PROFILING_ENABLED=1 and ADMIN_TOKEN, plus an X-Profile header)
+init_profiling(app)
+
+# Readiness endpoint; the warm-up itself is started per worker by
+# gunicorn.conf.py (or below for the development server)
+init_warmup(app)
+
 # Add chatbot routes
 create_chat_routes(app)
 
+# Add response cache inspection routes
+create_cache_routes(app)
+
+# Add uploaded array and out-of-core operation routes
+create_array_routes(app)
+
 # --- Routes ---
 
 @app.route('/')
@@ -46,8 +88,16 @@ def api_calculate_vectors():
     data = request.json
     v1 = data.get('v1', [0,0,0])
     v2 = data.get('v2', [0,0,0])
-    result = calculate_vector_properties(v1, v2)
-    return jsonify(result)
+    result = run_engine(calculate_vector_properties, v1, v2)
+    return encode_response(result)
+
+@app.route('/api/calculate_vectors/batch', methods=['POST'])
+def api_calculate_vectors_batch():
+    data = request.json
+    v1 = data.get('v1', [])
+    v2 = data.get('v2')
+    result = run_engine(calculate_vector_properties_batch, v1, v2)
+    return encode_response(result)
 
 @app.route('/matrices')
 def matrices():
@@ -59,8 +109,17 @@ def api_calculate_matrices():
     op = data.get('operation')
     m1 = data.get('m1')
     m2 = data.get('m2')
-    result = matrix_operations(op, m1, m2)
-    return jsonify(result)
+    result = run_engine(matrix_operations, op, m1, m2)
+    return encode_response(result)
+
+@app.route('/api/matrix_expression', methods=['POST'])
+def api_matrix_expression():
+    data = request.json
+    expression = data.get('expression')
+    operands = data.get('operands', {})
+    intermediates = data.get('intermediates')
+    result = run_engine(evaluate_expression, expression, operands, intermediates)
+    return encode_response(result)
 
 @app.route('/transformations')
 def transformations():
@@ -71,8 +130,21 @@ def api_transform():
     data = request.json
     matrix = data.get('matrix')
     shape = data.get('shape', 'square')
-    result = apply_transform(matrix, shape)
-    return jsonify(result)
+    result = run_engine(apply_transform, matrix, shape)
+    return encode_response(result)
+
+@app.route('/api/transform/pipeline', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
+def api_transform_pipeline():
+    data = request.json
+    transforms = data.get('transforms')
+    shape = data.get('shape', 'square')
+    frames = data.get('frames', 30)
+    resolution = data.get('resolution')
+    mode = data.get('mode', 'composite')
+    result = run_engine(transform_pipeline, transforms, shape, frames, resolution, mode)
+    return encode_response(result)
     
 @app.route('/systems')
 def systems():
@@ -83,8 +155,20 @@ def api_solve_system():
     data = request.json
     A = data.get('A')
     b = data.get('b')
-    result = solve_system(A, b)
-    return jsonify(result)
+    result = run_engine(solve_system, A, b)
+    return encode_response(result)
+
+@app.route('/api/solve_system/steps', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
+def api_solve_system_steps():
+    data = request.json
+    A = data.get('A')
+    b = data.get('b')
+    offset = data.get('offset', 0)
+    limit = data.get('limit', 20)
+    result = run_engine(solve_system_steps, A, b, offset, limit)
+    return encode_response(result)
 
 @app.route('/eigen')
 def eigen():
@@ -94,8 +178,8 @@ def eigen():
 def api_calculate_eigen():
     data = request.json
     matrix = data.get('matrix')
-    result = calculate_eigen(matrix)
-    return jsonify(result)
+    result = run_engine(calculate_eigen, matrix)
+    return encode_response(result)
 
 # --- New AI/ML Routes ---
 
@@ -110,8 +194,20 @@ def api_gradient_descent():
     learning_rate = data.get('learning_rate', 0.1)
     steps = data.get('steps', 50)
     function_type = data.get('function_type', 'quadratic')
-    result = gradient_descent(start_x, learning_rate, steps, function_type)
-    return jsonify(result)
+    result = run_engine(gradient_descent, start_x, learning_rate, steps, function_type)
+    return encode_response(result)
+
+@app.route('/api/gradient_descent/stream', methods=['POST'])
+def api_gradient_descent_stream():
+    data = request.json
+    start_x = data.get('start_x', 0)
+    learning_rate = data.get('learning_rate', 0.1)
+    steps = data.get('steps', 50)
+    function_type = data.get('function_type', 'quadratic')
+    every = data.get('every', 1)
+    tolerance = data.get('tolerance', 0.01)
+    frames = iter_gradient_descent(start_x, learning_rate, steps, function_type, every, tolerance)
+    return encode_stream(frames)
 
 @app.route('/neural')
 def neural():
@@ -135,20 +231,23 @@ def api_neural_forward():
         W2 = network['W2']
         b2 = network['b2']
     
-    result = forward_pass(inputs, W1, b1, W2, b2, activation)
-    return jsonify(result)
+    result = run_engine(forward_pass, inputs, W1, b1, W2, b2, activation)
+    return encode_response(result)
 
 @app.route('/api/neural_structure', methods=['GET'])
 def api_neural_structure():
     result = visualize_network_structure()
-    return jsonify(result)
+    return encode_response(result)
 
 @app.route('/pca')
 def pca():
     return render_template('pca.html')
 
 @app.route('/api/pca_analyze', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
 def api_pca_analyze():
+    from math_engine.pca_logic import perform_pca, generate_sample_data as pca_generate_data
     data = request.json
     data_type = data.get('data_type', 'ellipse')
     n_points = data.get('n_points', 100)
@@ -160,41 +259,49 @@ def api_pca_analyze():
     else:
         sample_data = pca_generate_data(data_type, n_points)
     
-    result = perform_pca(sample_data, n_components)
-    return jsonify(result)
+    result = run_engine(perform_pca, sample_data, n_components)
+    return encode_response(result)
 
 @app.route('/feature_space')
 def feature_space():
     return render_template('feature_space.html')
 
 @app.route('/api/generate_classification', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
 def api_generate_classification():
+    from math_engine.feature_logic import generate_classification_data
     data = request.json
     n_samples = data.get('n_samples', 100)
     separation = data.get('separation', 2.0)
     noise = data.get('noise', 0.5)
     pattern = data.get('pattern', 'linear')
     
-    X, y = generate_classification_data(n_samples, separation, noise, pattern)
-    return jsonify({'X': X.tolist(), 'y': y.tolist()})
+    X, y = run_engine(generate_classification_data, n_samples, separation, noise, pattern)
+    return encode_response({'X': X, 'y': y})
 
 @app.route('/api/train_classifier', methods=['POST'])
+@json_precision(6)
 def api_train_classifier():
+    from math_engine.feature_logic import train_classifier
     data = request.json
     X = data.get('X')
     y = data.get('y')
     classifier_type = data.get('classifier_type', 'logistic')
     kernel = data.get('kernel', 'linear')
     
-    result = train_classifier(X, y, classifier_type, kernel)
-    return jsonify(result)
+    result = run_engine(train_classifier, X, y, classifier_type, kernel)
+    return encode_response(result)
 
 @app.route('/convolution')
 def convolution():
     return render_template('convolution.html')
 
 @app.route('/api/apply_filter', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
 def api_apply_filter():
+    from math_engine.convolution_logic import apply_convolution, generate_sample_image
     data = request.json
     kernel_type = data.get('kernel_type', 'edge_detect')
     image_type = data.get('image_type', 'checkerboard')
@@ -202,48 +309,76 @@ def api_apply_filter():
     # Generate sample image
     image = generate_sample_image(image_type)
     
-    result = apply_convolution(image, kernel_type)
-    return jsonify(result)
+    result = run_engine(apply_convolution, image, kernel_type)
+    return encode_response(result)
 
 @app.route('/api/get_kernels', methods=['GET'])
 def api_get_kernels():
+    from math_engine.convolution_logic import get_predefined_kernels
     kernels = get_predefined_kernels()
     # Convert to serializable format
     kernels_dict = {k: v.tolist() for k, v in kernels.items()}
-    return jsonify(kernels_dict)
+    return encode_response(kernels_dict)
 
 @app.route('/ml_model')
 def ml_model():
     return render_template('ml_model.html')
 
 @app.route('/api/generate_dataset', methods=['POST'])
+@json_precision(6)
+@cached_response(ttl=600)
 def api_generate_dataset():
+    from math_engine.ml_model_logic import generate_sample_dataset
     data = request.json
     dataset_type = data.get('dataset_type', 'linear')
     n_samples = data.get('n_samples', 100)
     noise = data.get('noise', 10)
     
-    X, y = generate_sample_dataset(dataset_type, n_samples, noise)
-    return jsonify({'X': X.tolist(), 'y': y.tolist()})
+    X, y = run_engine(generate_sample_dataset, dataset_type, n_samples, noise)
+    return encode_response({'X': X, 'y': y})
 
 @app.route('/api/train_model', methods=['POST'])
 def api_train_model():
+    from math_engine.ml_model_logic import train_linear_regression
     data = request.json
     X = data.get('X')
     y = data.get('y')
     
-    result = train_linear_regression(X, y)
-    return jsonify(result)
+    result = run_engine(train_linear_regression, X, y)
+    return encode_response(result)
 
 @app.route('/api/train_iterative', methods=['POST'])
 def api_train_iterative():
+    from math_engine.ml_model_logic import train_with_iterations
     data = request.json
     X = data.get('X')
     y = data.get('y')
     n_iterations = data.get('n_iterations', 50)
     
-    result = train_with_iterations(X, y, n_iterations)
-    return jsonify(result)
+    result = run_engine(train_with_iterations, X, y, n_iterations)
+    return encode_response(result)
+
+@app.route('/api/train_iterative/stream', methods=['POST'])
+def api_train_iterative_stream():
+    # Frames are produced in the request thread, the process pool cannot stream
+    from math_engine.ml_model_logic import iter_training
+    data = request.json
+    X = data.get('X')
+    y = data.get('y')
+    n_iterations = data.get('n_iterations', 50)
+    every = data.get('every', 1)
+    tolerance = data.get('tolerance', 1e-6)
+    frames = iter_training(X, y, n_iterations, every, tolerance)
+    return encode_stream(frames)
+
+# --- Batch Route ---
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    data = request.json
+    operations = data.get('operations', [])
+    result = run_engine(run_batch, operations)
+    return encode_response(result)
 
 # Health check endpoint
 @app.route('/health')
@@ -255,6 +390,10 @@ def health():
 def not_found(e):
     return jsonify({"error": "Not found"}), 404
 
+@app.errorhandler(EngineExecutionError)
+def engine_error(e):
+    return jsonify({"error": str(e)}), e.status_code
+
 @app.errorhandler(500)
 def server_error(e):
     return jsonify({"error": "Internal server error"}), 500
@@ -297,4 +436,7 @@ if __name__ == '__main__':
 
     print("="*50)
     port = int(os.environ.get('PORT', 5000))
+    # With the reloader, only the child process actually serves requests
+    if WARMUP_ENABLED and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup(app)
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,254 @@
+import base64
+import json
+import struct
+
+import numpy as np
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+from json_provider import request_precision, round_significant
+from math_engine.instrumentation import phase
+
+# Opt-in compact encodings, negotiated through the Accept header.
+#   NDARRAY_JSON:   regular JSON, numeric arrays become base64 typed buffers
+#   NDARRAY_BINARY: length-prefixed JSON header followed by raw buffers
+NDARRAY_JSON = 'application/vnd.mathai.ndarray+json'
+NDARRAY_BINARY = 'application/vnd.mathai.ndarray'
+
+# Incremental encodings for iterative algorithms, one frame per event
+NDJSON = 'application/x-ndjson'
+EVENT_STREAM = 'text/event-stream'
+
+BINARY_MAGIC = b'MAND'
+BUFFER_ALIGNMENT = 8
+
+# Lists shorter than this are left as plain JSON - not worth a buffer
+MIN_PACKED_SIZE = 16
+
+
+def negotiate_encoding():
+    """
+    Pick a response encoding from the request Accept header.
+
+    Returns:
+        (mimetype, float_dtype) where mimetype is None for plain JSON and
+        float_dtype is 'float32' or 'float64'
+    """
+    accept = request.headers.get('Accept', '')
+    for media_range in accept.split(','):
+        parts = [p.strip() for p in media_range.split(';')]
+        mimetype = parts[0].lower()
+        if mimetype not in (NDARRAY_JSON, NDARRAY_BINARY):
+            continue
+        params = dict(p.split('=', 1) for p in parts[1:] if '=' in p)
+        float_dtype = 'float32' if params.get('dtype', '').strip().lower() in ('float32', 'f4') else 'float64'
+        return mimetype, float_dtype
+    return None, 'float64'
+
+
+def as_typed_array(value, float_dtype='float64'):
+    """
+    Convert an ndarray or rectangular numeric list to a little-endian array.
+
+    Returns:
+        numpy array, or None if the value should stay as plain JSON
+    """
+    if isinstance(value, np.ndarray):
+        arr = value
+    elif isinstance(value, (list, tuple)):
+        # Cheap rejection before asking numpy to inspect the whole list
+        probe = value
+        while isinstance(probe, (list, tuple)) and probe:
+            probe = probe[0]
+        if isinstance(probe, (list, tuple)) or not isinstance(probe, (int, float, np.number)):
+            return None
+        try:
+            arr = np.asarray(value)
+        except ValueError:
+            # Ragged nested lists
+            return None
+    else:
+        return None
+
+    if arr.dtype.kind not in 'biuf' or arr.size < MIN_PACKED_SIZE:
+        return None
+
+    if arr.dtype.kind == 'b':
+        arr = arr.astype('<u1')
+    elif arr.dtype.kind in 'iu':
+        # JavaScript has no cheap 64-bit integer views, keep ints in 32 bits when they fit
+        if arr.size == 0 or (arr.min() >= np.iinfo(np.int32).min and arr.max() <= np.iinfo(np.int32).max):
+            arr = arr.astype('<i4')
+        else:
+            arr = arr.astype('<f8')
+    else:
+        arr = arr.astype('<f4' if float_dtype == 'float32' else '<f8')
+
+    return np.ascontiguousarray(arr)
+
+
+def _pack(value, float_dtype, on_array, digits=None):
+    """
+    Walk a result, replacing numeric arrays with on_array(arr).
+
+    With digits set, floats are rounded to that many significant digits
+    first, as plain JSON responses are (json_provider.round_significant).
+    """
+    arr = as_typed_array(value, float_dtype)
+    if arr is not None:
+        if digits is not None and arr.dtype.kind == 'f':
+            arr = round_significant(arr, digits).astype(arr.dtype)
+        return on_array(arr)
+    if isinstance(value, dict):
+        return {k: _pack(v, float_dtype, on_array, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(v, float_dtype, on_array, digits) for v in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        value = value.tolist()
+    if digits is not None:
+        return round_significant(value, digits)
+    return value
+
+
+def _describe(arr):
+    return {'dtype': arr.dtype.name, 'shape': list(arr.shape)}
+
+
+def encode_json(result, float_dtype='float64', digits=None):
+    """Encode a result as JSON with arrays inlined as base64 buffers."""
+    def on_array(arr):
+        meta = _describe(arr)
+        meta['data'] = base64.b64encode(arr.tobytes()).decode('ascii')
+        return {'__ndarray__': meta}
+
+    payload = _pack(result, float_dtype, on_array, digits)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def encode_binary(result, float_dtype='float64', digits=None):
+    """
+    Encode a result as a single binary container.
+
+    Layout (all integers little-endian):
+        4 bytes   magic 'MAND'
+        4 bytes   uint32 header length
+        header    UTF-8 JSON {"payload": ..., "arrays": [...]}, space padded
+        buffers   raw array data, each starting on an 8-byte boundary
+
+    Arrays inside the payload are replaced by {"__ndarray__": index} and the
+    matching "arrays" entry carries dtype, shape and the absolute byte offset,
+    so the browser can build Float64Array/Float32Array views without copying.
+    Floats are rounded to `digits` significant digits when given.
+    """
+    arrays = []
+
+    def on_array(arr):
+        arrays.append(arr)
+        return {'__ndarray__': len(arrays) - 1}
+
+    payload = _pack(result, float_dtype, on_array, digits)
+
+    def build_header(offsets):
+        table = [dict(_describe(arr), offset=off, nbytes=arr.nbytes) for arr, off in zip(arrays, offsets)]
+        return json.dumps({'payload': payload, 'arrays': table}, separators=(',', ':')).encode('utf-8')
+
+    def layout(header_len):
+        offset = _align(8 + header_len)
+        offsets = []
+        for arr in arrays:
+            offsets.append(offset)
+            offset = _align(offset + arr.nbytes)
+        return offsets
+
+    # Offsets depend on the header length and vice versa; iterate until stable
+    header_len = len(build_header([0] * len(arrays)))
+    while True:
+        offsets = layout(header_len)
+        header = build_header(offsets)
+        if len(header) <= header_len:
+            break
+        header_len = len(header)
+
+    data_start = offsets[0] if offsets else _align(8 + len(header))
+    header = header.ljust(data_start - 8, b' ')
+
+    chunks = [BINARY_MAGIC, struct.pack('<I', len(header)), header]
+    position = 8 + len(header)
+    for arr, off in zip(arrays, offsets):
+        chunks.append(b'\0' * (off - position))
+        chunks.append(arr.tobytes())
+        position = off + arr.nbytes
+    return b''.join(chunks)
+
+
+def _align(offset):
+    return (offset + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * BUFFER_ALIGNMENT
+
+
+def encode_response(result, status=200):
+    """
+    Build the HTTP response for an engine result.
+
+    Plain JSON is returned unless the client explicitly asked for one of the
+    compact ndarray encodings in its Accept header. The request's precision
+    (?precision, X-Precision or the route's json_precision) applies to
+    every encoding.
+    """
+    mimetype, float_dtype = negotiate_encoding()
+
+    if mimetype == NDARRAY_JSON:
+        with phase('serialize'):
+            body = encode_json(result, float_dtype, request_precision())
+            response = Response(body, status=status, mimetype=NDARRAY_JSON)
+    elif mimetype == NDARRAY_BINARY:
+        with phase('serialize'):
+            body = encode_binary(result, float_dtype, request_precision())
+            response = Response(body, status=status, mimetype=NDARRAY_BINARY)
+    else:
+        # The app's JSON provider writes ndarrays directly, no tolist() pass
+        with phase('serialize'):
+            response = jsonify(result)
+        response.status_code = status
+
+    response.vary.add('Accept')
+    return response
+
+
+def encode_stream(frames):
+    """
+    Stream frames from an engine generator as they are produced.
+
+    Each frame is a dict with an 'event' key. Frames are written as
+    newline-delimited JSON, or as Server-Sent Events when the client
+    prefers text/event-stream. An exception raised by the generator ends
+    the stream with an 'error' frame.
+    """
+    sse = request.accept_mimetypes.best_match([NDJSON, EVENT_STREAM]) == EVENT_STREAM
+
+    def generate():
+        try:
+            while True:
+                with phase('compute'):
+                    try:
+                        frame = next(frames)
+                    except StopIteration:
+                        return
+                    except Exception as e:
+                        frame = {'event': 'error', 'error': str(e)}
+                with phase('serialize'):
+                    body = current_app.json.dumps(frame, separators=(',', ':'))
+                    if sse:
+                        yield f"event: {frame.get('event', 'message')}\ndata: {body}\n\n"
+                    else:
+                        yield body + '\n'
+                if frame['event'] == 'error':
+                    return
+        finally:
+            frames.close()
+
+    # stream_with_context keeps the request context (and with it the
+    # admission slot and request metrics) alive until the last frame
+    response = Response(stream_with_context(generate()), mimetype=EVENT_STREAM if sse else NDJSON)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,311 @@
+import math
+import os
+import re
+import threading
+import time
+import uuid
+
+import numpy as np
+from flask import jsonify, request, send_file
+
+from array_codec import encode_response
+from executor import ENGINE_EXECUTOR, run_engine
+from math_engine.blocked_logic import blocked_operation, result_shape
+
+# Uploaded operands and blocked operation results, as .npy files on local
+# disk. Every worker on the host sees the same files.
+ARRAY_STORE_DIR = os.environ.get('ARRAY_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'array_store'))
+ARRAY_MAX_UPLOAD_BYTES = int(os.environ.get('ARRAY_MAX_UPLOAD_BYTES', 4 * 1024 ** 3))
+# Disk quota for the whole store; expired arrays are pruned before it is enforced
+ARRAY_STORE_MAX_BYTES = int(os.environ.get('ARRAY_STORE_MAX_BYTES', 32 * 1024 ** 3))
+# Arrays unused (not read, written or downloaded) for this long are deleted
+ARRAY_TTL = int(os.environ.get('ARRAY_TTL', 24 * 3600))
+
+COPY_CHUNK_BYTES = 1024 * 1024
+ARRAY_ID = re.compile(r'^[0-9a-f]{32}$')
+ARRAY_SUFFIX = '.npy'
+PARTIAL_SUFFIX = '.partial'
+
+
+class ArrayStoreError(Exception):
+    status_code = 400
+
+
+class ArrayNotFound(ArrayStoreError):
+    status_code = 404
+
+
+class ArrayTooLarge(ArrayStoreError):
+    status_code = 413
+
+
+class ArrayStoreFull(ArrayStoreError):
+    status_code = 507
+
+
+class ArrayOperationsUnavailable(ArrayStoreError):
+    status_code = 503
+
+
+_lock = threading.Lock()
+counts = {'uploaded': 0, 'computed': 0, 'deleted': 0, 'expired': 0}
+
+
+def _count(outcome, n=1):
+    with _lock:
+        counts[outcome] += n
+
+
+def validate_array_id(array_id):
+    # Ids become file names, so nothing but the generated hex form is accepted
+    if not isinstance(array_id, str) or not ARRAY_ID.match(array_id):
+        raise ArrayStoreError('Array id must be the 32 character hex id returned by the upload')
+    return array_id
+
+
+def array_path(array_id):
+    """Path of a stored array; marks it as recently used."""
+    path = os.path.join(ARRAY_STORE_DIR, validate_array_id(array_id) + ARRAY_SUFFIX)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        raise ArrayNotFound(f"Array '{array_id}' not found (it may have expired)")
+    return path
+
+
+def read_header(path):
+    """
+    Read and check a .npy header.
+
+    Returns:
+        (shape, dtype) for a 1D or 2D numeric array whose file size matches
+        its header
+    """
+    with open(path, 'rb') as f:
+        try:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            elif version == (2, 0):
+                shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+            else:
+                raise ArrayStoreError(f'Unsupported .npy format version {version[0]}.{version[1]}')
+        except ValueError as e:
+            raise ArrayStoreError(f'Not a valid .npy file: {e}')
+        data_offset = f.tell()
+    if dtype.kind not in 'fiu' or dtype.fields is not None:
+        raise ArrayStoreError(f'Arrays must have a numeric (float or integer) dtype, got {dtype}')
+    if len(shape) not in (1, 2) or 0 in shape:
+        raise ArrayStoreError(f'Arrays must be non-empty vectors or matrices, got shape {shape}')
+    if os.path.getsize(path) != data_offset + math.prod(shape) * dtype.itemsize:
+        raise ArrayStoreError('File size does not match the .npy header (truncated upload?)')
+    return shape, dtype
+
+
+def array_info(array_id):
+    path = array_path(array_id)
+    shape, dtype = read_header(path)
+    return {"id": array_id, "shape": list(shape), "dtype": dtype.name, "bytes": os.path.getsize(path)}
+
+
+def matrix_shape(shape):
+    # Vectors are used as columns, as in the blocked engine
+    return (shape[0], 1) if len(shape) == 1 else tuple(shape)
+
+
+# --- Space management ---
+
+def usage():
+    total = 0
+    with os.scandir(ARRAY_STORE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                total += entry.stat().st_size
+    return total
+
+
+def prune():
+    """Delete arrays (and abandoned partial files) unused for ARRAY_TTL seconds."""
+    cutoff = time.time() - ARRAY_TTL
+    removed = 0
+    with os.scandir(ARRAY_STORE_DIR) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    if removed:
+        _count('expired', removed)
+    return removed
+
+
+def reserve(nbytes):
+    """Raise ArrayStoreFull unless nbytes more fit in the store's quota."""
+    os.makedirs(ARRAY_STORE_DIR, exist_ok=True)
+    if usage() + nbytes > ARRAY_STORE_MAX_BYTES:
+        prune()
+        if usage() + nbytes > ARRAY_STORE_MAX_BYTES:
+            raise ArrayStoreFull(f'Array store is full ({ARRAY_STORE_MAX_BYTES} bytes), delete arrays or retry later')
+
+
+def _new_paths():
+    array_id = uuid.uuid4().hex
+    final = os.path.join(ARRAY_STORE_DIR, array_id + ARRAY_SUFFIX)
+    return array_id, final + PARTIAL_SUFFIX, final
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def save_upload(stream, content_length=None):
+    """
+    Copy an uploaded .npy body to the store in chunks and validate it.
+
+    The file only gets its final name once complete and valid, so readers
+    never see a partial array. The store's quota is checked up front for
+    the declared length and again as the file grows past it.
+    """
+    reserve(content_length or 0)
+    reserved = content_length or 0
+    array_id, partial, final = _new_paths()
+    written = 0
+    try:
+        with open(partial, 'wb') as f:
+            while True:
+                chunk = stream.read(COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > ARRAY_MAX_UPLOAD_BYTES:
+                    raise ArrayTooLarge(f'Upload is larger than {ARRAY_MAX_UPLOAD_BYTES} bytes')
+                if written > reserved:
+                    # Past the declared length (or none was given, as for
+                    # multipart): usage() counts the partial file so far
+                    f.flush()
+                    reserve(len(chunk))
+                f.write(chunk)
+        if not written:
+            raise ArrayStoreError('Upload a .npy file as the request body (or as the "file" form field)')
+        read_header(partial)
+        os.replace(partial, final)
+    except BaseException:
+        _discard(partial)
+        raise
+    _count('uploaded')
+    return array_info(array_id)
+
+
+def run_operation(operation, a_id, b_id=None, tile=None):
+    """
+    Run a blocked operation on stored arrays and store its result.
+
+    Returns:
+        The engine result, plus the new array's id on success
+    """
+    if ENGINE_EXECUTOR != 'process':
+        # Blocked operations run for minutes; never tie up a request thread
+        raise ArrayOperationsUnavailable('Blocked array operations need the process pool (ENGINE_EXECUTOR=process)')
+    a_path = array_path(a_id)
+    b_path = array_path(b_id) if b_id else None
+    a_shape, _ = read_header(a_path)
+    b_shape = matrix_shape(read_header(b_path)[0]) if b_path else None
+    shape, error = result_shape(operation, matrix_shape(a_shape), b_shape)
+    if error:
+        return {"error": error}
+
+    reserve(math.prod(shape) * 8)
+    array_id, partial, final = _new_paths()
+    try:
+        # Written under the partial name and renamed when complete, so no id
+        # ever points at a half-written result
+        result = run_engine(blocked_operation, operation, a_path, b_path, partial, tile)
+        if "error" in result:
+            _discard(partial)
+            return result
+        os.replace(partial, final)
+    except BaseException:
+        _discard(partial)
+        raise
+    _count('computed')
+    return dict(result, id=array_id)
+
+
+def delete_array(array_id):
+    try:
+        os.remove(os.path.join(ARRAY_STORE_DIR, validate_array_id(array_id) + ARRAY_SUFFIX))
+    except FileNotFoundError:
+        return False
+    _count('deleted')
+    return True
+
+
+def stats():
+    os.makedirs(ARRAY_STORE_DIR, exist_ok=True)
+    with _lock:
+        stats = dict(counts)
+    with os.scandir(ARRAY_STORE_DIR) as entries:
+        stats['arrays'] = sum(1 for entry in entries if entry.name.endswith(ARRAY_SUFFIX))
+    stats.update(bytes=usage(), max_bytes=ARRAY_STORE_MAX_BYTES)
+    return stats
+
+
+def metrics_samples():
+    """Array store counters for the /metrics endpoint."""
+    current = stats()
+    yield 'array_store_arrays', 'gauge', 'Arrays held by the on-disk array store.', {}, current['arrays']
+    yield 'array_store_bytes', 'gauge', 'Bytes used by the on-disk array store.', {}, current['bytes']
+    for outcome in ('uploaded', 'computed', 'deleted', 'expired'):
+        yield ('array_store_arrays_total', 'counter', 'Arrays added to or removed from the store.',
+               {'outcome': outcome}, current[outcome])
+
+
+def create_array_routes(app):
+    """Add routes for uploaded arrays and blocked out-of-core operations"""
+
+    @app.errorhandler(ArrayStoreError)
+    def array_store_error(e):
+        return jsonify({"error": str(e)}), e.status_code
+
+    @app.route('/api/arrays', methods=['POST'])
+    def api_upload_array():
+        # Exempt from the JSON body limit (admission.UNBOUNDED_BODY_ENDPOINTS);
+        # the body is streamed to disk and capped by save_upload
+        if (request.content_length or 0) > ARRAY_MAX_UPLOAD_BYTES:
+            raise ArrayTooLarge(f'Upload is larger than {ARRAY_MAX_UPLOAD_BYTES} bytes')
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                raise ArrayStoreError('Multipart uploads must use the "file" field')
+            return jsonify(save_upload(upload.stream)), 201
+        return jsonify(save_upload(request.stream, request.content_length)), 201
+
+    @app.route('/api/arrays/<array_id>', methods=['GET'])
+    def api_download_array(array_id):
+        return send_file(array_path(array_id), mimetype='application/octet-stream', as_attachment=True,
+                         download_name=f'{array_id}.npy', conditional=True, max_age=0)
+
+    @app.route('/api/arrays/<array_id>/info', methods=['GET'])
+    def api_array_info(array_id):
+        return jsonify(array_info(array_id))
+
+    @app.route('/api/arrays/<array_id>', methods=['DELETE'])
+    def api_delete_array(array_id):
+        return jsonify({"deleted": delete_array(array_id)})
+
+    @app.route('/api/arrays/operation', methods=['POST'])
+    def api_array_operation():
+        data = request.json
+        operation = data.get('operation')
+        result = run_operation(operation, data.get('a'), data.get('b'), data.get('tile'))
+        return encode_response(result)
+
+    @app.route('/api/arrays/stats', methods=['GET'])
+    def api_array_stats():
+        return jsonify(stats())
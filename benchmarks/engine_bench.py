@@ -0,0 +1,303 @@
+"""
+Micro-benchmarks for the math_engine functions, with regression gating.
+
+Every case calls one engine function directly (no Flask) over a sweep of
+input sizes and records the best seconds per call. Results are compared
+against a stored baseline; the run fails (exit code 1) if any case/size got
+slower than the baseline by more than --threshold. A baseline recorded on
+another Python or numpy version is refused (exit code 2): the numbers are
+not comparable.
+
+Usage:
+    python benchmarks/engine_bench.py                      # run and compare
+    python benchmarks/engine_bench.py --update-baseline    # store new baseline
+    python benchmarks/engine_bench.py -k pca -k classifier # only matching cases
+    python benchmarks/engine_bench.py --quick              # two smallest sizes
+
+Baselines are machine specific; regenerate them with --update-baseline on
+the machine that runs the gate, with the pinned requirements installed.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engine_baseline.json')
+
+
+def _rng():
+    return np.random.default_rng(0)
+
+
+def _square(n):
+    # Diagonally dominant so inverses and eliminations are well conditioned
+    return (_rng().standard_normal((n, n)) + n * np.eye(n)).tolist()
+
+
+def _regression(n, d=1):
+    rng = _rng()
+    X = rng.uniform(0, 10, (n, d))
+    return X.tolist(), (X @ np.arange(1, d + 1) + rng.normal(0, 1, n)).tolist()
+
+
+def _classification(n):
+    from math_engine.feature_logic import generate_classification_data
+    np.random.seed(0)
+    X, y = generate_classification_data(n, pattern='linear')
+    return X.tolist(), y.tolist()
+
+
+def _network(hidden):
+    from math_engine.neural_logic import initialize_network
+    network = initialize_network(input_size=2, hidden_size=hidden)
+    return network['W1'], network['b1'], network['W2'], network['b2']
+
+
+EIGEN_MATRICES = {
+    'symmetric': [[2.0, 1.0], [1.0, 2.0]],
+    'real': [[4.0, 1.0], [2.0, 3.0]],
+    'complex': [[0.0, -1.0], [1.0, 0.0]],
+}
+
+
+# --- Cases: name -> (module, function, sizes, setup(size) -> (args, kwargs)) ---
+# Setup runs outside the timed region. Inputs are plain lists, as they arrive
+# from request JSON, so list-to-array conversion is part of the measurement.
+
+CASES = {
+    'calculate_vector_properties': (
+        'vector_logic', 'calculate_vector_properties', [3, 1000, 100000, 1000000],
+        lambda n: ((_rng().standard_normal(n).tolist(), _rng().standard_normal(n).tolist()), {})),
+    'calculate_vector_properties_batch': (
+        'vector_logic', 'calculate_vector_properties_batch', [10, 1000, 10000, 100000],
+        lambda n: ((_rng().standard_normal((n, 3)).tolist(), _rng().standard_normal((n, 3)).tolist()), {})),
+    'matrix_operations.multiply': (
+        'matrix_logic', 'matrix_operations', [2, 50, 200, 500],
+        lambda n: (('multiply', _square(n), _square(n)), {})),
+    'matrix_operations.inverse': (
+        'matrix_logic', 'matrix_operations', [2, 50, 200, 500],
+        lambda n: (('inverse', _square(n)), {})),
+    'apply_transform': (
+        'transform_logic', 'apply_transform', ['triangle', 'square', 'grid'],
+        lambda shape: (([[1.5, 0.5], [0.0, 1.0]], shape), {})),
+    'transform_pipeline': (
+        'transform_logic', 'transform_pipeline', [10, 60, 240],
+        lambda frames: (([{'rotate': 45}, [[1.0, 1.0], [0.0, 1.0]]], 'grid', frames, 101, 'sequential'), {})),
+    # The step log is one row-operation descriptor per step: O(n^2) of them
+    'solve_system': (
+        'solver_logic', 'solve_system', [2, 10, 50, 100],
+        lambda n: ((_square(n), _rng().standard_normal(n).tolist()), {})),
+    # The visualizer only supports 2x2 matrices; sweep the eigenvalue kinds
+    'calculate_eigen': (
+        'eigen_logic', 'calculate_eigen', ['symmetric', 'real', 'complex'],
+        lambda kind: ((EIGEN_MATRICES[kind],), {})),
+    'gradient_descent': (
+        'gradient_logic', 'gradient_descent', [50, 500, 5000, 10000],
+        lambda steps: ((0.0, 0.01, steps, 'complex'), {})),
+    'forward_pass': (
+        'neural_logic', 'forward_pass', [3, 64, 512, 2048],
+        lambda hidden: (([1.0, 1.0], *_network(hidden)), {})),
+    'batch_forward_pass': (
+        'neural_logic', 'batch_forward_pass', [1, 100, 1000, 5000],
+        lambda n: ((_rng().standard_normal((n, 2)).tolist(), *_network(3)), {})),
+    'perform_pca': (
+        'pca_logic', 'perform_pca', [100, 1000, 10000, 50000],
+        lambda n: ((_rng().standard_normal((n, 3)).tolist(), 2), {})),
+    'train_classifier.logistic': (
+        'feature_logic', 'train_classifier', [100, 1000, 5000, 20000],
+        lambda n: ((*_classification(n), 'logistic'), {})),
+    'train_classifier.svm': (
+        'feature_logic', 'train_classifier', [100, 500, 1000, 2000],
+        lambda n: ((*_classification(n), 'svm', 'rbf'), {})),
+    'apply_convolution': (
+        'convolution_logic', 'apply_convolution', [64, 128, 256, 512],
+        lambda n: ((_rng().integers(0, 256, (n, n)).astype(np.uint8), 'gaussian_blur'), {})),
+    'train_linear_regression': (
+        'ml_model_logic', 'train_linear_regression', [100, 1000, 10000, 50000],
+        lambda n: (_regression(n), {})),
+    'train_with_iterations': (
+        'ml_model_logic', 'train_with_iterations', [100, 1000, 10000, 50000],
+        lambda n: ((*_regression(n), 50), {})),
+}
+
+
+def time_call(func, args, kwargs, repeat, min_time, first_call):
+    """
+    Best seconds per call over `repeat` rounds of at least `min_time` each.
+
+    The fastest round is the one least disturbed by other processes, which
+    makes it the most repeatable figure to gate on. `first_call` (seconds for
+    one untimed-loop call) sizes the rounds, so slow cases are not run more
+    often than needed.
+    """
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    number = max(1, int(math.ceil(min_time / max(first_call, 1e-9))))
+    rounds = timer.repeat(repeat=repeat, number=number)
+    return min(rounds) / number
+
+
+def run_case(name, repeat, min_time, quick=False, sizes=None):
+    import importlib
+    module, function, case_sizes, setup = CASES[name]
+    func = getattr(importlib.import_module(f'math_engine.{module}'), function)
+    if sizes is None:
+        sizes = case_sizes[:2] if quick else case_sizes
+    results = {}
+    for size in sizes:
+        args, kwargs = setup(size)
+        # Engine functions report bad input as {'error': ...}; timing that is meaningless
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        first_call = time.perf_counter() - started
+        if isinstance(result, dict) and 'error' in result:
+            raise ValueError(f"{name} size={size} returned an error: {result['error']}")
+        results[str(size)] = time_call(func, args, kwargs, repeat, min_time, first_call)
+        print(f'  {name} size={size}: {_fmt(results[str(size)]).strip()}', file=sys.stderr)
+    return results
+
+
+def scaling_exponents(sizes, timings):
+    """log-log slope between consecutive numeric sizes (1 = linear, 2 = quadratic)."""
+    slopes = []
+    for (a, ta), (b, tb) in zip(zip(sizes, timings), zip(sizes[1:], timings[1:])):
+        try:
+            slopes.append(math.log(tb / ta) / math.log(float(b) / float(a)))
+        except (ValueError, ZeroDivisionError):
+            slopes.append(None)
+    return slopes
+
+
+def compare(results, baseline, threshold):
+    """Return (case, size, current, baseline, ratio) for every regression."""
+    regressions = []
+    for name, timings in results.items():
+        for size, seconds in timings.items():
+            reference = baseline.get('results', {}).get(name, {}).get(size)
+            if reference and seconds > reference * (1 + threshold):
+                regressions.append((name, size, seconds, reference, seconds / reference))
+    return regressions
+
+
+def _stack():
+    return {'python': platform.python_version(), 'numpy': np.__version__}
+
+
+def stack_mismatch(baseline):
+    """Return 'name: baseline != running' for each version the baseline differs on."""
+    machine = baseline.get('machine', {})
+    return [f'{name}: {machine.get(name)} != {version}' for name, version in _stack().items()
+            if machine.get(name) != version]
+
+
+def _fmt(seconds):
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:8.1f} us'
+    if seconds < 1:
+        return f'{seconds * 1e3:8.2f} ms'
+    return f'{seconds:8.3f} s '
+
+
+def print_results(results, baseline):
+    reference = baseline.get('results', {}) if baseline else {}
+    print(f"{'case':<30} {'size':>9} {'time/call':>12} {'baseline':>12} {'ratio':>7} {'slope':>6}")
+    for name, timings in results.items():
+        sizes = list(timings)
+        slopes = [None] + scaling_exponents(sizes, [timings[s] for s in sizes])
+        for size, slope in zip(sizes, slopes):
+            base = reference.get(name, {}).get(size)
+            ratio = f'{timings[size] / base:7.2f}' if base else f"{'-':>7}"
+            base_text = _fmt(base) if base else f"{'-':>11}"
+            slope_text = f'{slope:6.2f}' if slope is not None else f"{'':>6}"
+            print(f'{name:<30} {size:>9} {_fmt(timings[size]):>12} {base_text:>12} {ratio} {slope_text}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='filters', action='append', default=[], help='only cases containing this text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before failing (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per size')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per timing round')
+    parser.add_argument('--quick', action='store_true', help='only the two smallest sizes per case')
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--allow-stack-mismatch', action='store_true',
+                        help='compare against a baseline from another Python/numpy version')
+    args = parser.parse_args()
+
+    # sklearn deprecation chatter would drown the table
+    warnings.simplefilter('ignore')
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    mismatch = stack_mismatch(baseline) if baseline else []
+    if mismatch:
+        print(f"Baseline was recorded on another stack ({'; '.join(mismatch)}).", file=sys.stderr)
+        if args.update_baseline:
+            # Timings from another stack must not survive in the new baseline
+            baseline = {}
+        elif not args.allow_stack_mismatch:
+            print('Regenerate it with --update-baseline, or pass --allow-stack-mismatch.', file=sys.stderr)
+            return 2
+
+    names = [n for n in CASES if not args.filters or any(f in n for f in args.filters)]
+    started = time.perf_counter()
+    results = {name: run_case(name, args.repeat, args.min_time, args.quick) for name in names}
+
+    print_results(results, baseline)
+    print(f'\n{len(names)} cases in {time.perf_counter() - started:.1f}s')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        merged = dict(baseline.get('results', {}))
+        for name, timings in results.items():
+            merged[name] = dict(merged.get(name, {}), **timings)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'machine': dict(_stack(), platform=platform.platform(), cpus=os.cpu_count()),
+                'results': merged
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if not baseline:
+        print('No baseline found; run with --update-baseline to create one.')
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Re-time suspects once and keep the faster figure, so a noisy
+        # neighbour during one round does not fail the gate
+        print(f'Re-timing {len(regressions)} suspected regression(s)...', file=sys.stderr)
+        for name, size, _, _, _ in regressions:
+            size_value = next(s for s in CASES[name][2] if str(s) == size)
+            retry = run_case(name, args.repeat, args.min_time, sizes=[size_value])
+            results[name][size] = min(results[name][size], retry[size])
+        regressions = compare(results, baseline, args.threshold)
+    for name, size, seconds, reference, ratio in regressions:
+        print(f'REGRESSION {name} size={size}: {_fmt(seconds).strip()} vs {_fmt(reference).strip()} ({ratio:.2f}x)')
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+        return 1
+    print(f'No regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
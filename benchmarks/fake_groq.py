@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers POST /openai/v1/chat/completions with a canned OpenAI-format reply
+after a configurable delay, so /api/chat can be load tested without an API
+key, rate limits or network variance. Streaming requests (stream=true) get
+the reply as Server-Sent Events chunks. A fraction of requests can be
+failed with an error status to exercise retries and the circuit breaker.
+
+Point the app at it with GROQ_BASE_URL (read by the groq client):
+
+    python benchmarks/fake_groq.py --port 8765 --latency-ms 400
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=fake python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = ('The gradient points uphill, so gradient descent steps in the opposite direction: '
+         '$x_{t+1} = x_t - \\eta \\nabla f(x_t)$. Try a smaller learning rate if the path oscillates.')
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'not found'}})
+
+        self.server.requests += 1
+        time.sleep(self.server.delay())
+
+        if self.server.should_fail():
+            self.server.errors += 1
+            return self._send_json(self.server.error_status, {
+                'error': {'message': 'injected failure', 'type': 'internal_server_error'}
+            })
+
+        if body.get('stream'):
+            return self._send_stream(body)
+
+        words = REPLY.split(' ')
+        self._send_json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': REPLY},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': _approx_tokens(body), 'completion_tokens': len(words),
+                      'total_tokens': _approx_tokens(body) + len(words)}
+        })
+
+    def _send_stream(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        try:
+            for i, word in enumerate(REPLY.split(' ')):
+                chunk = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': body.get('model', 'fake'),
+                    'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word},
+                                 'finish_reason': None}]
+                }
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(self.server.token_delay)
+            self.wfile.write(b'data: [DONE]\n\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.cancelled += 1
+        self.close_connection = True
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _approx_tokens(body):
+    return sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=300, jitter_ms=100, token_ms=10, error_rate=0.0, error_status=503):
+        super().__init__(address, FakeGroqHandler)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.fail_next = 0
+        self.requests = 0
+        self.cancelled = 0
+        self.errors = 0
+
+    def should_fail(self):
+        # fail_next forces the next N requests to fail, for deterministic tests
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return True
+        return random.random() < self.error_rate
+
+    def delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_fake_groq(port=0, **options):
+    """Start the fake API in a background thread; returns the server."""
+    server = FakeGroqServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, name='fake-groq', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=300, help='mean time to first byte')
+    parser.add_argument('--jitter-ms', type=float, default=100, help='uniform +/- jitter on the latency')
+    parser.add_argument('--token-ms', type=float, default=10, help='delay between streamed chunks')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests to fail')
+    parser.add_argument('--error-status', type=int, default=503, help='status code of injected failures')
+    args = parser.parse_args()
+
+    server = FakeGroqServer(('127.0.0.1', args.port), args.latency_ms, args.jitter_ms, args.token_ms,
+                            args.error_rate, args.error_status)
+    print(f'Fake Groq API on {server.base_url} (GROQ_BASE_URL={server.base_url})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+"""
+End-to-end load test with the traffic mix of the visualizers.
+
+Client threads replay a weighted mix of the /api/* calls the pages make
+(parameters drawn from the ranges the templates allow), plus /api/chat
+answered by a local fake of the Groq API. Reports throughput, latency
+percentiles and error rates per route, and the CPU time and RSS of the
+server process tree.
+
+Either point it at a running server:
+
+    python benchmarks/load_test.py --url http://127.0.0.1:8080
+
+or let it start gunicorn for each workers x threads configuration:
+
+    python benchmarks/load_test.py --configs 1x8,2x4,4x2 --duration 30 --concurrency 16
+
+In --configs mode the fake Groq API is started automatically and the server
+gets GROQ_BASE_URL pointing at it; extra server settings can be passed with
+--env (e.g. --env ENGINE_EXECUTOR=process).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_groq import start_fake_groq  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE_KB = (os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096) // 1024
+
+
+# --- Traffic mix ---
+
+def _vector():
+    return [random.randint(-5, 5) for _ in range(3)]
+
+
+def _matrix(n=2):
+    return [[random.randint(-5, 5) for _ in range(n)] for _ in range(n)]
+
+
+def _dataset(n):
+    X = [[random.uniform(0, 10)] for _ in range(n)]
+    y = [3 * row[0] + random.gauss(0, 2) for row in X]
+    return X, y
+
+
+def _classification(n):
+    X = [[random.gauss(-1, 1), random.gauss(-1, 1)] for _ in range(n // 2)]
+    X += [[random.gauss(1, 1), random.gauss(1, 1)] for _ in range(n - n // 2)]
+    return X, [0] * (n // 2) + [1] * (n - n // 2)
+
+
+def _train_model():
+    X, y = _dataset(random.randint(50, 300))
+    return {'X': X, 'y': y}
+
+
+def _train_iterative():
+    X, y = _dataset(random.randint(50, 300))
+    return {'X': X, 'y': y, 'n_iterations': 50}
+
+
+def _train_classifier():
+    X, y = _classification(random.randint(50, 300))
+    return {'X': X, 'y': y, 'classifier_type': random.choice(['logistic', 'svm'])}
+
+
+CHAT_QUESTIONS = [
+    'Why is my gradient descent diverging?',
+    'What does an eigenvector represent?',
+    'How do I read the PCA explained variance?',
+    'What is the dot product used for?',
+]
+
+# (weight, method, path, body factory)
+TRAFFIC_MIX = [
+    (10, 'POST', '/api/calculate_vectors', lambda: {'v1': _vector(), 'v2': _vector()}),
+    (8, 'POST', '/api/calculate_matrices', lambda: {
+        'operation': random.choice(['determinant', 'inverse', 'transpose', 'multiply']),
+        'm1': _matrix(), 'm2': _matrix()}),
+    (6, 'POST', '/api/transform', lambda: {
+        'matrix': _matrix(), 'shape': random.choice(['square', 'triangle', 'grid'])}),
+    (6, 'POST', '/api/solve_system', lambda: {'A': _matrix(3), 'b': _vector()}),
+    (6, 'POST', '/api/calculate_eigen', lambda: {'matrix': _matrix()}),
+    (10, 'POST', '/api/gradient_descent', lambda: {
+        'start_x': random.choice([-2, 0, 1, 5]), 'learning_rate': random.choice([0.01, 0.05, 0.1, 0.5]),
+        'steps': random.randint(10, 200), 'function_type': random.choice(['quadratic', 'complex', 'ravine'])}),
+    (6, 'POST', '/api/neural_forward', lambda: {'inputs': [random.random(), random.random()], 'activation': 'relu'}),
+    (6, 'POST', '/api/pca_analyze', lambda: {
+        'data_type': random.choice(['ellipse', 'diagonal', 'circular', '3d']),
+        'n_points': random.randint(50, 500), 'n_components': random.randint(1, 3)}),
+    (6, 'POST', '/api/generate_classification', lambda: {
+        'n_samples': random.randint(50, 300), 'pattern': random.choice(['linear', 'circular', 'moons', 'blobs']),
+        'separation': 2.0, 'noise': 0.5}),
+    (5, 'POST', '/api/train_classifier', _train_classifier),
+    (5, 'POST', '/api/apply_filter', lambda: {
+        'image_type': random.choice(['checkerboard', 'gradient', 'circle', 'lines']),
+        'kernel_type': random.choice(['edge_detect', 'sharpen', 'blur', 'gaussian_blur', 'sobel_x'])}),
+    (6, 'POST', '/api/generate_dataset', lambda: {
+        'dataset_type': random.choice(['linear', 'quadratic', 'sine']),
+        'n_samples': random.randint(50, 300), 'noise': random.randint(1, 30)}),
+    (5, 'POST', '/api/train_model', _train_model),
+    (5, 'POST', '/api/train_iterative', _train_iterative),
+    (5, 'POST', '/api/chat', lambda: {
+        'message': random.choice(CHAT_QUESTIONS), 'module': random.choice(['gradient', 'eigen', 'pca', 'vectors']),
+        'context': {'page_title': 'Module'}, 'history': []}),
+]
+
+
+def pick_request(mix):
+    total = sum(weight for weight, *_ in mix)
+    point = random.uniform(0, total)
+    for weight, method, path, body in mix:
+        point -= weight
+        if point <= 0:
+            return method, path, body()
+    return mix[-1][1], mix[-1][2], mix[-1][3]()
+
+
+# --- Load generation ---
+
+def _client_loop(host, port, mix, stop_at, record):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while time.perf_counter() < stop_at:
+        method, path, body = pick_request(mix)
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            data = response.read()
+            ok = response.status < 400
+            if path == '/api/chat' and ok:
+                ok = json.loads(data).get('success', False)
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            ok, status = False, 'conn'
+        record(path, time.perf_counter() - started, ok, status)
+    conn.close()
+
+
+def run_load(url, duration, concurrency, mix=TRAFFIC_MIX, warmup=0.0):
+    """Drive the server at `url`; returns per-route and total statistics."""
+    parsed = urllib.parse.urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    if warmup:
+        _run_clients(host, port, mix, warmup, concurrency, lambda *a: None)
+
+    samples = {}
+    lock = threading.Lock()
+
+    def record(path, seconds, ok, status):
+        with lock:
+            samples.setdefault(path, []).append((seconds, ok, status))
+
+    elapsed = _run_clients(host, port, mix, duration, concurrency, record)
+    return summarize(samples, elapsed)
+
+
+def _run_clients(host, port, mix, duration, concurrency, record):
+    stop_at = time.perf_counter() + duration
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_client_loop, args=(host, port, mix, stop_at, record), daemon=True)
+               for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _stats(entries, elapsed):
+    latencies = sorted(seconds for seconds, _, _ in entries)
+    errors = sum(1 for _, ok, _ in entries if not ok)
+    return {
+        'requests': len(entries),
+        'rps': len(entries) / elapsed if elapsed else 0.0,
+        'error_rate': errors / len(entries) if entries else 0.0,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def summarize(samples, elapsed):
+    everything = [entry for entries in samples.values() for entry in entries]
+    return {
+        'seconds': elapsed,
+        'total': _stats(everything, elapsed),
+        'routes': {path: _stats(entries, elapsed) for path, entries in sorted(samples.items())},
+    }
+
+
+# --- Server process accounting (Linux /proc) ---
+
+def _proc_stat(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # fields[0] is state (field 3); utime/stime are fields 14/15, rss is 24
+    return {'ppid': int(fields[1]), 'cpu': (int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+            'rss_mb': int(fields[21]) * PAGE_SIZE_KB / 1024}
+
+
+def process_tree(root_pid):
+    """Stats for root_pid and all its descendants, keyed by pid."""
+    stats = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                stats[int(entry)] = _proc_stat(entry)
+            except (OSError, ValueError, IndexError):
+                pass
+    tree, frontier = {}, [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        if pid in stats:
+            tree[pid] = stats[pid]
+            frontier.extend(child for child, s in stats.items() if s['ppid'] == pid)
+    return tree
+
+
+class ResourceSampler:
+    """Samples CPU time and RSS of a server process tree while load runs."""
+
+    def __init__(self, root_pid, interval=0.5):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.cpu = {}        # pid -> last seen cumulative CPU seconds
+        self.cpu_start = {}  # pid -> CPU seconds when first seen
+        self.peak_rss = {}   # pid -> peak RSS MB
+        self.peak_total_rss = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        self.cpu_seconds = sum(self.cpu[pid] - self.cpu_start[pid] for pid in self.cpu)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        tree = process_tree(self.root_pid)
+        for pid, stat in tree.items():
+            self.cpu_start.setdefault(pid, stat['cpu'])
+            self.cpu[pid] = stat['cpu']
+            self.peak_rss[pid] = max(self.peak_rss.get(pid, 0.0), stat['rss_mb'])
+        self.peak_total_rss = max(self.peak_total_rss, sum(s['rss_mb'] for s in tree.values()))
+
+
+# --- Server management for --configs ---
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, env, ready_timeout=120):
+    port = _free_port()
+    command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--threads', str(threads), '--timeout', '120', 'app:app']
+    # Server logs go to a file: an unread pipe fills up and blocks the workers
+    log = tempfile.NamedTemporaryFile(prefix=f'gunicorn-{workers}x{threads}-', suffix='.log', delete=False)
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    proc.log_path = log.name
+    deadline = time.time() + ready_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            with open(log.name) as f:
+                raise RuntimeError(f'gunicorn exited: {f.read()[-2000:]}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/ready')
+            if conn.getresponse().status == 200:
+                return proc, f'http://127.0.0.1:{port}'
+        except OSError:
+            pass
+        time.sleep(0.25)
+    stop_server(proc)
+    raise RuntimeError(f'server with {workers}x{threads} did not become ready')
+
+
+def stop_server(proc):
+    # SIGINT is gunicorn's quick shutdown; SIGTERM waits for keep-alive clients
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_config(spec, args, fake_url):
+    workers, threads = (int(n) for n in spec.lower().split('x'))
+    env = dict(os.environ, GROQ_BASE_URL=fake_url, GROQ_API_KEY=os.environ.get('GROQ_API_KEY', 'fake'))
+    # Debug mode lets exceptions escape to gunicorn, which answers keep-alive
+    # clients with a body of unknown length; measure the production setup
+    env.setdefault('ENVIRONMENT', 'production')
+    env.update(dict(item.split('=', 1) for item in args.env))
+    proc, url = start_server(workers, threads, env)
+    try:
+        sampler = ResourceSampler(proc.pid)
+        if args.warmup:
+            run_load(url, args.warmup, args.concurrency)
+        sampler.start()
+        result = run_load(url, args.duration, args.concurrency)
+        sampler.stop()
+    finally:
+        stop_server(proc)
+    result['config'] = spec
+    result['server_log'] = proc.log_path
+    result['cpu_seconds'] = sampler.cpu_seconds
+    result['cpu_utilization'] = sampler.cpu_seconds / result['seconds']
+    result['peak_rss_mb'] = sampler.peak_total_rss
+    result['peak_rss_per_process_mb'] = {str(pid): round(mb, 1) for pid, mb in sampler.peak_rss.items()}
+    return result
+
+
+def print_result(result):
+    title = result.get('config', result.get('url', ''))
+    total = result['total']
+    print(f"\n== {title}: {total['requests']} requests in {result['seconds']:.1f}s, "
+          f"{total['rps']:.1f} req/s, errors {total['error_rate']:.2%}")
+    if 'server_log' in result:
+        print(f"   server log: {result['server_log']}")
+    if 'cpu_seconds' in result:
+        print(f"   server CPU {result['cpu_seconds']:.1f}s ({result['cpu_utilization']:.2f} cores), "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB over {len(result['peak_rss_per_process_mb'])} processes")
+    print(f"   {'route':<32} {'reqs':>6} {'req/s':>7} {'err':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for path, s in list(result['routes'].items()) + [('TOTAL', total)]:
+        print(f"   {path:<32} {s['requests']:>6} {s['rps']:>7.1f} {s['error_rate']:>6.1%} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='existing server to test (skips --configs)')
+    parser.add_argument('--configs', default='1x8', help='comma separated WORKERSxTHREADS to start with gunicorn')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of unmeasured load first')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--env', action='append', default=[], help='KEY=VALUE for the started servers')
+    parser.add_argument('--groq-latency-ms', type=float, default=300, help='fake Groq API latency')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = []
+    if args.url:
+        result = run_load(args.url, args.duration, args.concurrency, warmup=args.warmup)
+        result['url'] = args.url
+        print_result(result)
+        results.append(result)
+    else:
+        fake = start_fake_groq(latency_ms=args.groq_latency_ms)
+        for spec in args.configs.split(','):
+            result = run_config(spec.strip(), args, fake.base_url)
+            print_result(result)
+            results.append(result)
+        fake.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
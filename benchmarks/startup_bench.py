@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark: import time and memory per module.
+
+Every measurement runs in a fresh interpreter so nothing is already cached in
+sys.modules. For each target we report the wall time of the import, the RSS
+added by it and the total RSS afterwards (median over --repeat runs).
+
+Usage:
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --repeat 5 --json startup.json
+    python benchmarks/startup_bench.py app "app:PRELOAD_ENGINE_MODULES=all"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_TARGETS = [
+    'numpy',
+    'flask',
+    'scipy.ndimage',
+    'sklearn.svm',
+    'groq',
+    'math_engine.vector_logic',
+    'math_engine.matrix_logic',
+    'math_engine.transform_logic',
+    'math_engine.solver_logic',
+    'math_engine.eigen_logic',
+    'math_engine.gradient_logic',
+    'math_engine.neural_logic',
+    'math_engine.pca_logic',
+    'math_engine.feature_logic',
+    'math_engine.convolution_logic',
+    'math_engine.ml_model_logic',
+    'chatbot',
+    'app',
+    'app:PRELOAD_ENGINE_MODULES=all',
+]
+
+# Runs inside the child interpreter
+PROBE = r'''
+import importlib, json, sys, time
+
+def rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+before = rss_kb()
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+after = rss_kb()
+print(json.dumps({'seconds': elapsed, 'rss_delta_kb': after - before, 'rss_kb': after}))
+'''
+
+
+def measure(target, repeat):
+    """Import target in `repeat` fresh interpreters and return median stats."""
+    module, _, env_spec = target.partition(':')
+    env = dict(os.environ)
+    env.setdefault('GROQ_API_KEY', 'benchmark')
+    for assignment in filter(None, env_spec.split(',')):
+        key, _, value = assignment.partition('=')
+        env[key] = value
+
+    samples = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-c', PROBE, module],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            return {'target': target, 'error': proc.stderr.strip().splitlines()[-1]}
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    return {
+        'target': target,
+        'seconds': statistics.median(s['seconds'] for s in samples),
+        'rss_delta_mb': statistics.median(s['rss_delta_kb'] for s in samples) / 1024,
+        'rss_mb': statistics.median(s['rss_kb'] for s in samples) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', help='module[:ENV=value,...] to measure')
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per target')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    results = [measure(target, args.repeat) for target in (args.targets or DEFAULT_TARGETS)]
+
+    print(f"{'target':<45} {'import s':>9} {'+RSS MB':>9} {'RSS MB':>9}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['target']:<45} error: {r['error']}")
+        else:
+            print(f"{r['target']:<45} {r['seconds']:>9.3f} {r['rss_delta_mb']:>9.1f} {r['rss_mb']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
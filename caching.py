@@ -0,0 +1,121 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+from flask import jsonify, make_response, request
+
+from array_codec import negotiate_encoding
+from json_provider import request_precision
+from math_engine.lru import LRUCache
+
+
+# --- Response cache for deterministic API routes ---
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+DEFAULT_RESPONSE_TTL = 300
+
+response_cache = LRUCache(max_bytes=RESPONSE_CACHE_MAX_BYTES)
+
+# Per-endpoint hit/miss counters (the LRU keeps the global ones)
+_route_stats = {}
+_route_stats_lock = threading.Lock()
+
+
+def _count(endpoint, outcome):
+    with _route_stats_lock:
+        stats = _route_stats.setdefault(endpoint, {'hits': 0, 'misses': 0, 'not_modified': 0})
+        stats[outcome] += 1
+
+
+def request_cache_key():
+    """
+    Content address for the current request.
+
+    Route + canonical JSON body (sorted keys, no whitespace) + the negotiated
+    response encoding and float precision, hashed with SHA-256.
+    """
+    body = request.get_json(silent=True)
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    mimetype, float_dtype = negotiate_encoding()
+    precision = str(request_precision() or 'full')
+    material = '\n'.join([request.method, request.path, canonical, mimetype or 'json', float_dtype, precision])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def cached_response(ttl=DEFAULT_RESPONSE_TTL):
+    """
+    Cache a deterministic route's response keyed on its request content.
+
+    Successful responses are stored as bytes in the shared byte-bounded LRU.
+    Every response (hit or miss) carries an ETag so clients can revalidate
+    with If-None-Match and get a 304 back.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            key = request_cache_key()
+            entry = response_cache.get(key)
+
+            if entry is None:
+                _count(request.endpoint, 'misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha256(body).hexdigest()[:32]
+                response_cache.set(key, (body, response.mimetype, etag, tuple(response.vary)), ttl=ttl, size=len(body))
+                response.set_etag(etag)
+                response.headers['X-Cache'] = 'MISS'
+            else:
+                _count(request.endpoint, 'hits')
+                body, mimetype, etag, vary = entry
+                response = make_response(body)
+                response.mimetype = mimetype
+                response.vary.update(vary)
+                response.set_etag(etag)
+                response.headers['X-Cache'] = 'HIT'
+
+            response.cache_control.max_age = ttl
+            # Werkzeug's make_conditional only handles GET/HEAD, our API is POST
+            if request.if_none_match.contains_weak(response.get_etag()[0]):
+                _count(request.endpoint, 'not_modified')
+                response.status_code = 304
+                response.set_data(b'')
+            return response
+
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    with _route_stats_lock:
+        routes = {endpoint: dict(stats) for endpoint, stats in _route_stats.items()}
+    return dict(response_cache.stats(), routes=routes)
+
+
+def metrics_samples():
+    """Response cache counters for the /metrics endpoint."""
+    stats = response_cache.stats()
+    yield 'response_cache_entries', 'gauge', 'Entries in the response cache.', {}, stats['entries']
+    yield 'response_cache_bytes', 'gauge', 'Bytes held by the response cache.', {}, stats['bytes']
+    yield 'response_cache_evictions_total', 'counter', 'Response cache evictions.', {}, stats['evictions']
+    with _route_stats_lock:
+        routes = {endpoint: dict(counts) for endpoint, counts in _route_stats.items()}
+    for endpoint, counts in routes.items():
+        for outcome, value in counts.items():
+            yield ('response_cache_requests_total', 'counter', 'Response cache lookups by outcome.',
+                   {'endpoint': endpoint, 'outcome': outcome}, value)
+
+
+def create_cache_routes(app):
+    """Add response cache inspection routes to Flask app"""
+
+    @app.route('/api/cache/stats', methods=['GET'])
+    def api_cache_stats():
+        return jsonify(cache_stats())
@@ -0,0 +1,159 @@
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from caching import LRUCache
+
+# 'memory' keeps sessions per worker process; 'sqlite' shares them between
+# the workers of one host through a database file
+CHAT_SESSION_BACKEND = os.environ.get('CHAT_SESSION_BACKEND', 'memory')
+CHAT_SESSION_DB = os.environ.get('CHAT_SESSION_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 'chat_sessions.db'))
+CHAT_SESSION_MAX = int(os.environ.get('CHAT_SESSION_MAX', 10000))
+CHAT_SESSION_TTL = int(os.environ.get('CHAT_SESSION_TTL', 2 * 3600))
+# Messages kept per session (user and assistant turns count separately)
+CHAT_SESSION_MESSAGES = int(os.environ.get('CHAT_SESSION_MESSAGES', 10))
+# Longest stored message, in characters; the prompt builder clips further
+CHAT_SESSION_MESSAGE_CHARS = 2000
+
+SESSION_ID = re.compile(r'^[\w-]{8,64}$')
+
+
+class InvalidSessionId(ValueError):
+    status_code = 400
+
+
+def validate_session_id(session_id):
+    if not isinstance(session_id, str) or not SESSION_ID.match(session_id):
+        raise InvalidSessionId('session_id must be 8-64 letters, digits, "_" or "-"')
+    return session_id
+
+
+def new_session():
+    return {'history': [], 'context': {}}
+
+
+def append_turn(session, user_message, response):
+    """Add a question/answer pair, keeping the last CHAT_SESSION_MESSAGES messages."""
+    session['history'].extend([
+        {'role': 'user', 'content': user_message[:CHAT_SESSION_MESSAGE_CHARS]},
+        {'role': 'assistant', 'content': response[:CHAT_SESSION_MESSAGE_CHARS]},
+    ])
+    del session['history'][:-CHAT_SESSION_MESSAGES]
+    return session
+
+
+class MemorySessionStore:
+    """
+    Sessions in this process, in an LRU bounded by count with a TTL.
+
+    Sessions are copied in and out, like the SQLite store's JSON round trip,
+    so concurrent requests of one session never mutate each other's dict.
+    """
+
+    def __init__(self, max_sessions=CHAT_SESSION_MAX, ttl=CHAT_SESSION_TTL):
+        self._cache = LRUCache(max_entries=max_sessions, default_ttl=ttl)
+
+    def get(self, session_id):
+        session = self._cache.get(session_id)
+        return copy.deepcopy(session) if session is not None else None
+
+    def save(self, session_id, session):
+        self._cache.set(session_id, copy.deepcopy(session))
+
+    def delete(self, session_id):
+        return self._cache.delete(session_id)
+
+    def stats(self):
+        stats = self._cache.stats()
+        return {'backend': 'memory', 'sessions': stats['entries'], 'max_sessions': stats['max_entries'],
+                'evictions': stats['evictions'], 'expirations': stats['expirations']}
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite file shared by the workers on one host.
+
+    Each thread keeps its own connection. Expired rows and rows beyond
+    max_sessions (least recently updated first) are pruned every
+    `prune_every` saves, so the table stays bounded without a sweeper thread.
+    """
+
+    def __init__(self, path=CHAT_SESSION_DB, max_sessions=CHAT_SESSION_MAX, ttl=CHAT_SESSION_TTL, prune_every=100):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._saves = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        with self._connection() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS chat_sessions '
+                       '(id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)')
+            db.execute('CREATE INDEX IF NOT EXISTS chat_sessions_updated ON chat_sessions (updated)')
+
+    def _connection(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            'SELECT data FROM chat_sessions WHERE id = ? AND updated > ?',
+            (session_id, time.time() - self.ttl)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, session):
+        with self._connection() as db:
+            db.execute('INSERT OR REPLACE INTO chat_sessions (id, data, updated) VALUES (?, ?, ?)',
+                       (session_id, json.dumps(session, separators=(',', ':')), time.time()))
+        with self._lock:
+            self._saves += 1
+            prune = self._saves % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def delete(self, session_id):
+        with self._connection() as db:
+            return db.execute('DELETE FROM chat_sessions WHERE id = ?', (session_id,)).rowcount > 0
+
+    def prune(self):
+        with self._connection() as db:
+            removed = db.execute('DELETE FROM chat_sessions WHERE updated <= ?', (time.time() - self.ttl,)).rowcount
+            removed += db.execute(
+                'DELETE FROM chat_sessions WHERE id IN (SELECT id FROM chat_sessions '
+                'ORDER BY updated DESC LIMIT -1 OFFSET ?)', (self.max_sessions,)).rowcount
+        self.evictions += removed
+        return removed
+
+    def stats(self):
+        count = self._connection().execute('SELECT COUNT(*) FROM chat_sessions').fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count, 'max_sessions': self.max_sessions,
+                'evictions': self.evictions}
+
+
+def create_store(backend=CHAT_SESSION_BACKEND):
+    if backend == 'sqlite':
+        return SQLiteSessionStore()
+    if backend != 'memory':
+        raise ValueError(f"Unknown CHAT_SESSION_BACKEND '{backend}' (expected 'memory' or 'sqlite')")
+    return MemorySessionStore()
+
+
+store = create_store()
+
+
+def metrics_samples():
+    """Chat session store counters for the /metrics endpoint."""
+    stats = store.stats()
+    yield 'chat_sessions', 'gauge', 'Chat sessions held by the session store.', {}, stats['sessions']
+    yield 'chat_session_evictions_total', 'counter', 'Chat sessions evicted or pruned.', {}, stats['evictions']
@@ -1,14 +1,24 @@
+import functools
+import hashlib
+import math
 import os
-from groq import Groq
+import re
+import threading
+import unicodedata
 from flask import jsonify, request
 from dotenv import load_dotenv
 from datetime import datetime
 
+from array_codec import encode_stream
+from caching import LRUCache
+from chat_sessions import InvalidSessionId, append_turn, new_session, store as session_store, validate_session_id
+from llm_client import LLM_TIMEOUT, LLMUnavailable, llm
+import retrieval
+from speculation import SPECULATION_ENABLED, Speculator
+
 # Load environment variables
 load_dotenv()
 
-# Initialize Groq client
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
 
 # Vector store for module documentation (simple in-memory for free tier)
 MODULE_KNOWLEDGE = {
@@ -134,54 +144,322 @@ Learning objectives:
 - Overfitting detection"""
 }
 
+# --- Response cache for repeated questions ---
+# Students on the same module send the suggested questions verbatim, so
+# first-turn answers are cached per module, normalized question and a coarse
+# fingerprint of what the page shows.
+
+CHAT_CACHE_ENABLED = os.environ.get('CHAT_CACHE_ENABLED', '1') != '0'
+CHAT_CACHE_MAX_ENTRIES = int(os.environ.get('CHAT_CACHE_MAX_ENTRIES', 2000))
+CHAT_CACHE_TTL = int(os.environ.get('CHAT_CACHE_TTL', 6 * 3600))
+# Longer conversations get answers that depend on the history; skip the cache
+CHAT_CACHE_MAX_HISTORY = int(os.environ.get('CHAT_CACHE_MAX_HISTORY', 0))
+
+chat_cache = LRUCache(max_entries=CHAT_CACHE_MAX_ENTRIES, default_ttl=CHAT_CACHE_TTL)
+_bypasses = 0
+_bypasses_lock = threading.Lock()
+
+
+def normalize_question(text):
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip(' ?!.')
+
+
+def _bucket(value):
+    """One significant digit, so nearby slider values share an entry."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if value == 0 or not math.isfinite(value):
+        return str(value)
+    return f'{value:.0e}'
+
+
+def context_fingerprint(context):
+    """
+    Coarse summary of the page state that can change an answer.
+
+    Timestamps and the recent-action log are left out; numeric parameters
+    (learning rate, iterations...) are bucketed to one significant digit.
+    """
+    if not context:
+        return ''
+    parts = [str(context.get('page_title', ''))]
+    for key in sorted(context):
+        if key in ('module', 'page_title', 'timestamp', 'recent_actions'):
+            continue
+        parts.append(f'{key}={_bucket(context[key])}')
+    return '|'.join(parts)
+
+
+def chat_cache_key(user_message, current_module, context):
+    material = '\n'.join([str(current_module), normalize_question(user_message), context_fingerprint(context)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _cacheable(conversation_history):
+    if not CHAT_CACHE_ENABLED:
+        return False
+    return len(conversation_history or []) <= CHAT_CACHE_MAX_HISTORY
+
+
+def chat_cache_stats():
+    with _bypasses_lock:
+        bypasses = _bypasses
+    return dict(chat_cache.stats(), bypasses=bypasses, enabled=CHAT_CACHE_ENABLED,
+                speculation=speculator.stats())
+
+
+def metrics_samples():
+    """Chat cache counters for the /metrics endpoint."""
+    stats = chat_cache_stats()
+    yield 'chat_cache_entries', 'gauge', 'Entries in the chat response cache.', {}, stats['entries']
+    yield 'chat_cache_evictions_total', 'counter', 'Chat response cache evictions.', {}, stats['evictions']
+    for outcome in ('hits', 'misses', 'bypasses'):
+        yield ('chat_cache_requests_total', 'counter', 'Chat response cache lookups by outcome.',
+               {'outcome': outcome}, stats[outcome])
+    speculation = stats['speculation']
+    for outcome in ('queued', 'generated', 'used', 'cached', 'duplicate', 'dropped', 'cancelled', 'expired',
+                    'busy', 'claimed', 'failed'):
+        yield ('chat_speculation_jobs_total', 'counter', 'Speculative answer jobs by outcome.',
+               {'outcome': outcome}, speculation[outcome])
+    yield 'chat_speculation_queue_depth', 'gauge', 'Speculative answer jobs waiting.', {}, speculation['queue_depth']
+
+
+# --- Speculative answers for suggested questions ---
+# Students click the first-turn suggestions most of the time, so once they
+# are shown their answers are generated in the background into the chat
+# cache. Only spare upstream capacity is used: a job is skipped unless at
+# least two call slots are free, leaving one for real questions.
+
+_speculative_keys = LRUCache(max_entries=1024)
+
+
+def _speculate(key, user_message, current_module, context):
+    try:
+        result = generate_chatbot_response(user_message, current_module, context, [])
+    except LLMUnavailable:
+        return False
+    if result.get("success"):
+        chat_cache.set(key, result["response"])
+        _speculative_keys.set(key, True)
+    return result.get("success", False)
+
+
+speculator = Speculator(_speculate, chat_cache.peek, has_capacity=lambda: llm.idle_slots() >= 2)
+
+
+def speculate_suggestions(owner, suggestions, current_module, context):
+    """Queue answers for suggested first-turn questions; returns the number queued."""
+    if not (SPECULATION_ENABLED and CHAT_CACHE_ENABLED):
+        return 0
+    jobs = []
+    for suggestion in suggestions:
+        key = chat_cache_key(suggestion, current_module, context)
+        jobs.append((key, (key, suggestion, current_module, context)))
+    return speculator.submit(owner, jobs)
+
+
+def _cached_answer(key):
+    """Cached answer for key, waiting for a speculative job already computing it."""
+    cached = chat_cache.get(key)
+    if cached is None and speculator.wait(key, LLM_TIMEOUT):
+        cached = chat_cache.get(key)
+    if cached is not None and _speculative_keys.delete(key):
+        speculator.record_used()
+    return cached
+
+
 def get_chatbot_response(user_message, current_module=None, context=None, conversation_history=None):
-    """Generate AI response using Groq API with enhanced context awareness"""
-    
-    # Build enhanced context-aware system prompt
-    system_prompt = f"""You are a concise AI math tutor. Keep responses SHORT and DIRECT unless asked for details.
+    """
+    Generate AI response, from the chat cache when the question was seen before.
 
-CURRENT CONTEXT:
-- Module: {current_module or 'Homepage'}
-- User is viewing: {context.get('page_title', 'Dashboard')}
-- Recent actions: {context.get('recent_actions', 'Just opened page')}
+    Only first-turn questions (history up to CHAT_CACHE_MAX_HISTORY messages)
+    are looked up and stored, and only successful answers are stored.
+    """
+    global _bypasses
+    context = context or {}
+    if not _cacheable(conversation_history):
+        with _bypasses_lock:
+            _bypasses += 1
+        return generate_chatbot_response(user_message, current_module, context, conversation_history)
+
+    key = chat_cache_key(user_message, current_module, context)
+    cached = _cached_answer(key)
+    if cached is not None:
+        return {
+            "response": cached,
+            "success": True,
+            "cached": True,
+            "context": {
+                "module": current_module,
+                "timestamp": datetime.now().isoformat()
+            }
+        }
+
+    result = generate_chatbot_response(user_message, current_module, context, conversation_history)
+    if result.get("success"):
+        chat_cache.set(key, result["response"])
+    return result
+
+
+# --- Prompt building ---
+# Everything the client sends is bounded: context is reduced to a few known
+# fields, history turns are clipped, and the whole prompt is kept inside
+# CHAT_PROMPT_TOKEN_BUDGET tokens.
+
+CHAT_PROMPT_TOKEN_BUDGET = int(os.environ.get('CHAT_PROMPT_TOKEN_BUDGET', 1200))
+CHAT_HISTORY_MESSAGES = int(os.environ.get('CHAT_HISTORY_MESSAGES', 5))
+CHAT_HISTORY_TURN_TOKENS = int(os.environ.get('CHAT_HISTORY_TURN_TOKENS', 150))
+# Notes retrieved from the docs index: how many chunks, and their token cap
+CHAT_RETRIEVAL_TOP_K = int(os.environ.get('CHAT_RETRIEVAL_TOP_K', 3))
+CHAT_RETRIEVAL_TOKENS = int(os.environ.get('CHAT_RETRIEVAL_TOKENS', 300))
+
+# Context fields that go into the prompt, with their character limits
+CONTEXT_FIELDS = {
+    'page_title': 60,
+    'recent_actions': 120,
+    'learning_rate': 12,
+    'iterations': 12,
+}
+
+SYSTEM_RULES = """You are a concise AI math tutor. Keep responses SHORT and DIRECT unless asked for details.
 
 RESPONSE RULES:
 1. Be CONCISE - 2-3 sentences max unless user asks "explain in detail" or "tell me more"
 2. Use LaTeX for math: $x^2$ or $$E=mc^2$$
 3. Focus on what user is CURRENTLY doing
 4. Suggest next actions based on context
-5. Only elaborate when explicitly asked
+5. Only elaborate when explicitly asked"""
+
+
+def count_tokens(text):
+    """
+    Approximate token count: about four characters per token.
+
+    Close enough for English and LaTeX on Llama tokenizers, and free to
+    compute; the budget has headroom for the difference.
+    """
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text, max_tokens):
+    """Clip text to about max_tokens, preferring a sentence or word boundary."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    clipped = text[:max(0, max_tokens * 4 - 1)]
+    sentence_end = max(clipped.rfind('. '), clipped.rfind('.\n'))
+    if sentence_end > len(clipped) // 2:
+        clipped = clipped[:sentence_end + 1]
+    elif ' ' in clipped:
+        clipped = clipped[:clipped.rfind(' ')]
+    return clipped + '…'
+
+
+@functools.lru_cache(maxsize=len(MODULE_KNOWLEDGE) + 1)
+def system_prefix(module):
+    """Static part of the system prompt for a module (rules + module notes)."""
+    return f"""{SYSTEM_RULES}
 
 MODULE CONTEXT:
-{MODULE_KNOWLEDGE.get(current_module, "General platform knowledge")}
+{MODULE_KNOWLEDGE.get(module, "General platform knowledge")}"""
+
+
+def compact_context(context):
+    """Whitelisted context fields as one short line."""
+    parts = []
+    for field, limit in CONTEXT_FIELDS.items():
+        value = context.get(field)
+        if value in (None, ''):
+            continue
+        parts.append(f'{field}={str(value)[:limit]}')
+    return ', '.join(parts) or 'No specific context'
+
+
+def retrieved_notes(question, module, max_tokens=CHAT_RETRIEVAL_TOKENS):
+    """Top docs chunks for the question, minus the module notes already in the prompt."""
+    if CHAT_RETRIEVAL_TOP_K <= 0 or max_tokens <= 0:
+        return ''
+    index = retrieval.get_index(MODULE_KNOWLEDGE)
+    notes = []
+    for _, chunk in index.search(question, CHAT_RETRIEVAL_TOP_K + 1, module):
+        if chunk.source == 'MODULE_KNOWLEDGE' and chunk.module == module:
+            continue
+        note = truncate_tokens(f'[{chunk.title}] {chunk.text}', max_tokens)
+        max_tokens -= count_tokens(note)
+        if max_tokens < 0 or len(notes) == CHAT_RETRIEVAL_TOP_K:
+            break
+        notes.append(note)
+    return '\n'.join(f'- {note}' for note in notes)
+
+
+def build_messages(user_message, current_module=None, context=None, conversation_history=None):
+    """
+    Chat messages for the Groq API: system prompt, recent history, question.
+
+    The system prompt and question always go in (the question clipped if it
+    alone would blow the budget); history fills what is left, newest first,
+    each turn clipped to CHAT_HISTORY_TURN_TOKENS. The system prompt carries
+    the docs chunks most relevant to the question.
+    """
+    context = context if isinstance(context, dict) else {}
+    module = current_module if current_module in MODULE_KNOWLEDGE else None
+
+    notes = retrieved_notes(user_message, module)
+    notes = f"""
+
+RELEVANT NOTES:
+{notes}""" if notes else ''
+
+    system_prompt = f"""{system_prefix(module)}{notes}
+
+CURRENT CONTEXT:
+- Module: {module or 'Homepage'}
+- User state: {compact_context(context)}"""
+
+    budget = CHAT_PROMPT_TOKEN_BUDGET - count_tokens(system_prompt)
+    user_message = truncate_tokens(user_message, max(budget // 2, 1))
+    budget -= count_tokens(user_message)
+
+    history = []
+    for msg in reversed((conversation_history or [])[-CHAT_HISTORY_MESSAGES:]):
+        if not isinstance(msg, dict):
+            continue
+        role = msg.get("role") if msg.get("role") in ("user", "assistant") else "user"
+        content = truncate_tokens(str(msg.get("content", "")), CHAT_HISTORY_TURN_TOKENS)
+        cost = count_tokens(content)
+        if cost > budget:
+            break
+        budget -= cost
+        history.append({"role": role, "content": content})
 
-USER STATE:
-{context if context else "No specific context"}"""
-    
-    # Build conversation messages with history
     messages = [{"role": "system", "content": system_prompt}]
-    
-    # Add conversation history if provided (last 5 messages for context)
-    if conversation_history:
-        for msg in conversation_history[-5:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-    
-    # Add current user message
+    messages.extend(reversed(history))
     messages.append({"role": "user", "content": user_message})
-    
+    return messages
+
+
+def _completion(messages, stream=False):
+    params = {
+        "temperature": 0.7,
+        "max_tokens": 300  # Reduced for concise responses
+    }
+    if stream:
+        return llm.stream_chat(messages, **params)
+    return llm.chat(messages, **params)
+
+
+def generate_chatbot_response(user_message, current_module=None, context=None, conversation_history=None):
+    """Generate AI response using Groq API with enhanced context awareness"""
+    messages = build_messages(user_message, current_module, context, conversation_history)
+
     try:
         # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=300,  # Reduced for concise responses
-            stream=False
-        )
-        
+        chat_completion = _completion(messages)
+
         return {
             "response": chat_completion.choices[0].message.content,
             "success": True,
@@ -190,29 +468,186 @@ USER STATE:
                 "timestamp": datetime.now().isoformat()
             }
         }
+    except LLMUnavailable:
+        # Busy, circuit open or out of time: the route answers 503/504
+        raise
     except Exception as e:
         return {
             "response": f"Error: {str(e)}",
             "success": False
         }
 
+def iter_chatbot_response(user_message, current_module=None, context=None, conversation_history=None):
+    """
+    Yield the answer as it is generated, for the streaming chat endpoint.
+
+    Frames:
+        {'event': 'token', 'content': text}      - one per upstream chunk
+        {'event': 'done', 'response': full text, 'context': {...}}
+
+    A cached answer comes back as a single token frame. Closing the
+    generator (client disconnect) closes the upstream HTTP stream, so Groq
+    stops generating tokens nobody will read. Upstream errors propagate and
+    become an 'error' frame in encode_stream.
+    """
+    global _bypasses
+    context = context or {}
+    key = None
+    if _cacheable(conversation_history):
+        key = chat_cache_key(user_message, current_module, context)
+        cached = _cached_answer(key)
+        if cached is not None:
+            yield {'event': 'token', 'content': cached}
+            yield _done_frame(cached, current_module, cached=True)
+            return
+    else:
+        with _bypasses_lock:
+            _bypasses += 1
+
+    messages = build_messages(user_message, current_module, context, conversation_history)
+    stream = _completion(messages, stream=True)
+    parts = []
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                parts.append(content)
+                yield {'event': 'token', 'content': content}
+    finally:
+        # Releases the upstream connection and the LLM client slot
+        stream.close()
+
+    response = ''.join(parts)
+    if key is not None and response:
+        chat_cache.set(key, response)
+    yield _done_frame(response, current_module)
+
+
+def _done_frame(response, current_module, cached=False):
+    frame = {
+        'event': 'done',
+        'response': response,
+        'success': True,
+        'context': {
+            'module': current_module,
+            'timestamp': datetime.now().isoformat()
+        }
+    }
+    if cached:
+        frame['cached'] = True
+    return frame
+
+
+def _prepend(first, frames):
+    try:
+        yield first
+        yield from frames
+    finally:
+        frames.close()
+
+
+def _load_session(data):
+    """
+    Session id, stored session, context and history for a chat request.
+
+    With a session_id the server keeps the conversation, so clients send only
+    the new message, plus context when the page state changed. An explicit
+    'history' in the request still wins, for clients that manage their own.
+    """
+    session_id = data.get('session_id')
+    if not session_id:
+        return None, None, data.get('context', {}), data.get('history', [])
+
+    validate_session_id(session_id)
+    session = session_store.get(session_id) or new_session()
+    if isinstance(data.get('context'), dict):
+        # Only the whitelisted fields are worth keeping
+        session['context'] = {k: v for k, v in data['context'].items() if k in CONTEXT_FIELDS}
+    history = data['history'] if 'history' in data else list(session['history'])
+    return session_id, session, session['context'], history
+
+
+def _record_turn(frames, session_id, session, user_message):
+    """
+    Pass stream frames through, saving the turn once the answer is complete.
+
+    The 'done' frame of a turn that started a new (or expired) session says
+    so with 'new_session', for the client to resend its page context.
+    """
+    new = not session['history']
+    try:
+        for frame in frames:
+            if frame.get('event') == 'done' and frame.get('success'):
+                session_store.save(session_id, append_turn(session, user_message, frame['response']))
+                if new:
+                    frame = dict(frame, new_session=True)
+            yield frame
+    finally:
+        frames.close()
+
+
 def create_chat_routes(app):
     """Add chatbot routes to Flask app"""
+
+    @app.errorhandler(LLMUnavailable)
+    def llm_unavailable(e):
+        response = jsonify({"response": str(e), "success": False, "error": str(e)})
+        response.status_code = e.status_code
+        if e.retry_after is not None:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response
     
+    @app.errorhandler(InvalidSessionId)
+    def invalid_session_id(e):
+        return jsonify({"error": str(e)}), e.status_code
+
     @app.route('/api/chat', methods=['POST'])
     def chat():
         data = request.json
         user_message = data.get('message', '')
         current_module = data.get('module', None)
-        context = data.get('context', {})
-        conversation_history = data.get('history', [])
-        
+
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
-        
+
+        session_id, session, context, conversation_history = _load_session(data)
         result = get_chatbot_response(user_message, current_module, context, conversation_history)
+        if session_id and result.get("success"):
+            if not session['history']:
+                result = dict(result, new_session=True)
+            session_store.save(session_id, append_turn(session, user_message, result["response"]))
         return jsonify(result)
     
+    @app.route('/api/chat/stream', methods=['POST'])
+    def chat_stream():
+        """Same as /api/chat, relaying tokens as they arrive (SSE or NDJSON)"""
+        data = request.json
+        user_message = data.get('message', '')
+
+        if not user_message:
+            return jsonify({"error": "No message provided"}), 400
+
+        session_id, session, context, conversation_history = _load_session(data)
+        frames = iter_chatbot_response(user_message, data.get('module', None), context, conversation_history)
+        if session_id:
+            frames = _record_turn(frames, session_id, session, user_message)
+        # Wait for the first token here, so a busy or unavailable tutor is
+        # reported with a proper status code instead of an error frame, and
+        # any other failure gets the same JSON answer as /api/chat
+        try:
+            first = next(frames)
+        except LLMUnavailable:
+            raise
+        except StopIteration:
+            return jsonify({"response": "Error: no response was generated", "success": False,
+                            "error": "no response was generated"})
+        except Exception as e:
+            frames.close()
+            return jsonify({"response": f"Error: {str(e)}", "success": False, "error": str(e)})
+        return encode_stream(_prepend(first, frames))
+
     @app.route('/api/chat/suggest', methods=['POST'])
     def suggest_actions():
         """Generate dynamic context-aware suggestions"""
@@ -323,10 +758,34 @@ def create_chat_routes(app):
         else:
             # No conversation yet, show module-specific suggestions
             suggestions = base_suggestions[:3]
-        
+
+        # First-turn suggestions have cacheable answers: precompute them so a
+        # click is served from the cache. Follow-ups depend on the history.
+        if not has_conversation:
+            session_id = data.get('session_id')
+            if session_id:
+                validate_session_id(session_id)
+            context = data.get('context') if isinstance(data.get('context'), dict) else {}
+            context = {k: v for k, v in context.items() if k in CONTEXT_FIELDS}
+            speculate_suggestions(session_id or request.remote_addr, suggestions, module, context)
+
         return jsonify({"suggestions": suggestions})
     
+    @app.route('/api/chat/index/stats', methods=['GET'])
+    def chat_index_stats():
+        """Size of the docs retrieval index (builds it if needed)"""
+        index = retrieval.get_index(MODULE_KNOWLEDGE)
+        return jsonify(dict(index.stats(), build_seconds=round(retrieval.build_seconds, 4)))
+
+    @app.route('/api/chat/cache/stats', methods=['GET'])
+    def chat_cache_stats_route():
+        return jsonify(chat_cache_stats())
+
     @app.route('/api/chat/clear', methods=['POST'])
     def clear_chat():
         """Clear chat session"""
-        return jsonify({"success": True, "message": "Chat session cleared"})
+        data = request.get_json(silent=True) or {}
+        cleared = False
+        if data.get('session_id'):
+            cleared = session_store.delete(validate_session_id(data['session_id']))
+        return jsonify({"success": True, "cleared": cleared, "message": "Chat session cleared"})
@@ -0,0 +1,269 @@
+import atexit
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+
+from math_engine import preload_engine_modules
+from math_engine.instrumentation import add_phases, phase, start_recording, stop_recording
+
+# Backend selection: 'inline' runs everything in the request thread,
+# 'process' sends the designated heavy engine calls to a process pool.
+ENGINE_EXECUTOR = os.environ.get('ENGINE_EXECUTOR', 'inline')
+ENGINE_POOL_WORKERS = int(os.environ.get('ENGINE_POOL_WORKERS', os.cpu_count() or 2))
+ENGINE_TASK_TIMEOUT = float(os.environ.get('ENGINE_TASK_TIMEOUT', 30))
+ENGINE_QUEUE_TIMEOUT = float(os.environ.get('ENGINE_QUEUE_TIMEOUT', 5))
+ENGINE_MAX_RESULT_BYTES = int(os.environ.get('ENGINE_MAX_RESULT_BYTES', 32 * 1024 * 1024))
+ENGINE_MAX_TASKS_PER_CHILD = int(os.environ.get('ENGINE_MAX_TASKS_PER_CHILD', 200))
+# How long a fresh worker may take to import the engine and pick up a task
+WORKER_START_TIMEOUT = 60
+
+# CPU-bound engine functions that are worth the pickling round trip.
+# Everything else (vector/matrix helpers, sample data generators) stays inline.
+HEAVY_TASKS = {
+    'math_engine.feature_logic.train_classifier',
+    'math_engine.pca_logic.perform_pca',
+    'math_engine.ml_model_logic.train_linear_regression',
+    'math_engine.ml_model_logic.train_with_iterations',
+    'math_engine.blocked_logic.blocked_operation',
+}
+
+# Heavy tasks expected to run far longer than ENGINE_TASK_TIMEOUT: out-of-core
+# operations over arrays of tens of thousands of rows take minutes
+TASK_TIMEOUTS = {
+    'math_engine.blocked_logic.blocked_operation': float(os.environ.get('ENGINE_BLOCKED_TASK_TIMEOUT', 3600)),
+}
+
+
+class EngineExecutionError(Exception):
+    """Base error for engine calls that could not complete."""
+    status_code = 500
+
+
+class EngineTimeout(EngineExecutionError):
+    status_code = 504
+
+
+class EngineResultTooLarge(EngineExecutionError):
+    status_code = 413
+
+
+class EngineOverloaded(EngineExecutionError):
+    status_code = 503
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def _run_task(func, args, kwargs, max_result_bytes):
+    """
+    Worker-side entry point.
+
+    The result is pickled here so its size can be checked before anything
+    crosses the process boundary. The engine's phases are recorded here too
+    and returned with the payload, for the parent to merge into the request.
+    """
+    start_recording()
+    try:
+        with phase('compute'):
+            result = func(*args, **kwargs)
+        with phase('serialize'):
+            payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        phases = stop_recording()
+    if len(payload) > max_result_bytes:
+        raise EngineResultTooLarge(
+            f'Result of {task_name(func)} is {len(payload)} bytes (limit {max_result_bytes})'
+        )
+    return payload, phases
+
+
+class InlineBackend:
+    """Run every engine call in the calling thread."""
+
+    def run(self, func, args, kwargs):
+        return func(*args, **kwargs)
+
+    def shutdown(self):
+        pass
+
+
+def _worker_main(conn, max_tasks):
+    """
+    Worker process loop: run up to max_tasks tasks received on conn, then exit.
+
+    Every task is acknowledged with 'started' before it runs, so the parent
+    starts the task's timeout only once a worker is actually on it.
+    """
+    preload_engine_modules('all')
+    for _ in range(max_tasks):
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        conn.send(('started', None))
+        try:
+            result = _run_task(*task)
+        except Exception as e:
+            try:
+                conn.send(('error', e))
+            except Exception:
+                # The exception itself does not pickle
+                conn.send(('error', EngineExecutionError(f'{type(e).__name__}: {e}')))
+        else:
+            conn.send(('done', result))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, max_tasks):
+        self.conn, child_conn = context.Pipe()
+        # Daemonic, so workers never outlive the web process
+        self.process = context.Process(target=_worker_main, args=(child_conn, max_tasks), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_left = max_tasks
+        self.killed = False
+
+    def kill(self):
+        # A runaway computation must not keep burning a core
+        self.killed = True
+        self.process.terminate()
+        self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+    def retire(self):
+        # Exits by itself after its last task
+        self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+
+
+class ProcessPoolBackend:
+    """
+    Bounded pool of worker processes for CPU-bound engine calls.
+
+    - at most max_workers tasks run and at most max_workers more wait;
+      further callers get EngineOverloaded after queue_timeout seconds
+    - each task has a wall-clock timeout (timeout, or its TASK_TIMEOUTS
+      entry), counted from when a worker starts it; on expiry only that
+      worker is killed and replaced
+    - workers are recycled after max_tasks_per_child tasks to cap memory growth
+    - results larger than max_result_bytes are rejected in the worker
+    """
+
+    def __init__(self, max_workers=ENGINE_POOL_WORKERS, timeout=ENGINE_TASK_TIMEOUT,
+                 queue_timeout=ENGINE_QUEUE_TIMEOUT, max_result_bytes=ENGINE_MAX_RESULT_BYTES,
+                 max_tasks_per_child=ENGINE_MAX_TASKS_PER_CHILD):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.max_result_bytes = max_result_bytes
+        self.max_tasks_per_child = max_tasks_per_child
+        self._slots = threading.BoundedSemaphore(max_workers * 2)
+        # spawn keeps Flask and the request threads out of the workers
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _new_worker(self):
+        # Called with the lock held; every (re)started worker imports the
+        # heavy engine modules up front instead of on its first task
+        worker = _Worker(self._context, self.max_tasks_per_child)
+        self._workers.add(worker)
+        return worker
+
+    def _checkout(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                for _ in range(self.max_workers):
+                    self._idle.put(self._new_worker())
+        # The slots admit at most max_workers waiters, each behind a task
+        # bounded by its own timeout
+        return self._idle.get()
+
+    def _checkin(self, worker):
+        if not worker.killed and worker.tasks_left > 0:
+            self._idle.put(worker)
+            return
+        if not worker.killed:
+            worker.retire()
+        with self._lock:
+            self._workers.discard(worker)
+            if self._closed:
+                return
+            replacement = self._new_worker()
+        self._idle.put(replacement)
+
+    def _call(self, worker, func, args, kwargs):
+        name = task_name(func)
+        timeout = TASK_TIMEOUTS.get(name, self.timeout)
+        try:
+            worker.conn.send((func, args, kwargs, self.max_result_bytes))
+            worker.tasks_left -= 1
+            # A fresh worker may still be importing the engine modules
+            if not worker.conn.poll(WORKER_START_TIMEOUT):
+                worker.kill()
+                raise EngineTimeout(f'Worker for {name} did not start within {WORKER_START_TIMEOUT:g}s')
+            worker.conn.recv()
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                raise EngineTimeout(f'{name} exceeded {timeout:g}s')
+            status, value = worker.conn.recv()
+        except (EOFError, OSError):
+            worker.kill()
+            raise EngineExecutionError(f'Worker process for {name} crashed')
+        if status == 'error':
+            raise value
+        return value
+
+    def run(self, func, args, kwargs):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise EngineOverloaded('Server is busy, please retry shortly.')
+        try:
+            worker = self._checkout()
+            try:
+                payload, phases = self._call(worker, func, args, kwargs)
+            finally:
+                self._checkin(worker)
+        finally:
+            self._slots.release()
+        # Whatever is left of the parent's 'compute' is queueing and transfer
+        add_phases(phases)
+        with phase('serialize'):
+            return pickle.loads(payload)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, set()
+        for worker in workers:
+            worker.kill()
+
+
+_inline = InlineBackend()
+_heavy = ProcessPoolBackend() if ENGINE_EXECUTOR == 'process' else _inline
+atexit.register(_heavy.shutdown)
+
+
+def run_engine(func, *args, **kwargs):
+    """
+    Call a math_engine function on the configured backend.
+
+    Functions listed in HEAVY_TASKS go to the heavy backend (a process pool
+    when ENGINE_EXECUTOR=process), everything else runs inline.
+    """
+    backend = _heavy if task_name(func) in HEAVY_TASKS else _inline
+    with phase('compute'):
+        return backend.run(func, args, kwargs)
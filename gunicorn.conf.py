@@ -0,0 +1,9 @@
+# Gunicorn settings; bind/workers/threads are given on the command line.
+
+def post_worker_init(worker):
+    """Warm each worker up before it is reported ready on /ready."""
+    from app import app
+    from warmup import WARMUP_ENABLED, start_warmup
+
+    if WARMUP_ENABLED:
+        start_warmup(app)
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None
+
+# Significant digits for floats in JSON responses. Unset means full
+# round-trip precision; routes and requests can ask for fewer.
+JSON_PRECISION = int(os.environ['JSON_PRECISION']) if os.environ.get('JSON_PRECISION') else None
+MAX_PRECISION = 17
+
+
+def json_precision(digits):
+    """
+    Default significant-digit limit for a route's JSON response.
+
+    Clients can still override it per request with ?precision=N or an
+    X-Precision header.
+    """
+    def decorator(view):
+        view.json_precision = digits
+        return view
+    return decorator
+
+
+def request_precision():
+    """
+    Significant digits for the current response, or None for full precision.
+
+    Resolution order: ?precision / X-Precision on the request, then the
+    route's json_precision, then JSON_PRECISION.
+    """
+    if not has_request_context():
+        return JSON_PRECISION
+    if 'json_precision' in g:
+        return g.json_precision
+
+    value = request.args.get('precision') or request.headers.get('X-Precision')
+    digits = None
+    if value:
+        try:
+            digits = int(value)
+        except ValueError:
+            digits = None
+    if digits is None:
+        view = current_app.view_functions.get(request.endpoint)
+        digits = getattr(view, 'json_precision', JSON_PRECISION)
+    if digits is not None:
+        digits = min(max(digits, 1), MAX_PRECISION)
+        if digits == MAX_PRECISION:
+            digits = None
+    g.json_precision = digits
+    return digits
+
+
+def round_significant(value, digits):
+    """
+    Round floats in a result to `digits` significant digits.
+
+    Float arrays are rounded in one vectorised pass; the rounded values are
+    the doubles closest to short decimals, so their shortest repr is short.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind != 'f':
+            return value
+        return _round_array(value, digits)
+    if isinstance(value, (float, np.floating)):
+        if not np.isfinite(value) or value == 0:
+            return value
+        return float(f'{value:.{digits}g}')
+    if isinstance(value, dict):
+        return {k: round_significant(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [round_significant(v, digits) for v in value]
+    return value
+
+
+def _round_array(arr, digits):
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        magnitude = np.floor(np.log10(np.abs(arr)))
+        magnitude = np.where(np.isfinite(magnitude), magnitude, 0)
+        # Divide by 10**n rather than multiply by 10**-n: powers of ten above
+        # one are exact, so the result is the double nearest the decimal
+        shift = digits - 1 - magnitude
+        scale = 10.0 ** np.abs(shift)
+        rounded = np.where(shift >= 0, np.round(arr * scale) / scale, np.round(arr / scale) * scale)
+    return np.where(np.isfinite(rounded), rounded, arr)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serialises NumPy data without going through lists.
+
+    With orjson installed, C-contiguous ndarrays and NumPy scalars are
+    written straight from their buffers. Without it, encoding falls back to
+    the stdlib encoder with a tolist() conversion. Non-finite floats are
+    written as null so the output stays valid JSON.
+    """
+
+    def dumps(self, obj, **kwargs):
+        digits = request_precision()
+        if digits is not None:
+            obj = round_significant(obj, digits)
+        if orjson is None:
+            kwargs.setdefault('default', self.default)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('allow_nan', True)
+            return super().dumps(_sanitize(obj), **kwargs)
+        return self._orjson_dumps(obj, indent='indent' in kwargs).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        digits = request_precision()
+        if digits is not None:
+            obj = round_significant(obj, digits)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        body = self._orjson_dumps(obj, indent=indent) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+    def _orjson_dumps(self, obj, indent=False):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_orjson_default, option=option)
+
+
+def _orjson_default(obj):
+    # orjson hands over arrays it cannot read directly (non-contiguous,
+    # float16, object dtype...) and anything else it does not know
+    if isinstance(obj, np.ndarray):
+        if not obj.flags.c_contiguous:
+            return np.ascontiguousarray(obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return DefaultJSONProvider.default(obj)
+
+
+def _sanitize(value):
+    """Stdlib fallback: convert NumPy values and replace NaN/Infinity with None."""
+    if isinstance(value, dict):
+        return {k: _sanitize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_sanitize(v) for v in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'f' and not np.isfinite(value).all():
+            value = np.where(np.isfinite(value), value, None)
+        return value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
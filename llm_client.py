@@ -0,0 +1,271 @@
+import contextlib
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = os.environ.get('LLM_MODEL', 'llama-3.3-70b-versatile')
+# Deadline for one chat call, retries included
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 20))
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 3))
+# Concurrent upstream calls per worker. Keep it below the gunicorn thread
+# count so chat can never hold every thread the math routes need.
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', 0.5))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BASE_DELAY = float(os.environ.get('LLM_RETRY_BASE_DELAY', 0.25))
+# Consecutive transient failures that open the breaker, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', 5))
+LLM_BREAKER_COOLDOWN = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+
+# Upstream statuses worth retrying; anything else (bad request, auth) is final
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMUnavailable(Exception):
+    """Base error for chat calls that could not be served."""
+    status_code = 503
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMBusy(LLMUnavailable):
+    pass
+
+
+class LLMCircuitOpen(LLMUnavailable):
+    pass
+
+
+class LLMTimeout(LLMUnavailable):
+    status_code = 504
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `threshold` transient failures in a row the breaker opens and calls
+    fail fast for `cooldown` seconds. Then a single trial call is let through
+    (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return 'open'
+        return 'half_open'
+
+    def allow(self):
+        """Raise LLMCircuitOpen unless a call may go upstream now."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_after = max(1, int(self.cooldown - (time.monotonic() - self._opened_at)) + 1)
+        raise LLMCircuitOpen('The tutor is temporarily unavailable, please retry shortly.', retry_after=retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.threshold:
+                if self._opened_at is None or self._trial_running:
+                    self.opened += 1
+                    logger.warning('LLM circuit breaker opened after %d failures', self._failures)
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+
+def _is_transient(error):
+    import groq
+    if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code in RETRY_STATUSES
+
+
+class LLMClient:
+    """
+    Upstream chat completions client shared by the worker's threads.
+
+    One Groq client over a keep-alive httpx connection pool, created on
+    first use (importing groq and building its HTTP client is a noticeable
+    part of cold start). Calls are bounded by a semaphore of their own,
+    separate from the math routes' admission slots, and wait at most
+    LLM_QUEUE_TIMEOUT for it; a saturated tutor answers 503 straight away
+    instead of tying up more request threads. Transient upstream errors are
+    retried with full-jitter backoff inside the call deadline, and feed the
+    circuit breaker.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, breaker=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.inflight = 0
+        self.calls = {'success': 0, 'error': 0, 'busy': 0, 'circuit_open': 0, 'timeout': 0}
+        self.retries = 0
+
+    def get_client(self):
+        """Return the shared Groq client, creating it on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    from groq import Groq
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(max_connections=self.max_concurrency,
+                                            max_keepalive_connections=self.max_concurrency,
+                                            keepalive_expiry=60),
+                        timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT)
+                    )
+                    # Retries are ours, so they share the deadline and the breaker
+                    self._client = Groq(api_key=os.environ.get('GROQ_API_KEY'),
+                                        http_client=http_client, max_retries=0)
+        return self._client
+
+    def chat(self, messages, **params):
+        """Blocking chat completion; returns the Groq completion object."""
+        with self._slot():
+            return self._create(messages, params, time.monotonic() + self.timeout)
+
+    def stream_chat(self, messages, **params):
+        """
+        Yield completion chunks as they arrive.
+
+        Only establishing the stream is retried; once tokens flow, a failure
+        ends the stream. The deadline covers the whole stream, and closing
+        the generator closes the upstream response.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._slot():
+            stream = self._create(messages, dict(params, stream=True), deadline)
+            try:
+                for chunk in stream:
+                    if time.monotonic() > deadline:
+                        self._count('timeout')
+                        raise LLMTimeout('The tutor took too long to answer.')
+                    yield chunk
+            finally:
+                stream.response.close()
+
+    def _create(self, messages, params, deadline):
+        params.setdefault('model', LLM_MODEL)
+        self._allow()
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._count('timeout')
+                raise LLMTimeout('The tutor took too long to answer.')
+            try:
+                result = self.get_client().chat.completions.create(messages=messages, timeout=remaining, **params)
+            except Exception as e:
+                if not _is_transient(e):
+                    # The upstream answered (bad request, auth...): it is up
+                    self.breaker.record_success()
+                    self._count('error')
+                    raise
+                self.breaker.record_failure()
+                delay = random.uniform(0, LLM_RETRY_BASE_DELAY * 2 ** attempt)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self._count('error')
+                    logger.warning('LLM call failed after %d attempt(s): %s', attempt + 1, e)
+                    raise LLMUnavailable('The tutor is unavailable, please retry shortly.', retry_after=1) from e
+                attempt += 1
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(delay)
+                self._allow()
+                continue
+            self.breaker.record_success()
+            self._count('success')
+            return result
+
+    def idle_slots(self):
+        """Upstream call slots free right now (0 while the breaker is open)."""
+        if self.breaker.state == 'open':
+            return 0
+        with self._stats_lock:
+            return self.max_concurrency - self.inflight
+
+    def _allow(self):
+        try:
+            self.breaker.allow()
+        except LLMCircuitOpen:
+            self._count('circuit_open')
+            raise
+
+    @contextlib.contextmanager
+    def _slot(self):
+        if not self._semaphore.acquire(timeout=LLM_QUEUE_TIMEOUT):
+            self._count('busy')
+            raise LLMBusy('The tutor is busy, please retry.', retry_after=1)
+        with self._stats_lock:
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._stats_lock:
+                self.inflight -= 1
+            self._semaphore.release()
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            self.calls[outcome] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {'calls': dict(self.calls), 'retries': self.retries, 'inflight': self.inflight}
+        stats.update(max_concurrency=self.max_concurrency, breaker=self.breaker.state,
+                     breaker_opened=self.breaker.opened)
+        return stats
+
+
+llm = LLMClient()
+
+
+def metrics_samples():
+    """Upstream LLM client counters for the /metrics endpoint."""
+    stats = llm.stats()
+    for outcome, value in stats['calls'].items():
+        yield 'llm_calls_total', 'counter', 'Upstream chat calls by outcome.', {'outcome': outcome}, value
+    yield 'llm_retries_total', 'counter', 'Upstream chat call retries.', {}, stats['retries']
+    yield 'llm_inflight', 'gauge', 'Upstream chat calls in progress.', {}, stats['inflight']
+    yield ('llm_circuit_open', 'gauge', 'Whether the upstream circuit breaker is open.', {},
+           0 if stats['breaker'] == 'closed' else 1)
+    yield 'llm_circuit_opened_total', 'counter', 'Times the circuit breaker opened.', {}, stats['breaker_opened']
@@ -0,0 +1,33 @@
+import importlib
+
+# Engine modules whose imports pull in scikit-learn or scipy. app.py imports
+# these lazily inside the routes that use them.
+HEAVY_ENGINE_MODULES = (
+    'convolution_logic',
+    'feature_logic',
+    'ml_model_logic',
+    'pca_logic',
+)
+
+
+def preload_engine_modules(names):
+    """
+    Import engine modules ahead of their first request.
+
+    Args:
+        names: Comma separated module names (e.g. 'pca_logic,feature_logic'),
+            'all' for every heavy module, or '' to keep everything lazy
+
+    Returns:
+        List of module names that were imported
+    """
+    if isinstance(names, str):
+        names = [n.strip() for n in names.split(',') if n.strip()]
+    if 'all' in names:
+        names = HEAVY_ENGINE_MODULES
+
+    loaded = []
+    for name in names:
+        importlib.import_module(f'math_engine.{name}')
+        loaded.append(name)
+    return loaded
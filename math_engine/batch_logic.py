@@ -0,0 +1,357 @@
+import numpy as np
+from collections import defaultdict
+
+from math_engine.vector_logic import calculate_vector_properties, calculate_vector_properties_batch
+from math_engine.matrix_logic import matrix_operations
+from math_engine.transform_logic import apply_transform, generate_shape
+from math_engine.eigen_logic import calculate_eigen
+from math_engine.neural_logic import forward_pass, initialize_network, activation_function
+
+MAX_BATCH_OPERATIONS = 2000
+
+
+def _as_float_array(value):
+    """Convert to a float array, or None if the value is not numeric/rectangular."""
+    try:
+        arr = np.array(value, dtype=float)
+    except (TypeError, ValueError):
+        return None
+    return arr
+
+
+# --- Vector properties ---
+
+def _vector_args(op):
+    return op.get('v1', [0, 0, 0]), op.get('v2', [0, 0, 0])
+
+
+def _batch_vectors(ops):
+    """
+    Vectorized calculate_vector_properties for ops sharing a dimension.
+
+    The columns from calculate_vector_properties_batch are split back into
+    per-op dicts that match the single-pair function field for field.
+    """
+    args = [_vector_args(op) for op in ops]
+    has_v2 = bool(args[0][1])
+    columns = calculate_vector_properties_batch([a[0] for a in args],
+                                                [a[1] for a in args] if has_v2 else None)
+    if "error" in columns:
+        raise ValueError(columns["error"])
+
+    mag1 = columns["v1"]["magnitude"]
+    cosines = columns["v1"]["direction_cosines"]
+    results = []
+    for idx in range(len(ops)):
+        results.append({
+            "v1": {
+                "components": args[idx][0],
+                "magnitude": float(mag1[idx]),
+                "direction_cosines": cosines[idx].tolist() if mag1[idx] != 0 else [0, 0, 0]
+            }
+        })
+
+    if not has_v2:
+        return results
+
+    mag2 = columns["v2"]["magnitude"]
+    interactions = columns["interactions"]
+    for idx, result in enumerate(results):
+        result["v2"] = {
+            "components": args[idx][1],
+            "magnitude": float(mag2[idx])
+        }
+        result["interactions"] = {
+            "dot_product": float(interactions["dot_product"][idx]),
+            "angle_degrees": float(interactions["angle_degrees"][idx]),
+            "angle_radians": float(interactions["angle_radians"][idx]),
+            "projection_v1_on_v2": interactions["projection_v1_on_v2"][idx].tolist()
+        }
+        result["addition"] = columns["addition"][idx].tolist()
+        result["subtraction"] = columns["subtraction"][idx].tolist()
+
+    return results
+
+
+def _vector_group_key(op):
+    v1_list, v2_list = _vector_args(op)
+    v1 = _as_float_array(v1_list)
+    if v1 is None or v1.ndim != 1:
+        return None
+    if v2_list:
+        v2 = _as_float_array(v2_list)
+        if v2 is None or v2.shape != v1.shape:
+            return None
+    return (v1.shape[0], bool(v2_list))
+
+
+# --- Matrix operations ---
+
+def _batch_matrices(ops, operation):
+    m1 = np.array([op['m1'] for op in ops], dtype=float)
+
+    if operation == 'determinant':
+        dets = np.linalg.det(m1)
+        results = []
+        for det in dets:
+            value = round(det, 4)
+            results.append({"value": value, "explanation": f"Determinant is {value}"})
+        return results
+
+    if operation == 'inverse':
+        # A single singular matrix makes the stacked inv raise, in which case
+        # the caller falls back to per-item evaluation for this group
+        inv = np.round(np.linalg.inv(m1), 4)
+        return [{"matrix": m.tolist()} for m in inv]
+
+    if operation == 'transpose':
+        return [{"matrix": m.tolist()} for m in np.swapaxes(m1, 1, 2)]
+
+    m2 = np.array([op['m2'] for op in ops], dtype=float)
+    if operation == 'add':
+        out = m1 + m2
+    elif operation == 'subtract':
+        out = m1 - m2
+    else:
+        out = np.matmul(m1, m2)
+    return [{"matrix": m.tolist()} for m in out]
+
+
+def _matrix_group_key(op):
+    operation = op.get('operation')
+    m1 = _as_float_array(op.get('m1'))
+    if not isinstance(operation, str) or m1 is None or m1.ndim != 2:
+        return None
+
+    if operation in ('determinant', 'inverse'):
+        if m1.shape[0] != m1.shape[1]:
+            return None
+        return (operation, m1.shape)
+    if operation == 'transpose':
+        return (operation, m1.shape)
+    if operation in ('add', 'subtract', 'multiply'):
+        if not op.get('m2'):
+            return None
+        m2 = _as_float_array(op.get('m2'))
+        if m2 is None or m2.ndim != 2:
+            return None
+        if operation == 'multiply' and m1.shape[1] != m2.shape[0]:
+            return None
+        if operation != 'multiply' and m1.shape != m2.shape:
+            return None
+        return (operation, m1.shape, m2.shape)
+    return None
+
+
+# --- Transformations ---
+
+def _batch_transforms(ops, shape_type):
+    matrices = np.array([op['matrix'] for op in ops], dtype=float)
+    points = generate_shape(shape_type)
+    original = points.tolist()
+    transformed = np.matmul(matrices, points)
+    return [{"original": original, "transformed": t.tolist()} for t in transformed]
+
+
+def _transform_group_key(op):
+    matrix = _as_float_array(op.get('matrix'))
+    shape_type = op.get('shape', 'square')
+    # Group keys must be hashable; anything but a name goes to apply_transform
+    if not isinstance(shape_type, str) or matrix is None or matrix.ndim != 2 or matrix.shape[1] != 2:
+        return None
+    return (shape_type, matrix.shape)
+
+
+# --- Eigen decomposition ---
+
+def _format_complex_array(values):
+    if np.any(values.imag != 0):
+        return [{"real": float(v.real), "imag": float(v.imag)} for v in values]
+    return [float(v) for v in values.real]
+
+
+def _batch_eigen(ops):
+    A = np.array([op['matrix'] for op in ops], dtype=float)
+    eigenvalues, eigenvectors = np.linalg.eig(A)
+
+    results = []
+    for idx in range(len(ops)):
+        w = np.asarray(eigenvalues[idx], dtype=complex)
+        v = np.asarray(eigenvectors[idx], dtype=complex)
+        # np.linalg.eig on a single real matrix only returns complex output when
+        # some eigenvalue is complex; the stacked call is complex for the whole
+        # batch, so decide per matrix to keep the single-call format
+        if np.any(w.imag != 0):
+            vectors = [[{"real": float(x.real), "imag": float(x.imag)} for x in v[:, col]] for col in range(2)]
+        else:
+            vectors = [[float(x) for x in v[:, col].real] for col in range(2)]
+        results.append({
+            "eigenvalues": _format_complex_array(w),
+            "eigenvectors": vectors,
+            "matrix": A[idx].tolist()
+        })
+    return results
+
+
+def _eigen_group_key(op):
+    A = _as_float_array(op.get('matrix'))
+    if A is None or A.shape != (2, 2):
+        return None
+    return ()
+
+
+# --- Forward passes ---
+
+def _default_network():
+    network = initialize_network()
+    return network['W1'], network['b1'], network['W2'], network['b2']
+
+
+def _forward_args(op):
+    W1 = op.get('W1')
+    if W1 is None:
+        W1, b1, W2, b2 = _default_network()
+    else:
+        b1, W2, b2 = op.get('b1'), op.get('W2'), op.get('b2')
+    return op.get('inputs', [1, 1]), W1, b1, W2, b2, op.get('activation', 'relu')
+
+
+def _batch_forward(ops, activation):
+    args = [_forward_args(op) for op in ops]
+    inputs = np.array([a[0] for a in args], dtype=float)
+    W1 = np.array([a[1] for a in args], dtype=float)
+    b1 = np.array([a[2] for a in args], dtype=float)
+    W2 = np.array([a[3] for a in args], dtype=float)
+    b2 = np.array([a[4] for a in args], dtype=float)
+
+    # (N, 1, d) @ (N, d, h) -> (N, 1, h)
+    z1 = np.matmul(inputs[:, None, :], W1) + b1
+    a1 = activation_function(z1, activation)
+    z2 = np.matmul(a1, W2) + b2
+
+    results = []
+    for idx in range(len(ops)):
+        results.append({
+            # Echo inputs with their original dtype, as forward_pass does
+            'input': np.array(args[idx][0]).reshape(-1).tolist(),
+            'hidden_pre_activation': z1[idx, 0].tolist(),
+            'hidden_activation': a1[idx, 0].tolist(),
+            'output_pre_activation': z2[idx, 0].tolist(),
+            'output': z2[idx, 0].tolist(),
+            'weights': {
+                'W1': W1[idx].tolist(),
+                'b1': b1[idx, 0].tolist(),
+                'W2': W2[idx].tolist(),
+                'b2': b2[idx, 0].tolist()
+            },
+            'activation_type': activation
+        })
+    return results
+
+
+def _forward_group_key(op):
+    inputs, W1, b1, W2, b2, activation = _forward_args(op)
+    if not isinstance(activation, str):
+        return None
+    arrays = [_as_float_array(x) for x in (inputs, W1, b1, W2, b2)]
+    if any(a is None for a in arrays):
+        return None
+    x, W1, b1, W2, b2 = arrays
+    # Only the common (1, n) bias layout is vectorized, anything unusual
+    # goes through forward_pass itself
+    if x.ndim != 1 or W1.ndim != 2 or W2.ndim != 2 or b1.ndim != 2 or b2.ndim != 2:
+        return None
+    if (x.shape[0] != W1.shape[0] or b1.shape != (1, W1.shape[1])
+            or W2.shape[0] != W1.shape[1] or b2.shape != (1, W2.shape[1])):
+        return None
+    return (activation, W1.shape, W2.shape)
+
+
+# --- Dispatch ---
+
+# op name -> (group key function, batched implementation, single-item fallback)
+OPERATIONS = {
+    'vector_properties': (
+        _vector_group_key,
+        lambda ops, key: _batch_vectors(ops),
+        lambda op: calculate_vector_properties(*_vector_args(op))
+    ),
+    'matrix': (
+        _matrix_group_key,
+        lambda ops, key: _batch_matrices(ops, key[0]),
+        lambda op: matrix_operations(op.get('operation'), op.get('m1'), op.get('m2'))
+    ),
+    'transform': (
+        _transform_group_key,
+        lambda ops, key: _batch_transforms(ops, key[0]),
+        lambda op: apply_transform(op.get('matrix'), op.get('shape', 'square'))
+    ),
+    'eigen': (
+        _eigen_group_key,
+        lambda ops, key: _batch_eigen(ops),
+        lambda op: calculate_eigen(op.get('matrix'))
+    ),
+    'forward_pass': (
+        _forward_group_key,
+        lambda ops, key: _batch_forward(ops, key[0]),
+        lambda op: forward_pass(*_forward_args(op))
+    ),
+}
+
+
+def _run_single(fallback, op):
+    try:
+        return fallback(op)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def run_batch(operations):
+    """
+    Execute many small engine operations in one call.
+
+    Operations of the same kind and shape are grouped and evaluated as one
+    stacked NumPy computation (e.g. all 2x2 eigen problems go through a single
+    np.linalg.eig call). Anything that cannot be grouped, or a group whose
+    vectorized evaluation fails, is evaluated item by item with the regular
+    single-operation function, so every result matches what the individual
+    endpoint would have returned.
+
+    Args:
+        operations: List of dicts, each with an 'op' key ('vector_properties',
+            'matrix', 'transform', 'eigen', 'forward_pass') plus the same
+            fields the corresponding endpoint accepts
+
+    Returns:
+        Dictionary with 'results' in the same order as the operations
+    """
+    if not isinstance(operations, list):
+        return {"error": "'operations' must be a list"}
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return {"error": f"At most {MAX_BATCH_OPERATIONS} operations per batch"}
+
+    results = [None] * len(operations)
+    groups = defaultdict(list)
+
+    for idx, op in enumerate(operations):
+        if not isinstance(op, dict) or op.get('op') not in OPERATIONS:
+            results[idx] = {"error": "Unknown operation type"}
+            continue
+        key_func, _, fallback = OPERATIONS[op['op']]
+        key = key_func(op)
+        if key is None:
+            results[idx] = _run_single(fallback, op)
+        else:
+            groups[(op['op'], key)].append(idx)
+
+    for (name, key), indices in groups.items():
+        _, batched, fallback = OPERATIONS[name]
+        ops = [operations[i] for i in indices]
+        try:
+            group_results = batched(ops, key)
+        except (np.linalg.LinAlgError, ValueError, FloatingPointError):
+            group_results = [_run_single(fallback, op) for op in ops]
+        for idx, result in zip(indices, group_results):
+            results[idx] = result
+
+    return {"results": results, "count": len(results)}
@@ -0,0 +1,147 @@
+import math
+import os
+import time
+
+import numpy as np
+
+# Default tile edge for blocked operations, and the memory a single
+# operation may hold in tiles at once; the tile is shrunk to fit
+BLOCKED_TILE_SIZE = int(os.environ.get('BLOCKED_TILE_SIZE', 1024))
+BLOCKED_WORKING_SET_BYTES = int(os.environ.get('BLOCKED_WORKING_SET_BYTES', 64 * 1024 * 1024))
+MIN_TILE_SIZE = 16
+
+BLOCKED_OPERATIONS = ('multiply', 'transpose', 'add', 'subtract')
+
+
+def open_array(path):
+    """Memory-map a stored .npy file read-only, as a 2D array (vectors become columns)."""
+    arr = np.load(path, mmap_mode='r', allow_pickle=False)
+    return arr[:, None] if arr.ndim == 1 else arr
+
+
+def result_shape(operation, a_shape, b_shape=None):
+    """
+    Shape of a blocked operation's result, or an error message.
+
+    Returns:
+        (shape, None) or (None, error message)
+    """
+    if operation == 'transpose':
+        return (a_shape[1], a_shape[0]), None
+    if b_shape is None:
+        return None, f"Operation '{operation}' needs a second array 'b'"
+    if operation == 'multiply':
+        if a_shape[1] != b_shape[0]:
+            return None, f'Dimension mismatch: {tuple(a_shape)} cannot multiply {tuple(b_shape)}'
+        return (a_shape[0], b_shape[1]), None
+    if operation in ('add', 'subtract'):
+        if tuple(a_shape) != tuple(b_shape):
+            return None, f'Dimension mismatch for {"addition" if operation == "add" else "subtraction"}.'
+        return tuple(a_shape), None
+    return None, f"Unknown operation '{operation}' (expected one of {', '.join(BLOCKED_OPERATIONS)})"
+
+
+def result_dtype(*arrays):
+    # Integer inputs are promoted, and nothing is computed wider than float64
+    dtype = np.result_type(*arrays, np.float32)
+    return np.dtype(np.float32) if dtype == np.float32 else np.dtype(np.float64)
+
+
+def effective_tile(tile, itemsize, tiles_held=4):
+    """Clamp the requested tile edge so `tiles_held` tiles fit the working set."""
+    limit = int(math.sqrt(BLOCKED_WORKING_SET_BYTES / (tiles_held * itemsize)))
+    return max(MIN_TILE_SIZE, min(int(tile or BLOCKED_TILE_SIZE), limit))
+
+
+def _spans(n, step):
+    return [slice(start, min(start + step, n)) for start in range(0, n, step)]
+
+
+def _blocked_multiply(a, b, out, tile):
+    # One output tile is accumulated in memory while the matching row band
+    # of a and column band of b stream through, tile by tile
+    for rows in _spans(a.shape[0], tile):
+        for cols in _spans(b.shape[1], tile):
+            acc = np.zeros((rows.stop - rows.start, cols.stop - cols.start), dtype=out.dtype)
+            for inner in _spans(a.shape[1], tile):
+                acc += np.asarray(a[rows, inner], dtype=out.dtype) @ np.asarray(b[inner, cols], dtype=out.dtype)
+            out[rows, cols] = acc
+
+
+def _blocked_transpose(a, out, tile):
+    for rows in _spans(a.shape[0], tile):
+        for cols in _spans(a.shape[1], tile):
+            out[cols, rows] = a[rows, cols].T
+
+
+def _blocked_elementwise(func, a, b, out, rows_per_band):
+    # Row bands are contiguous in a C-ordered file, so each band is one
+    # sequential read per operand and one sequential write
+    for rows in _spans(a.shape[0], rows_per_band):
+        func(a[rows], b[rows], out=out[rows], dtype=out.dtype)
+
+
+def blocked_operation(operation, a_path, b_path, out_path, tile=None):
+    """
+    Runs multiply/transpose/add/subtract over memory-mapped .npy files.
+
+    Only a few tiles are in memory at any time, so operands and results
+    can be far larger than RAM. The result is written to out_path as a
+    .npy file, which can be downloaded or used as an operand again.
+
+    Args:
+        operation: 'multiply', 'transpose', 'add' or 'subtract'
+        a_path: Path of the first operand (.npy)
+        b_path: Path of the second operand, or None for transpose
+        out_path: Path the result is written to
+        tile: Tile edge in elements (default BLOCKED_TILE_SIZE), reduced
+            to fit BLOCKED_WORKING_SET_BYTES
+
+    Returns:
+        Dictionary with the result shape and dtype, the tile used, the
+        number of tiles and the elapsed time
+    """
+    try:
+        a = open_array(a_path)
+        b = open_array(b_path) if b_path else None
+        if not all(arr.dtype.kind in 'fiu' for arr in (a, b) if arr is not None):
+            return {"error": "Arrays must have a numeric (float or integer) dtype"}
+
+        shape, error = result_shape(operation, a.shape, b.shape if b is not None else None)
+        if error:
+            return {"error": error}
+        if operation == 'transpose':
+            dtype = a.dtype.newbyteorder('=')
+        else:
+            dtype = result_dtype(*[arr.dtype for arr in (a, b) if arr is not None])
+        tile = effective_tile(tile, dtype.itemsize)
+
+        started = time.perf_counter()
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype, shape=shape)
+        try:
+            if operation == 'multiply':
+                _blocked_multiply(a, b, out, tile)
+                tiles = len(_spans(shape[0], tile)) * len(_spans(shape[1], tile)) * len(_spans(a.shape[1], tile))
+            elif operation == 'transpose':
+                _blocked_transpose(a, out, tile)
+                tiles = len(_spans(a.shape[0], tile)) * len(_spans(a.shape[1], tile))
+            else:
+                # Three bands (a, b, out) share the working set
+                rows_per_band = max(1, BLOCKED_WORKING_SET_BYTES // (3 * shape[1] * dtype.itemsize))
+                _blocked_elementwise(np.add if operation == 'add' else np.subtract, a, b, out, rows_per_band)
+                tiles = len(_spans(shape[0], rows_per_band))
+            out.flush()
+        finally:
+            del out
+
+        return {
+            "operation": operation,
+            "shape": list(shape),
+            "dtype": dtype.name,
+            "tile": tile,
+            "tiles": tiles,
+            "seconds": round(time.perf_counter() - started, 4)
+        }
+
+    except Exception as e:
+        return {"error": str(e)}
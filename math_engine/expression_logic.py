@@ -0,0 +1,602 @@
+import hashlib
+import math
+import os
+import re
+
+import numpy as np
+
+from math_engine.lru import LRUCache
+
+# Intermediate results (products, solves, inverses...) are cached by the
+# content of the operands they were computed from, so a follow-up request
+# that reuses A·B pays for it only once
+EXPRESSION_CACHE_MAX_BYTES = int(os.environ.get('EXPRESSION_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+EXPRESSION_CACHE_TTL = int(os.environ.get('EXPRESSION_CACHE_TTL', 600))
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_OPERANDS = 26
+MAX_INTERMEDIATES = 16
+
+FUNCTIONS = {'inv': 1, 'det': 1, 'logdet': 1, 'trace': 1, 'transpose': 1, 'solve': 2}
+
+TOKEN_PATTERN = re.compile(r"""\s*(?:
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<op>\^T|\^-?\d+|[-+*@/(),'])
+)""", re.X)
+
+NAME_PATTERN = re.compile(r'^[A-Za-z_]\w*$')
+
+intermediate_cache = LRUCache(max_bytes=EXPRESSION_CACHE_MAX_BYTES, default_ttl=EXPRESSION_CACHE_TTL)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+# --- Parsing ---
+# Nodes are tuples: ('var', name), ('num', value), ('add'|'sub', a, b),
+# ('neg', a), ('mul', factors), ('recip', a), ('T', a), ('pow', a, k) and
+# (function, *args) for the FUNCTIONS. Products are flattened into one
+# factor list so the planner is free to choose the multiplication order.
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_PATTERN.match(text, pos)
+        if not match:
+            raise ExpressionError(f"Unexpected character '{text[pos:].lstrip()[0]}' at position {pos}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser for:
+
+        expr    := term (('+' | '-') term)*
+        term    := unary (('*' | '@' | '/')? unary)*   (juxtaposition multiplies)
+        unary   := '-' unary | postfix
+        postfix := primary ("'" | '^T' | '^k')*
+        primary := number | name | function '(' args ')' | '(' expr ')'
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        node = self.expr()
+        if self.pos < len(self.tokens):
+            raise ExpressionError(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def take(self, expected=None):
+        if self.pos >= len(self.tokens):
+            raise ExpressionError('Unexpected end of expression')
+        kind, value = self.tokens[self.pos]
+        if expected is not None and value != expected:
+            raise ExpressionError(f"Expected '{expected}' but found '{value}'")
+        self.pos += 1
+        return kind, value
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in ('+', '-'):
+            _, op = self.take()
+            node = ('add' if op == '+' else 'sub', node, self.term())
+        return node
+
+    def term(self):
+        factors = [self.unary()]
+        while True:
+            if self.peek() in ('*', '@', '/'):
+                _, op = self.take()
+            elif self.pos < len(self.tokens) and (self.tokens[self.pos][0] != 'op' or self.peek() == '('):
+                # A'A, 2A, inv(A) b
+                op = '*'
+            else:
+                break
+            factor = self.unary()
+            factors.append(('recip', factor) if op == '/' else factor)
+        return _product(factors)
+
+    def unary(self):
+        if self.peek() == '-':
+            self.take()
+            return ('neg', self.unary())
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while self.peek() is not None and (self.peek() in ("'", '^T') or self.peek().startswith('^')):
+            _, op = self.take()
+            if op in ("'", '^T'):
+                node = ('T', node)
+            else:
+                node = ('pow', node, int(op[1:]))
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return ('num', float(value))
+        if value == '(':
+            node = self.expr()
+            self.take(')')
+            return node
+        if kind != 'name':
+            raise ExpressionError(f"Unexpected '{value}'")
+        if self.peek() != '(':
+            return ('var', value)
+        if value not in FUNCTIONS:
+            raise ExpressionError(f"Unknown function '{value}' (available: {', '.join(sorted(FUNCTIONS))})")
+        self.take('(')
+        args = [self.expr()]
+        while self.peek() == ',':
+            self.take()
+            args.append(self.expr())
+        self.take(')')
+        if len(args) != FUNCTIONS[value]:
+            raise ExpressionError(f"{value}() takes {FUNCTIONS[value]} argument(s), got {len(args)}")
+        if value == 'transpose':
+            return ('T', args[0])
+        return (value, *args)
+
+
+def parse_expression(text):
+    if not isinstance(text, str) or not text.strip():
+        raise ExpressionError('Expression must be a non-empty string')
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f'Expression is longer than {MAX_EXPRESSION_LENGTH} characters')
+    return _Parser(text).parse()
+
+
+def _product(factors):
+    flat = []
+    for factor in factors:
+        flat.extend(factor[1] if factor[0] == 'mul' else [factor])
+    return flat[0] if len(flat) == 1 else ('mul', tuple(flat))
+
+
+def format_node(node):
+    op = node[0]
+    if op == 'var':
+        return node[1]
+    if op == 'num':
+        return f'{node[1]:g}'
+    if op == 'T':
+        return f"{format_node(node[1])}'"
+    if op == 'neg':
+        return f'-{format_node(node[1])}'
+    if op == 'recip':
+        return f'1/{format_node(node[1])}'
+    if op == 'pow':
+        return f'{format_node(node[1])}^{node[2]}'
+    if op in ('add', 'sub'):
+        return f"({format_node(node[1])} {'+' if op == 'add' else '-'} {format_node(node[2])})"
+    if op == 'mul':
+        return '(' + _format_factors(node[1]) + ')'
+    return f"{op}({', '.join(format_node(arg) for arg in node[1:])})"
+
+
+def _format_factors(factors):
+    text = format_node(factors[0])
+    for previous, factor in zip(factors, factors[1:]):
+        scalar = previous[0] in ('num', 'recip') or factor[0] in ('num', 'recip')
+        text += (' * ' if scalar else ' @ ') + format_node(factor)
+    return text
+
+
+# --- Planning and evaluation ---
+
+def _operand_digest(arr):
+    material = repr(arr.shape).encode() + np.ascontiguousarray(arr).tobytes()
+    return hashlib.sha256(material).hexdigest()[:32]
+
+
+def _as_operand(name, value):
+    if not isinstance(name, str) or not NAME_PATTERN.match(name) or name in FUNCTIONS:
+        raise ExpressionError(f"Invalid operand name '{name}'")
+    try:
+        arr = np.array(value, dtype=float)
+    except (TypeError, ValueError):
+        raise ExpressionError(f"Operand '{name}' must be a number, vector or rectangular matrix")
+    if arr.ndim == 1:
+        # Vectors are columns, so A @ x works as written
+        arr = arr[:, None]
+    if arr.ndim > 2 or 0 in arr.shape:
+        raise ExpressionError(f"Operand '{name}' must be a number, vector or non-empty matrix")
+    return arr
+
+
+def _dims(shape):
+    return 'x'.join(str(d) for d in shape) or 'scalar'
+
+
+class ExpressionEvaluator:
+    """
+    Plans and evaluates parsed expressions over one set of operands.
+
+    Planning infers every shape before any arithmetic (so dimension errors
+    come back without work done) and rewrites the tree:
+      - explicit inverses inside products become solves, inv(A) @ B ->
+        solve(A, B) and B @ inv(A) -> solve(A', B')', which is cheaper and
+        numerically better than forming the inverse
+      - products are evaluated in the order found by the matrix-chain
+        dynamic program, minimizing scalar multiplications
+      - det/logdet go through slogdet, and split over square products,
+        inverses and powers instead of multiplying the matrices out
+    Every non-trivial intermediate is looked up in and stored to the shared
+    intermediate_cache under a key built from the operand digests.
+    """
+
+    def __init__(self, operands):
+        if not isinstance(operands, dict):
+            raise ExpressionError("'operands' must be an object mapping names to matrices")
+        if len(operands) > MAX_OPERANDS:
+            raise ExpressionError(f'At most {MAX_OPERANDS} operands are supported')
+        self.operands = {name: _as_operand(name, value) for name, value in operands.items()}
+        self.digests = {name: _operand_digest(arr) for name, arr in self.operands.items()}
+        self._shapes = {}
+        self._keys = {}
+        self.steps = []
+        self.multiplications = {'planned': 0, 'left_to_right': 0}
+        self.hits = 0
+        self.misses = 0
+
+    # Shapes
+
+    def shape(self, node):
+        if node not in self._shapes:
+            self._shapes[node] = self._infer_shape(node)
+        return self._shapes[node]
+
+    def _infer_shape(self, node):
+        op = node[0]
+        if op == 'num':
+            return ()
+        if op == 'var':
+            if node[1] not in self.operands:
+                raise ExpressionError(f"Unknown operand '{node[1]}'")
+            arr = self.operands[node[1]]
+            return arr.shape if arr.ndim else ()
+        if op == 'T':
+            return self.shape(node[1])[::-1]
+        if op == 'neg':
+            return self.shape(node[1])
+        if op == 'recip':
+            if self.shape(node[1]) != ():
+                raise ExpressionError(f'Can only divide by a scalar, not {format_node(node[1])}')
+            return ()
+        if op in ('add', 'sub'):
+            left, right = self.shape(node[1]), self.shape(node[2])
+            if left != right:
+                raise ExpressionError(f"Cannot {'add' if op == 'add' else 'subtract'} "
+                                      f'{format_node(node[1])} ({_dims(left)}) and '
+                                      f'{format_node(node[2])} ({_dims(right)})')
+            return left
+        if op == 'mul':
+            current, previous = None, None
+            for factor in node[1]:
+                shape = self.shape(factor)
+                if shape == ():
+                    continue
+                if current is not None and current[1] != shape[0]:
+                    raise ExpressionError(f'Dimension mismatch: {format_node(previous)} ({_dims(current)}) '
+                                          f'cannot multiply {format_node(factor)} ({_dims(shape)})')
+                current = shape if current is None else (current[0], shape[1])
+                previous = factor
+            return current or ()
+        if op == 'solve':
+            a, b = self.shape(node[1]), self.shape(node[2])
+            self._require_square(node[1], 'solve')
+            if b == () or b[0] != a[0]:
+                raise ExpressionError(f'solve: right-hand side {format_node(node[2])} ({_dims(b)}) '
+                                      f'needs {a[0]} rows')
+            return b
+        self._require_square(node[1], op)
+        if op in ('inv', 'pow'):
+            if op == 'pow' and self.shape(node[1]) == ():
+                return ()
+            return self.shape(node[1])
+        return ()  # det, logdet, trace
+
+    def _require_square(self, node, what):
+        shape = self.shape(node)
+        if shape == ():
+            if what in ('pow', 'inv'):
+                return
+            raise ExpressionError(f'{what}() needs a square matrix, got a scalar')
+        if shape[0] != shape[1]:
+            raise ExpressionError(f'{what}() needs a square matrix, {format_node(node)} is {_dims(shape)}')
+
+    # Rewriting
+
+    def plan(self, node):
+        """Return the rewritten tree for node (shapes are checked on the way)."""
+        op = node[0]
+        if op in ('var', 'num'):
+            self.shape(node)
+            return node
+        if op == 'pow':
+            base = self.plan(node[1])
+            self.shape(('pow', base, node[2]))
+            if node[2] == 1:
+                return base
+            if node[2] < 0:
+                inverse = ('inv', base if node[2] == -1 else ('pow', base, -node[2]))
+                self.shape(inverse)
+                return inverse
+            return ('pow', base, node[2])
+        if op == 'T':
+            inner = self.plan(node[1])
+            planned = inner[1] if inner[0] == 'T' else ('T', inner)
+        elif op == 'mul':
+            factors = _product([self.plan(f) for f in node[1]])
+            factors = factors[1] if factors[0] == 'mul' else (factors,)
+            scalars = [f for f in factors if self.shape(f) == ()]
+            matrices = self._rewrite_inverses([f for f in factors if self.shape(f) != ()])
+            planned = _product(scalars + matrices)
+        else:
+            planned = (op, *[self.plan(arg) if isinstance(arg, tuple) else arg for arg in node[1:]])
+        self.shape(planned)
+        return planned
+
+    def _rewrite_inverses(self, factors):
+        for i in range(len(factors) - 1, -1, -1):
+            if factors[i][0] != 'inv':
+                continue
+            a, left, right = factors[i][1], factors[:i], factors[i + 1:]
+            if right:
+                # Nothing to the right is an inverse any more
+                return self._rewrite_inverses(left + [self._checked(('solve', a, _product(right)))])
+            if left:
+                left = _product(self._rewrite_inverses(left))
+                return [self._checked(('T', ('solve', ('T', a), ('T', left))))]
+        return list(factors)
+
+    def _checked(self, node):
+        self.shape(node)
+        return node
+
+    # Cache keys
+
+    def key(self, node):
+        if node not in self._keys:
+            op = node[0]
+            if op == 'var':
+                key = self.digests[node[1]]
+            elif op == 'num':
+                key = repr(node[1])
+            elif op == 'mul':
+                key = '(' + '*'.join(self.key(f) for f in node[1]) + ')'
+            else:
+                key = f"{op}({','.join(self.key(a) if isinstance(a, tuple) else str(a) for a in node[1:])})"
+            self._keys[node] = key
+        return self._keys[node]
+
+    def _cached(self, key, node_text, shape, compute, multiplications=0):
+        value = intermediate_cache.get(key)
+        cached = value is not None
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+            value = compute()
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+                intermediate_cache.set(key, value, size=value.nbytes)
+            else:
+                intermediate_cache.set(key, value, size=8)
+        self.steps.append({
+            "step": node_text,
+            "shape": list(shape),
+            "multiplications": multiplications,
+            "cached": cached
+        })
+        return value
+
+    # Evaluation
+
+    def evaluate(self, node):
+        op = node[0]
+        if op == 'num':
+            return node[1]
+        if op == 'var':
+            arr = self.operands[node[1]]
+            return arr if arr.ndim else float(arr)
+        if op == 'T':
+            value = self.evaluate(node[1])
+            return value.T if isinstance(value, np.ndarray) else value
+        if op == 'neg':
+            return -self.evaluate(node[1])
+        if op == 'recip':
+            return 1.0 / self.evaluate(node[1])
+        if op == 'mul':
+            return self._multiply(node)
+        if op in ('det', 'logdet'):
+            sign, logabs = self.slogdet(node[1])
+            if op == 'logdet':
+                # log(det) is only real for a positive determinant
+                if sign <= 0:
+                    kind = 'zero' if sign == 0 else 'negative'
+                    raise ExpressionError(f'{format_node(node)} is undefined: the determinant is {kind}')
+                return logabs
+            return float(sign * math.exp(logabs)) if sign else 0.0
+        if op == 'trace':
+            return float(np.trace(self.evaluate(node[1])))
+
+        text, shape = format_node(node), self.shape(node)
+        if op in ('add', 'sub'):
+            return self._cached(self.key(node), text, shape,
+                                lambda: np.add(self.evaluate(node[1]), self.evaluate(node[2])) if op == 'add'
+                                else np.subtract(self.evaluate(node[1]), self.evaluate(node[2])))
+        if op == 'inv':
+            return self._cached(self.key(node), text, shape, lambda: _scalar_or(np.linalg.inv, self.evaluate(node[1])))
+        if op == 'pow':
+            return self._cached(self.key(node), text, shape,
+                                lambda: _scalar_or(lambda m: np.linalg.matrix_power(m, node[2]),
+                                                   self.evaluate(node[1]), node[2]))
+        if op == 'solve':
+            return self._cached(self.key(node), text, shape,
+                                lambda: np.linalg.solve(self.evaluate(node[1]), self.evaluate(node[2])))
+        raise ExpressionError(f"Cannot evaluate '{op}'")
+
+    def _multiply(self, node):
+        scalars = [f for f in node[1] if self.shape(f) == ()]
+        matrices = [f for f in node[1] if self.shape(f) != ()]
+        coefficient = 1.0
+        for factor in scalars:
+            coefficient *= self.evaluate(factor)
+        if not matrices:
+            return coefficient
+        product = self._chain(matrices) if len(matrices) > 1 else self.evaluate(matrices[0])
+        return product if coefficient == 1.0 else coefficient * product
+
+    def _chain(self, factors):
+        """Multiply factors in the order minimizing scalar multiplications."""
+        k = len(factors)
+        dims = [self.shape(factors[0])[0]] + [self.shape(f)[1] for f in factors]
+        cost = [[0] * k for _ in range(k)]
+        split = [[0] * k for _ in range(k)]
+        for length in range(2, k + 1):
+            for i in range(k - length + 1):
+                j = i + length - 1
+                cost[i][j] = math.inf
+                for s in range(i, j):
+                    c = cost[i][s] + cost[s + 1][j] + dims[i] * dims[s + 1] * dims[j + 1]
+                    if c < cost[i][j]:
+                        cost[i][j], split[i][j] = c, s
+
+        self.multiplications['planned'] += cost[0][k - 1]
+        self.multiplications['left_to_right'] += sum(dims[0] * dims[i] * dims[i + 1] for i in range(1, k))
+
+        def build(i, j):
+            if i == j:
+                return self.evaluate(factors[i])
+            s = split[i][j]
+            # Any grouping of factors i..j has the same value, so the key
+            # is the factor range, not the order used to compute it
+            key = '(' + '*'.join(self.key(f) for f in factors[i:j + 1]) + ')'
+            text = '(' + _format_factors(factors[i:j + 1]) + ')'
+            return self._cached(key, text, (dims[i], dims[j + 1]), lambda: build(i, s) @ build(s + 1, j),
+                                multiplications=dims[i] * dims[s + 1] * dims[j + 1])
+
+        return build(0, k - 1)
+
+    def slogdet(self, node):
+        """(sign, log|det|) of a square node, split over factors where possible."""
+        op = node[0]
+        n = self.shape(node)[0] if self.shape(node) else 1
+        if op == 'T':
+            return self.slogdet(node[1])
+        if op == 'inv':
+            sign, logabs = self.slogdet(node[1])
+            return sign, -logabs
+        if op == 'pow':
+            if node[2] == 0:
+                # A^0 is the identity even for singular A (0 * -inf is nan)
+                return 1.0, 0.0
+            sign, logabs = self.slogdet(node[1])
+            return sign ** node[2], node[2] * logabs
+        if op == 'neg':
+            sign, logabs = self.slogdet(node[1])
+            return sign * (-1) ** n, logabs
+        if op == 'mul' and all(self.shape(f) in ((), (n, n)) for f in node[1]):
+            sign, logabs = 1.0, 0.0
+            for factor in node[1]:
+                if self.shape(factor) == ():
+                    c = self.evaluate(factor)
+                    factor_sign, factor_log = np.sign(c) ** n, n * math.log(abs(c)) if c else -math.inf
+                else:
+                    factor_sign, factor_log = self.slogdet(factor)
+                sign, logabs = sign * factor_sign, logabs + factor_log
+            return (0.0, -math.inf) if sign == 0 else (float(sign), float(logabs))
+        if op == 'solve' and self.shape(node[2]) == (n, n):
+            sign_a, log_a = self.slogdet(node[1])
+            sign_b, log_b = self.slogdet(node[2])
+            return sign_a * sign_b, log_b - log_a
+        if self.shape(node) == ():
+            value = self.evaluate(node)
+            return float(np.sign(value)), math.log(abs(value)) if value else -math.inf
+        return self._cached(f'slogdet({self.key(node)})', f'slogdet({format_node(node)})', (),
+                            lambda: tuple(float(x) for x in np.linalg.slogdet(self.evaluate(node))))
+
+
+def _scalar_or(matrix_func, value, power=None):
+    if isinstance(value, np.ndarray):
+        return matrix_func(value)
+    return value ** power if power is not None else 1.0 / value
+
+
+def _as_result(value):
+    if isinstance(value, np.ndarray):
+        return {"shape": list(value.shape), "matrix": value}
+    return {"value": float(value)}
+
+
+def evaluate_expression(expression, operands, intermediates=None):
+    """
+    Evaluates a matrix expression over named operands.
+
+    The language has + - * @ (both are matrix products; a number or scalar
+    operand scales), / by a scalar, unary minus, transposes (A' or A^T),
+    integer powers (A^2, A^-1) and the functions inv, det, logdet, trace,
+    transpose and solve(A, B). Vectors are treated as columns.
+
+    Args:
+        expression: Expression text, e.g. "A @ B @ C' @ inv(D)"
+        operands: Dict of name -> number, vector or matrix (lists)
+        intermediates: Optional list of subexpressions whose values should
+            also be returned; they share the plan's cached intermediates
+
+    Returns:
+        Dictionary with the result (matrix and shape, or value), any
+        requested intermediates, the evaluation plan, multiplication counts
+        for the planned and left-to-right orders and cache hits/misses
+    """
+    try:
+        intermediates = intermediates or []
+        if not isinstance(intermediates, list) or len(intermediates) > MAX_INTERMEDIATES:
+            return {"error": f"'intermediates' must be a list of at most {MAX_INTERMEDIATES} expressions"}
+
+        evaluator = ExpressionEvaluator(operands)
+        plans = [evaluator.plan(parse_expression(text)) for text in [expression] + intermediates]
+        values = [evaluator.evaluate(plan) for plan in plans]
+
+        result = {
+            "expression": expression,
+            "result": _as_result(values[0]),
+            "plan": evaluator.steps,
+            "multiplications": evaluator.multiplications,
+            "cache": {"hits": evaluator.hits, "misses": evaluator.misses}
+        }
+        if intermediates:
+            result["intermediates"] = {text: _as_result(value) for text, value in zip(intermediates, values[1:])}
+        return result
+
+    except ExpressionError as e:
+        return {"error": str(e)}
+    except np.linalg.LinAlgError:
+        return {"error": "Matrix is singular (determinant is 0) and cannot be inverted or solved."}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def metrics_samples():
+    """Expression intermediate cache counters for the /metrics endpoint."""
+    stats = intermediate_cache.stats()
+    yield 'expression_cache_entries', 'gauge', 'Entries in the expression intermediate cache.', {}, stats['entries']
+    yield 'expression_cache_bytes', 'gauge', 'Bytes held by the expression intermediate cache.', {}, stats['bytes']
+    yield ('expression_cache_evictions_total', 'counter', 'Expression intermediate cache evictions.', {},
+           stats['evictions'])
+    for outcome in ('hits', 'misses'):
+        yield ('expression_cache_requests_total', 'counter', 'Expression intermediate cache lookups by outcome.',
+               {'outcome': outcome}, stats[outcome])
@@ -2,6 +2,7 @@ import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score
+from math_engine.instrumentation import phase
 
 def generate_classification_data(n_samples=100, separation=2.0, noise=0.5, pattern='linear'):
     """
@@ -74,8 +75,9 @@ def train_classifier(X, y, classifier_type='logistic', kernel='linear'):
     Returns:
         Dictionary with model, predictions, and decision boundary
     """
-    X = np.array(X)
-    y = np.array(y)
+    with phase('convert'):
+        X = np.array(X)
+        y = np.array(y)
     
     # Train classifier
     if classifier_type == 'logistic':
@@ -115,17 +117,17 @@ def train_classifier(X, y, classifier_type='logistic', kernel='linear'):
     misclassified = predictions != y
     
     return {
-        'X': X.tolist(),
-        'y': y.tolist(),
-        'predictions': predictions.tolist(),
+        'X': X,
+        'y': y,
+        'predictions': predictions,
         'accuracy': float(accuracy),
         'decision_boundary': {
-            'xx': xx.tolist(),
-            'yy': yy.tolist(),
-            'Z': Z.tolist(),
-            'Z_proba': Z_proba.tolist()
+            'xx': xx,
+            'yy': yy,
+            'Z': Z,
+            'Z_proba': Z_proba
         },
-        'misclassified_indices': np.where(misclassified)[0].tolist(),
+        'misclassified_indices': np.where(misclassified)[0],
         'classifier_type': classifier_type,
         'n_misclassified': int(misclassified.sum())
     }
@@ -1,22 +1,13 @@
 import numpy as np
 
-def gradient_descent(start_x, learning_rate, steps, function_type='quadratic'):
+
+def _objective(function_type):
     """
-    Performs gradient descent on a specified function.
-    
-    Args:
-        start_x: Starting x position
-        learning_rate: Step size for gradient descent
-        steps: Number of iterations
-        function_type: Type of function ('quadratic', 'complex', 'ravine')
+    Look up a test function by name.
     
     Returns:
-        Dictionary with history, convergence info, and final position
+        (func, grad_func, x_range) for the given function type
     """
-    x = start_x
-    history = []
-    
-    # Define function and its gradient
     if function_type == 'quadratic':
         # f(x) = (x - 3)^2
         func = lambda x: (x - 3) ** 2
@@ -40,6 +31,27 @@ def gradient_descent(start_x, learning_rate, steps, function_type='quadratic'):
         grad_func = lambda x: 2 * (x - 3)
         x_range = [-2, 8]
     
+    return func, grad_func, x_range
+
+
+def gradient_descent(start_x, learning_rate, steps, function_type='quadratic'):
+    """
+    Performs gradient descent on a specified function.
+    
+    Args:
+        start_x: Starting x position
+        learning_rate: Step size for gradient descent
+        steps: Number of iterations
+        function_type: Type of function ('quadratic', 'complex', 'ravine')
+    
+    Returns:
+        Dictionary with history, convergence info, and final position
+    """
+    x = start_x
+    history = []
+    
+    func, grad_func, x_range = _objective(function_type)
+    
     # Perform gradient descent
     for i in range(steps):
         y = func(x)
@@ -91,6 +103,94 @@ def gradient_descent(start_x, learning_rate, steps, function_type='quadratic'):
     }
 
 
+def iter_gradient_descent(start_x, learning_rate, steps, function_type='quadratic', every=1, tolerance=0.01):
+    """
+    Streaming version of gradient_descent.
+    
+    Yields one frame per event instead of building the whole history:
+    a 'start' frame with the function curve, a 'step' frame for every
+    `every`-th iteration (and the last one), then an 'end' frame with the
+    same summary fields as gradient_descent. Stops early once the gradient
+    magnitude drops below `tolerance` (None disables this) or x diverges.
+    
+    Args:
+        start_x: Starting x position
+        learning_rate: Step size for gradient descent
+        steps: Maximum number of iterations
+        function_type: Type of function ('quadratic', 'complex', 'ravine')
+        every: Emit every k-th iteration
+        tolerance: Gradient magnitude treated as converged
+    """
+    x = start_x
+    every = max(1, int(every))
+    func, grad_func, x_range = _objective(function_type)
+    
+    x_curve = np.linspace(x_range[0], x_range[1], 200)
+    yield {
+        'event': 'start',
+        'function_type': function_type,
+        'steps': steps,
+        'curve': {
+            'x': x_curve.tolist(),
+            'y': [float(func(xi)) for xi in x_curve]
+        }
+    }
+    
+    for i in range(steps):
+        y = func(x)
+        gradient = grad_func(x)
+        converged = tolerance is not None and abs(gradient) < tolerance
+        
+        if i % every == 0 or i == steps - 1 or converged:
+            yield {
+                'event': 'step',
+                'iteration': i,
+                'x': float(x),
+                'y': float(y),
+                'gradient': float(gradient)
+            }
+        
+        if converged:
+            yield {
+                'event': 'end',
+                'converged': True,
+                'diverged': False,
+                'final_x': float(x),
+                'final_y': float(y),
+                'final_gradient': float(gradient),
+                'iterations': i + 1,
+                'message': 'Converged!'
+            }
+            return
+        
+        x = x - learning_rate * gradient
+        
+        if abs(x) > 1000:
+            yield {
+                'event': 'end',
+                'converged': False,
+                'diverged': True,
+                'final_x': float(x),
+                'final_y': float(func(x)),
+                'iterations': i + 1,
+                'message': 'Diverged! Learning rate too high.'
+            }
+            return
+    
+    final_gradient = grad_func(x)
+    converged = abs(final_gradient) < 0.01
+    yield {
+        'event': 'end',
+        'converged': bool(converged),
+        'diverged': False,
+        'final_x': float(x),
+        'final_y': float(func(x)),
+        'final_gradient': float(final_gradient),
+        'iterations': steps,
+        'message': 'Converged!' if converged else 'More iterations needed.'
+    }
+
+
 def compare_learning_rates(start_x, learning_rates, steps, function_type='quadratic'):
     """
     Compare gradient descent with different learning rates.
@@ -0,0 +1,62 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-thread phase timings for the request currently being served. Engine
+# functions mark their input conversion / output conversion sections with
+# phase(); the web layer turns recording on and off around each request.
+# When recording is off, phase() costs a single attribute lookup.
+_local = threading.local()
+
+
+def start_recording():
+    _local.phases = {}
+    _local.stack = []
+
+
+def stop_recording():
+    """Stop recording and return {phase name: exclusive seconds}."""
+    phases = getattr(_local, 'phases', None)
+    _local.phases = None
+    _local.stack = None
+    return phases or {}
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a block as the named phase.
+
+    Phases nest; time spent in an inner phase is not counted again in the
+    outer one, so the recorded phases add up to the instrumented wall time.
+    """
+    phases = getattr(_local, 'phases', None)
+    if phases is None:
+        yield
+        return
+
+    stack = _local.stack
+    stack.append(0.0)  # time spent in nested phases
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        phases[name] = phases.get(name, 0.0) + elapsed - nested
+        if stack:
+            stack[-1] += elapsed
+
+
+def add_phases(recorded):
+    """
+    Merge phases recorded elsewhere (e.g. in a worker process) into the
+    current recording, as if they had run nested in the current phase.
+    """
+    phases = getattr(_local, 'phases', None)
+    if phases is None or not recorded:
+        return
+    for name, seconds in recorded.items():
+        phases[name] = phases.get(name, 0.0) + seconds
+    if _local.stack:
+        _local.stack[-1] += sum(recorded.values())
@@ -3,6 +3,7 @@ from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
 from sklearn.preprocessing import StandardScaler
+from math_engine.instrumentation import phase
 
 def generate_sample_dataset(dataset_type='linear', n_samples=100, noise=10):
     """
@@ -55,8 +56,9 @@ def train_linear_regression(X, y, test_size=0.2):
     Returns:
         Dictionary with model results and metrics
     """
-    X = np.array(X)
-    y = np.array(y)
+    with phase('convert'):
+        X = np.array(X)
+        y = np.array(y)
     
     # Ensure X is 2D
     if len(X.shape) == 1:
@@ -89,31 +91,32 @@ def train_linear_regression(X, y, test_size=0.2):
         X_line = None
         y_line = None
     
-    return {
-        'model_type': 'linear_regression',
-        'coefficients': model.coef_.tolist(),
-        'intercept': float(model.intercept_),
-        'train_data': {
-            'X': X_train.tolist(),
-            'y': y_train.tolist(),
-            'predictions': y_train_pred.tolist()
-        },
-        'test_data': {
-            'X': X_test.tolist(),
-            'y': y_test.tolist(),
-            'predictions': y_test_pred.tolist()
-        },
-        'metrics': {
-            'train_mse': float(train_mse),
-            'test_mse': float(test_mse),
-            'train_r2': float(train_r2),
-            'test_r2': float(test_r2)
-        },
-        'prediction_line': {
-            'X': X_line.tolist() if X_line is not None else None,
-            'y': y_line.tolist() if y_line is not None else None
+    with phase('tolist'):
+        return {
+            'model_type': 'linear_regression',
+            'coefficients': model.coef_.tolist(),
+            'intercept': float(model.intercept_),
+            'train_data': {
+                'X': X_train.tolist(),
+                'y': y_train.tolist(),
+                'predictions': y_train_pred.tolist()
+            },
+            'test_data': {
+                'X': X_test.tolist(),
+                'y': y_test.tolist(),
+                'predictions': y_test_pred.tolist()
+            },
+            'metrics': {
+                'train_mse': float(train_mse),
+                'test_mse': float(test_mse),
+                'train_r2': float(train_r2),
+                'test_r2': float(test_r2)
+            },
+            'prediction_line': {
+                'X': X_line.tolist() if X_line is not None else None,
+                'y': y_line.tolist() if y_line is not None else None
+            }
         }
-    }
 
 
 def train_with_iterations(X, y, n_iterations=50):
@@ -123,8 +126,9 @@ def train_with_iterations(X, y, n_iterations=50):
     Returns:
         Dictionary with loss history
     """
-    X = np.array(X)
-    y = np.array(y)
+    with phase('convert'):
+        X = np.array(X)
+        y = np.array(y)
     
     if len(X.shape) == 1:
         X = X.reshape(-1, 1)
@@ -162,10 +166,85 @@ def train_with_iterations(X, y, n_iterations=50):
     # Final predictions
     final_predictions = X_b.dot(theta)
     
-    return {
-        'loss_history': loss_history,
-        'theta_history': theta_history,
-        'final_theta': theta.tolist(),
-        'final_predictions': final_predictions.tolist(),
-        'n_iterations': n_iterations
+    with phase('tolist'):
+        return {
+            'loss_history': loss_history,
+            'theta_history': theta_history,
+            'final_theta': theta.tolist(),
+            'final_predictions': final_predictions.tolist(),
+            'n_iterations': n_iterations
+        }
+
+
+def iter_training(X, y, n_iterations=50, every=1, tolerance=1e-6):
+    """
+    Streaming version of train_with_iterations.
+    
+    Yields a 'start' frame, a 'step' frame with loss and theta for every
+    `every`-th iteration (and the last one), then an 'end' frame with the
+    final parameters and predictions. Stops early when the relative loss
+    improvement falls below `tolerance` (None disables this) or the loss
+    stops being finite.
+    
+    Args:
+        X: Feature matrix (or 1-D feature vector)
+        y: Target values
+        n_iterations: Maximum number of iterations
+        every: Emit every k-th iteration
+        tolerance: Relative loss change treated as converged
+    """
+    with phase('convert'):
+        X = np.array(X, dtype=float)
+        y = np.array(y, dtype=float)
+    
+    if len(X.shape) == 1:
+        X = X.reshape(-1, 1)
+    
+    every = max(1, int(every))
+    n_features = X.shape[1]
+    theta = np.zeros(n_features + 1)
+    X_b = np.c_[np.ones((X.shape[0], 1)), X]
+    learning_rate = 0.01
+    m = len(y)
+    
+    yield {'event': 'start', 'n_samples': m, 'n_features': n_features, 'n_iterations': n_iterations}
+    
+    previous_loss = None
+    status = 'max_iterations'
+    iteration = -1
+    for iteration in range(n_iterations):
+        residuals = X_b.dot(theta) - y
+        loss = float(np.mean(residuals ** 2))
+        
+        if not np.isfinite(loss):
+            status = 'diverged'
+            break
+        
+        converged = (tolerance is not None and previous_loss is not None
+                     and abs(previous_loss - loss) <= tolerance * max(previous_loss, 1e-12))
+        
+        if iteration % every == 0 or iteration == n_iterations - 1 or converged:
+            yield {'event': 'step', 'iteration': iteration, 'loss': loss, 'theta': theta.tolist()}
+        
+        if converged:
+            status = 'converged'
+            break
+        
+        previous_loss = loss
+        theta = theta - learning_rate * (2/m) * X_b.T.dot(residuals)
+    
+    messages = {
+        'converged': 'Converged!',
+        'diverged': 'Diverged! Loss is no longer finite.',
+        'max_iterations': 'More iterations needed.'
+    }
+    final_predictions = X_b.dot(theta)
+    yield {
+        'event': 'end',
+        'converged': status == 'converged',
+        'diverged': status == 'diverged',
+        'final_theta': theta.tolist() if status != 'diverged' else None,
+        'final_predictions': final_predictions.tolist() if status != 'diverged' else None,
+        'n_iterations': iteration + 1,
+        'message': messages[status]
     }
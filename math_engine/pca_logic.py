@@ -1,6 +1,7 @@
 import numpy as np
 from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
+from math_engine.instrumentation import phase
 
 def generate_sample_data(data_type='ellipse', n_points=100, noise=0.1):
     """
@@ -66,6 +67,9 @@ def perform_pca(data, n_components=None, standardize=True):
     Returns:
         Dictionary with PCA results
     """
+    with phase('convert'):
+        data = np.asarray(data, dtype=float)
+
     # Standardize data
     if standardize:
         scaler = StandardScaler()
@@ -73,9 +77,11 @@ def perform_pca(data, n_components=None, standardize=True):
     else:
         data_scaled = data
     
-    # Determine number of components
+    # Determine number of components (the UI allows 3 for 2-D datasets)
     if n_components is None:
         n_components = min(data.shape)
+    else:
+        n_components = min(n_components, *data.shape)
     
     # Perform PCA
     pca = PCA(n_components=n_components)
@@ -96,15 +102,15 @@ def perform_pca(data, n_components=None, standardize=True):
     scaled_components = components * np.sqrt(explained_variance)[:, np.newaxis]
     
     return {
-        'original_data': data.tolist(),
-        'standardized_data': data_scaled.tolist(),
-        'transformed_data': data_transformed.tolist(),
-        'components': components.tolist(),
-        'scaled_components': scaled_components.tolist(),
-        'explained_variance': explained_variance.tolist(),
-        'explained_variance_ratio': explained_variance_ratio.tolist(),
-        'cumulative_variance': cumulative_variance.tolist(),
-        'mean': mean.tolist(),
+        'original_data': data,
+        'standardized_data': data_scaled,
+        'transformed_data': data_transformed,
+        'components': components,
+        'scaled_components': scaled_components,
+        'explained_variance': explained_variance,
+        'explained_variance_ratio': explained_variance_ratio,
+        'cumulative_variance': cumulative_variance,
+        'mean': mean,
         'n_components': n_components,
         'original_shape': data.shape,
         'transformed_shape': data_transformed.shape
@@ -1,58 +1,136 @@
 import numpy as np
 
+# Largest page of materialized steps solve_system_steps returns
+MAX_STEP_PAGE = 100
+
+PIVOT_TOLERANCE = 1e-10
+
+
+# --- Step log ---
+# Each elimination step is a row-operation descriptor rather than a copy
+# of the augmented matrix:
+#   {"op": "initial"}
+#   {"op": "swap", "rows": [i, j]}                          R_i <-> R_j
+#   {"op": "scale", "row": i, "divisor": d}                 R_i = R_i / d
+#   {"op": "axpy", "target": j, "source": i, "factor": a}   R_j = R_j + a * R_i
+# Replaying them from the initial matrix repeats the exact floating point
+# operations of the elimination, so every materialized step is bit-for-bit
+# the matrix the solver had at that point.
+
+def apply_step(aug, step):
+    """Apply one row-operation descriptor to the augmented matrix in place."""
+    op = step["op"]
+    if op == "swap":
+        i, j = step["rows"]
+        aug[[i, j]] = aug[[j, i]]
+    elif op == "scale":
+        aug[step["row"]] = aug[step["row"]] / step["divisor"]
+    elif op == "axpy":
+        aug[step["target"]] = aug[step["target"]] + step["factor"] * aug[step["source"]]
+
+
+def describe_step(step):
+    op = step["op"]
+    if op == "initial":
+        return "Initial Augmented Matrix"
+    if op == "swap":
+        i, j = step["rows"]
+        return f"Swap R{i+1} with R{j+1}"
+    if op == "scale":
+        return f"Normalize R{step['row']+1} (Divide by {step['divisor']:.2f})"
+    return f"R{step['target']+1} = R{step['target']+1} - ({-step['factor']:.2f} * R{step['source']+1})"
+
+
+def iter_step_matrices(initial, steps, start=0, stop=None):
+    """
+    Lazily materialize the augmented matrix after each step.
+
+    Yields (index, matrix) for start <= index < stop. Steps before start
+    are replayed but not copied, so reaching step k costs O(k * n).
+    """
+    stop = len(steps) if stop is None else min(stop, len(steps))
+    aug = np.array(initial, dtype=float)
+    for index in range(stop):
+        apply_step(aug, steps[index])
+        if index >= start:
+            yield index, aug.copy()
+
+
+def replay_step(initial, steps, index):
+    """Return the augmented matrix after step `index`."""
+    for _, matrix in iter_step_matrices(initial, steps, index, index + 1):
+        return matrix
+    raise IndexError(f"Step {index} out of range (0-{len(steps) - 1})")
+
+
+def _eliminate(aug):
+    """Gauss-Jordan elimination on aug in place; returns the step log."""
+    rows, cols = aug.shape
+    steps = [{"op": "initial"}]
+
+    def record(step):
+        apply_step(aug, step)
+        steps.append(step)
+
+    # Gaussian Elimination (Forward Integration)
+    for i in range(min(rows, cols-1)):
+        # 1. Pivot selection (Partial Pivoting)
+        pivot_row = i + int(np.argmax(np.abs(aug[i:, i])))
+        if i != pivot_row:
+            record({"op": "swap", "rows": [i, pivot_row]})
+
+        # 2. Normalize pivot row
+        pivot_val = float(aug[i, i])
+        if abs(pivot_val) > PIVOT_TOLERANCE:
+            record({"op": "scale", "row": i, "divisor": pivot_val})
+        else:
+            # Singular or free variable case (simplified handling)
+            pass
+
+        # 3. Eliminate entries below
+        for j in range(i + 1, rows):
+            factor = float(aug[j, i])
+            if abs(factor) > PIVOT_TOLERANCE:
+                record({"op": "axpy", "target": j, "source": i, "factor": -factor})
+
+    # Back Substitution (Jordan)
+    for i in range(min(rows, cols-1) - 1, -1, -1):
+        for j in range(i - 1, -1, -1):
+            factor = float(aug[j, i])
+            if abs(factor) > PIVOT_TOLERANCE:
+                record({"op": "axpy", "target": j, "source": i, "factor": -factor})
+
+    return steps
+
+
+def _augment(lhs_list, rhs_list):
+    A = np.array(lhs_list, dtype=float)
+    b = np.array(rhs_list, dtype=float)
+    # Combine into Augmented Matrix [A | b]
+    return A, b, np.column_stack((A, b))
+
+
 def solve_system(lhs_list, rhs_list):
     """
     Solves Ax = b and returns steps for Gaussian Elimination.
     lhs_list: A matrix (list of lists)
     rhs_list: b vector (list)
+
+    The steps are compact row-operation descriptors (see apply_step) to be
+    replayed from the initial augmented matrix; solve_system_steps returns
+    pages of materialized matrices.
     """
     try:
-        A = np.array(lhs_list, dtype=float)
-        b = np.array(rhs_list, dtype=float)
-        
-        # Combine into Augmented Matrix [A | b]
-        aug = np.column_stack((A, b))
-        rows, cols = aug.shape
-        
-        steps = []
-        steps.append({"description": "Initial Augmented Matrix", "matrix": aug.tolist()})
-
-        # Gaussian Elimination (Forward Integration)
-        for i in range(min(rows, cols-1)):
-            # 1. Pivot selection (Partial Pivoting)
-            pivot_row = i + np.argmax(np.abs(aug[i:, i]))
-            if i != pivot_row:
-                aug[[i, pivot_row]] = aug[[pivot_row, i]]
-                steps.append({"description": f"Swap R{i+1} with R{pivot_row+1}", "matrix": aug.tolist()})
-            
-            # 2. Normalize pivot row
-            pivot_val = aug[i, i]
-            if abs(pivot_val) > 1e-10:
-                aug[i] = aug[i] / pivot_val
-                steps.append({"description": f"Normalize R{i+1} (Divide by {pivot_val:.2f})", "matrix": aug.tolist()})
-            else:
-                # Singular or free variable case (simplified handling)
-                pass 
-
-            # 3. Eliminate entries below
-            for j in range(i + 1, rows):
-                factor = aug[j, i]
-                if abs(factor) > 1e-10:
-                    aug[j] = aug[j] - factor * aug[i]
-                    steps.append({"description": f"R{j+1} = R{j+1} - ({factor:.2f} * R{i+1})", "matrix": aug.tolist()})
-
-        # Back Substitution (Jordan)
-        for i in range(min(rows, cols-1) - 1, -1, -1):
-            for j in range(i - 1, -1, -1):
-                factor = aug[j, i]
-                if abs(factor) > 1e-10:
-                    aug[j] = aug[j] - factor * aug[i]
-                    steps.append({"description": f"R{j+1} = R{j+1} - ({factor:.2f} * R{i+1})", "matrix": aug.tolist()})
+        A, b, aug = _augment(lhs_list, rhs_list)
+        initial = aug.copy()
+        steps = _eliminate(aug)
 
         solution = aug[:, -1]
-        
+
         return {
+            "initial": initial.tolist(),
             "steps": steps,
+            "final": aug.tolist(),
             "solution": solution.tolist(),
             "equations": {
                 "A": A.tolist(),
@@ -62,3 +140,42 @@ def solve_system(lhs_list, rhs_list):
 
     except Exception as e:
         return {"error": str(e)}
+
+
+def solve_system_steps(lhs_list, rhs_list, offset=0, limit=20):
+    """
+    Returns a page of Gaussian Elimination steps with their matrices.
+
+    Args:
+        lhs_list: A matrix (list of lists)
+        rhs_list: b vector (list)
+        offset: Index of the first step (0 is the initial matrix)
+        limit: Number of steps, at most MAX_STEP_PAGE
+
+    Returns:
+        Dictionary with the total step count, the page bounds and the steps
+        (index, description, descriptor fields and matrix)
+    """
+    try:
+        offset, limit = int(offset), int(limit)
+        if offset < 0 or not 1 <= limit <= MAX_STEP_PAGE:
+            return {"error": f"offset must be >= 0 and limit between 1 and {MAX_STEP_PAGE}"}
+
+        _, _, aug = _augment(lhs_list, rhs_list)
+        initial = aug.copy()
+        steps = _eliminate(aug)
+
+        page = []
+        for index, matrix in iter_step_matrices(initial, steps, offset, offset + limit):
+            page.append(dict(steps[index], index=index, description=describe_step(steps[index]),
+                             matrix=matrix.tolist()))
+
+        return {
+            "total": len(steps),
+            "offset": offset,
+            "limit": limit,
+            "steps": page
+        }
+
+    except Exception as e:
+        return {"error": str(e)}
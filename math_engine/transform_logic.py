@@ -1,25 +1,57 @@
+import functools
+
 import numpy as np
 
-def generate_shape(shape_type='square'):
-    """Generates coordinates for different shapes."""
+# Default points per axis for 'grid' and around the 'circle'
+SHAPE_RESOLUTION = {'grid': 9, 'circle': 64}
+MAX_RESOLUTION = 201
+MAX_FRAMES = 240
+
+
+@functools.lru_cache(maxsize=64)
+def generate_shape(shape_type='square', resolution=None):
+    """
+    Generates coordinates for different shapes.
+
+    The result is cached per (shape, resolution) and read-only; copy it
+    before modifying it.
+    """
     if shape_type == 'square':
         # Unit square with diagonals
-        return np.array([
+        points = np.array([
             [0, 1, 1, 0, 0, 1, 0, 1],
             [0, 0, 1, 1, 0, 1, 1, 0]
         ])
     elif shape_type == 'triangle':
-        return np.array([
+        points = np.array([
             [0, 1, 0.5, 0],
             [0, 0, 1, 0]
         ])
     elif shape_type == 'grid':
         # Generate a grid of points
-        x = np.linspace(-2, 2, 9)
-        y = np.linspace(-2, 2, 9)
+        n = resolution or SHAPE_RESOLUTION['grid']
+        x = np.linspace(-2, 2, n)
+        y = np.linspace(-2, 2, n)
         X, Y = np.meshgrid(x, y)
-        return np.array([X.flatten(), Y.flatten()])
-    return np.zeros((2, 1))
+        points = np.array([X.flatten(), Y.flatten()])
+    elif shape_type == 'circle':
+        # Unit circle, closed (the first point is repeated at the end)
+        theta = np.linspace(0, 2 * np.pi, (resolution or SHAPE_RESOLUTION['circle']) + 1)
+        points = np.array([np.cos(theta), np.sin(theta)])
+    else:
+        points = np.zeros((2, 1))
+    points.setflags(write=False)
+    return points
+
+
+@functools.lru_cache(maxsize=64)
+def homogeneous_points(shape_type='square', resolution=None):
+    """Shape coordinates as a read-only 3 x N array with a row of ones."""
+    points = generate_shape(shape_type, resolution)
+    result = np.vstack([points, np.ones((1, points.shape[1]))])
+    result.setflags(write=False)
+    return result
+
 
 def apply_transform(matrix_list, shape_type='square'):
     """
@@ -28,13 +60,136 @@ def apply_transform(matrix_list, shape_type='square'):
     try:
         matrix = np.array(matrix_list, dtype=float)
         points = generate_shape(shape_type)
-        
+
         # Apply transformation: M * P
         transformed_points = np.dot(matrix, points)
-        
+
         return {
             "original": points.tolist(),
             "transformed": transformed_points.tolist()
         }
     except Exception as e:
         return {"error": str(e)}
+
+
+# --- Transform pipelines ---
+
+def transform_matrix(spec):
+    """
+    Convert one pipeline step to a 3x3 homogeneous affine matrix.
+
+    A step is a 2x2 linear or 3x3 homogeneous matrix (nested lists), or an
+    object: {"rotate": degrees}, {"scale": [sx, sy] or s},
+    {"shear": [kx, ky]}, {"translate": [tx, ty]}, {"reflect": "x" or "y"}
+    or {"matrix": ...}.
+    """
+    if isinstance(spec, dict):
+        if len(spec) != 1:
+            raise ValueError(f'Each transform object needs exactly one key, got {sorted(spec)}')
+        (kind, value), = spec.items()
+        if kind == 'matrix':
+            return transform_matrix(value)
+        if kind == 'rotate':
+            theta = np.radians(float(value))
+            c, s = np.cos(theta), np.sin(theta)
+            return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+        if kind == 'reflect':
+            if value not in ('x', 'y'):
+                raise ValueError("reflect must be 'x' (across the x-axis) or 'y' (across the y-axis)")
+            return np.diag([1.0, -1.0, 1.0]) if value == 'x' else np.diag([-1.0, 1.0, 1.0])
+        pair = np.broadcast_to(np.asarray(value, dtype=float), (2,))
+        if kind == 'scale':
+            return np.diag([pair[0], pair[1], 1.0])
+        if kind == 'shear':
+            return np.array([[1, pair[0], 0], [pair[1], 1, 0], [0, 0, 1]])
+        if kind == 'translate':
+            return np.array([[1, 0, pair[0]], [0, 1, pair[1]], [0, 0, 1]])
+        raise ValueError(f"Unknown transform '{kind}' (expected matrix, rotate, scale, shear, translate or reflect)")
+
+    matrix = np.array(spec, dtype=float)
+    if matrix.shape == (2, 2):
+        affine = np.eye(3)
+        affine[:2, :2] = matrix
+        return affine
+    if matrix.shape == (3, 3):
+        if not np.allclose(matrix[2], [0, 0, 1]):
+            raise ValueError('3x3 transforms must be affine (last row [0, 0, 1])')
+        return matrix
+    raise ValueError(f'Transforms must be 2x2 or 3x3 matrices, got shape {matrix.shape}')
+
+
+def _interpolate(start, end, t):
+    """(1 - t) * start + t * end for every t; start/end are 3x3 or stacks of them."""
+    return start + t[:, None, None] * (end - start)
+
+
+def transform_pipeline(transforms, shape_type='square', frames=30, resolution=None, mode='composite'):
+    """
+    Composes a sequence of transforms and renders an animation of it.
+
+    The steps are collapsed into one affine matrix (the first step is
+    applied first). Animation frames interpolate the matrix linearly, from
+    the identity to the composite ('composite') or through each step's
+    cumulative matrix in turn ('sequential'). All frames come from a single
+    einsum over the cached point set.
+
+    Args:
+        transforms: List of steps (see transform_matrix)
+        shape_type: 'square', 'triangle', 'grid' or 'circle'
+        frames: Number of animation frames (at least 2)
+        resolution: Points per axis for 'grid' or around the 'circle'
+        mode: 'composite' or 'sequential'
+
+    Returns:
+        Dictionary with the composite matrix, its determinant, the original
+        points (2 x N), the frame times and every frame as one contiguous
+        frames x 2 x N array
+    """
+    try:
+        if not isinstance(transforms, list) or not transforms:
+            return {"error": "transforms must be a non-empty list"}
+        frames = int(frames)
+        if not 2 <= frames <= MAX_FRAMES:
+            return {"error": f"frames must be between 2 and {MAX_FRAMES}"}
+        if resolution is not None:
+            resolution = int(resolution)
+            if not 2 <= resolution <= MAX_RESOLUTION:
+                return {"error": f"resolution must be between 2 and {MAX_RESOLUTION}"}
+        if mode not in ('composite', 'sequential'):
+            return {"error": "mode must be 'composite' or 'sequential'"}
+
+        steps = [transform_matrix(spec) for spec in transforms]
+        # Cumulative products: identity, T1, T2 T1, ..., Tk ... T1
+        cumulative = [np.eye(3)]
+        for step in steps:
+            cumulative.append(step @ cumulative[-1])
+        composite = cumulative[-1]
+
+        if mode == 'composite':
+            times = np.linspace(0.0, 1.0, frames)
+            matrices = _interpolate(cumulative[0], composite, times)
+        else:
+            # Frames along the path through every stage, each stage spanning
+            # one unit of time
+            times = np.linspace(0.0, len(steps), frames)
+            stage = np.minimum(times.astype(int), len(steps) - 1)
+            stack = np.array(cumulative)
+            matrices = _interpolate(stack[stage], stack[stage + 1], times - stage)
+
+        if shape_type not in SHAPE_RESOLUTION:
+            resolution = None
+        points = homogeneous_points(shape_type, resolution)
+        # Only the x and y rows of each matrix are needed: (K, 2, 3) x (3, N)
+        rendered = np.einsum('kij,jn->kin', matrices[:, :2, :], points, optimize=True)
+
+        return {
+            "matrix": composite,
+            "determinant": float(np.linalg.det(composite[:2, :2])),
+            "original": points[:2],
+            "times": times,
+            "frames": np.ascontiguousarray(rendered),
+            "transformed": rendered[-1]
+        }
+
+    except Exception as e:
+        return {"error": str(e)}
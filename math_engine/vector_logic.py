@@ -6,12 +6,13 @@ def calculate_vector_properties(v1_list, v2_list=None):
     vectors are passed as lists [x, y, z] (or [x, y]).
     """
     v1 = np.array(v1_list, dtype=float)
-    
+    mag_v1 = np.linalg.norm(v1)
+
     results = {
         "v1": {
             "components": v1_list,
-            "magnitude": float(np.linalg.norm(v1)),
-            "direction_cosines": (v1 / np.linalg.norm(v1)).tolist() if np.linalg.norm(v1) != 0 else [0,0,0]
+            "magnitude": float(mag_v1),
+            "direction_cosines": (v1 / mag_v1).tolist() if mag_v1 != 0 else [0,0,0]
         }
     }
 
@@ -22,7 +23,6 @@ def calculate_vector_properties(v1_list, v2_list=None):
         dot_product = float(np.dot(v1, v2))
         
         # Angle
-        mag_v1 = np.linalg.norm(v1)
         mag_v2 = np.linalg.norm(v2)
         
         if mag_v1 == 0 or mag_v2 == 0:
@@ -58,3 +58,71 @@ def calculate_vector_properties(v1_list, v2_list=None):
         results["subtraction"] = (v1 - v2).tolist()
 
     return results
+
+
+def _row_norms(v):
+    return np.sqrt(np.einsum('ij,ij->i', v, v))
+
+
+def calculate_vector_properties_batch(v1_list, v2_list=None):
+    """
+    Vectorized calculate_vector_properties for many vector pairs at once.
+
+    Every quantity is computed for all rows in one pass and returned as a
+    column (one array per field) rather than one dict per pair. Zero
+    vectors get zero direction cosines, angles and projections, as in the
+    single-pair function.
+
+    Args:
+        v1_list: N x d array-like of first vectors
+        v2_list: Optional N x d array-like of second vectors
+
+    Returns:
+        Dictionary of arrays: per-row scalars have shape (N,), per-row
+        vectors (N, d)
+    """
+    try:
+        v1 = np.asarray(v1_list, dtype=float)
+        v2 = np.asarray(v2_list, dtype=float) if v2_list is not None else None
+    except (TypeError, ValueError):
+        return {"error": "Vectors must be numeric N x d arrays"}
+    if v1.ndim != 2 or v1.shape[1] == 0:
+        return {"error": "v1 must be an N x d array"}
+    if v2 is not None and v2.shape != v1.shape:
+        return {"error": f"v2 must have the same shape as v1 {v1.shape}, got {v2.shape}"}
+
+    mag1 = _row_norms(v1)
+    nonzero1 = mag1 != 0
+    cosines = np.divide(v1, mag1[:, None], out=np.zeros_like(v1), where=nonzero1[:, None])
+
+    results = {
+        "count": v1.shape[0],
+        "dimension": v1.shape[1],
+        "v1": {
+            "magnitude": mag1,
+            "direction_cosines": cosines
+        }
+    }
+    if v2 is None:
+        return results
+
+    mag2 = _row_norms(v2)
+    dots = np.einsum('ij,ij->i', v1, v2)
+
+    both = nonzero1 & (mag2 != 0)
+    cos_theta = np.divide(dots, mag1 * mag2, out=np.ones_like(dots), where=both)
+    angle_rad = np.where(both, np.arccos(np.clip(cos_theta, -1.0, 1.0)), 0.0)
+
+    # Projection of v1 onto v2: (v1 . v2 / |v2|^2) * v2
+    scalar_proj = np.divide(dots, mag2 ** 2, out=np.zeros_like(dots), where=mag2 != 0)
+
+    results["v2"] = {"magnitude": mag2}
+    results["interactions"] = {
+        "dot_product": dots,
+        "angle_degrees": np.round(np.degrees(angle_rad), 2),
+        "angle_radians": np.round(angle_rad, 4),
+        "projection_v1_on_v2": scalar_proj[:, None] * v2
+    }
+    results["addition"] = v1 + v2
+    results["subtraction"] = v1 - v2
+    return results
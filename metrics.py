@@ -0,0 +1,183 @@
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+from math_engine.instrumentation import phase, start_recording, stop_recording
+from warmup import WARMUP_ENVIRON_KEY
+
+PREFIX = 'mathai'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Request phases, in the order a request goes through them
+PHASES = ('parse', 'convert', 'compute', 'tolist', 'serialize')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', dict(labels, le=f'{bound:g}'), cumulative
+        yield f'{name}_bucket', dict(labels, le='+Inf'), self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+class MetricsRegistry:
+    """In-process request metrics, one registry per worker process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (route, method, status) -> count
+        self.latency = {}         # route -> Histogram
+        self.in_flight = {}       # route -> gauge
+        self.response_bytes = {}  # route -> Histogram
+        self.phases = {}          # (route, phase) -> Histogram
+        self.collectors = []
+
+    def start(self, route):
+        with self._lock:
+            self.in_flight[route] = self.in_flight.get(route, 0) + 1
+
+    def finish(self, route, method, status, seconds, size, phases):
+        with self._lock:
+            self.in_flight[route] -= 1
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(route, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            if size is not None:
+                self.response_bytes.setdefault(route, Histogram(SIZE_BUCKETS)).observe(size)
+            for name, value in phases.items():
+                self.phases.setdefault((route, name), Histogram(PHASE_BUCKETS)).observe(value)
+
+    def register_collector(self, collector):
+        """
+        Add a callable exported on every scrape.
+
+        The collector returns an iterable of
+        (metric name, type, help text, labels dict, value) tuples.
+        """
+        self.collectors.append(collector)
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        families = {}  # name -> (type, help, [(sample name, labels, value)])
+
+        def add(name, kind, help_text, sample_name, labels, value):
+            families.setdefault(name, (kind, help_text, []))[2].append((sample_name, labels, value))
+
+        with self._lock:
+            name = f'{PREFIX}_http_requests_total'
+            for (route, method, status), count in self.requests.items():
+                add(name, 'counter', 'HTTP requests by route, method and status.',
+                    name, {'route': route, 'method': method, 'status': status}, count)
+
+            name = f'{PREFIX}_http_requests_in_flight'
+            for route, value in self.in_flight.items():
+                add(name, 'gauge', 'Requests currently being served.', name, {'route': route}, value)
+
+            for name, help_text, histograms in (
+                (f'{PREFIX}_http_request_duration_seconds', 'Request latency.', self.latency),
+                (f'{PREFIX}_http_response_size_bytes', 'Response body size.', self.response_bytes),
+            ):
+                for route, histogram in histograms.items():
+                    for sample in histogram.samples(name, {'route': route}):
+                        add(name, 'histogram', help_text, *sample)
+
+            name = f'{PREFIX}_http_request_phase_seconds'
+            for (route, phase_name), histogram in self.phases.items():
+                for sample in histogram.samples(name, {'route': route, 'phase': phase_name}):
+                    add(name, 'histogram', 'Time spent per request phase (parse, convert, compute, tolist, serialize).', *sample)
+
+            collectors = list(self.collectors)
+
+        for collector in collectors:
+            for metric_name, kind, help_text, labels, value in collector():
+                add(f'{PREFIX}_{metric_name}', kind, help_text, f'{PREFIX}_{metric_name}', labels, value)
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+
+registry = MetricsRegistry()
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def init_metrics(app):
+    """Register request instrumentation and the /metrics endpoint"""
+
+    @app.before_request
+    def start_request_metrics():
+        if request.environ.get(WARMUP_ENVIRON_KEY):
+            # Warm-up latency is exactly what the metrics should not see
+            return
+        g.metrics_route = _route_label()
+        g.metrics_start = time.perf_counter()
+        registry.start(g.metrics_route)
+        start_recording()
+        if request.is_json:
+            # Parse here so the cost shows up as its own phase; Flask caches
+            # the result for the view and later hooks
+            with phase('parse'):
+                request.get_json(silent=True)
+
+    @app.after_request
+    def capture_response_metrics(response):
+        g.metrics_status = response.status_code
+        g.metrics_size = None if response.is_streamed else response.calculate_content_length()
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        route = g.pop('metrics_route', None)
+        if route is None:
+            return
+        seconds = time.perf_counter() - g.pop('metrics_start')
+        status = g.pop('metrics_status', 500 if exc is not None else 200)
+        registry.finish(route, request.method, status, seconds, g.pop('metrics_size', None), stop_recording())
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
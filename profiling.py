@@ -0,0 +1,194 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import abort, g, jsonify, request, send_from_directory
+
+# Profiling is opt-in twice: the server must run with PROFILING_ENABLED=1 and
+# an ADMIN_TOKEN, and the request must carry an X-Profile header ('cprofile'
+# or 'sample') along with that token in X-Admin-Token.
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1' and bool(ADMIN_TOKEN)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 2)) / 1000.0
+
+PROFILE_NAME = re.compile(r'^[\w.-]+\.(pstats|folded)$')
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack at a fixed interval.
+
+    Produces collapsed stacks ("frame;frame;frame count" per line), the input
+    format of flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class DeterministicProfiler:
+    """
+    cProfile for the current thread, written as a pstats file.
+
+    Only one cProfile can be active per process (Python 3.12+ refuses a
+    second one), so acquire() must succeed before start().
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    @classmethod
+    def acquire(cls):
+        return cls._active.acquire(blocking=False)
+
+    def start(self):
+        try:
+            self.profile.enable()
+        except Exception:
+            self._active.release()
+            raise
+
+    def stop(self):
+        try:
+            self.profile.disable()
+        finally:
+            self._active.release()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+def _prune(directory, keep):
+    """Delete the oldest profiles beyond the newest `keep`."""
+    # Names start with a sortable timestamp, which is finer than mtime
+    names = sorted(name for name in os.listdir(directory) if PROFILE_NAME.match(name))
+    for name in names[:-keep] if keep > 0 else names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def _finish_profile():
+    """Stop the active profiler (if any) and write its output; returns the file name."""
+    active = g.pop('profiler', None)
+    if active is None:
+        return None
+    profiler, mode, started = active
+    profiler.stop()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = (request.endpoint or 'unmatched').replace('.', '_')
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    extension = 'folded' if mode == 'sample' else 'pstats'
+    name = f'{stamp}_{endpoint}_{int((time.perf_counter() - started) * 1000)}ms.{extension}'
+    profiler.dump(os.path.join(PROFILE_DIR, name))
+    _prune(PROFILE_DIR, PROFILE_KEEP)
+    return name
+
+
+def _is_admin():
+    return request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+
+def _check_admin():
+    if not PROFILING_ENABLED:
+        abort(404)
+    if not _is_admin():
+        abort(403)
+
+
+def init_profiling(app):
+    """Register the per-request profiling hooks and the profile admin routes"""
+
+    @app.before_request
+    def start_profile():
+        if not PROFILING_ENABLED:
+            return
+        mode = request.headers.get('X-Profile', '').strip().lower()
+        if not mode or mode in ('0', 'false', 'off') or not _is_admin():
+            return
+        if mode != 'sample' and DeterministicProfiler.acquire():
+            mode = 'cprofile'
+            profiler = DeterministicProfiler()
+        else:
+            # Another request holds cProfile; sample this one instead
+            mode = 'sample'
+            profiler = StackSampler(threading.get_ident())
+        g.profiler = (profiler, mode, time.perf_counter())
+        profiler.start()
+
+    @app.after_request
+    def write_profile(response):
+        name = _finish_profile()
+        if name is not None:
+            response.headers['X-Profile-Id'] = name
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc):
+        # after_request is skipped if the response could not be built
+        if g.get('profiler') is not None:
+            _finish_profile()
+
+    @app.route('/admin/profiles', methods=['GET'])
+    def list_profiles():
+        _check_admin()
+        if not os.path.isdir(PROFILE_DIR):
+            return jsonify({"profiles": []})
+        profiles = []
+        for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+            if not PROFILE_NAME.match(name):
+                continue
+            stat = os.stat(os.path.join(PROFILE_DIR, name))
+            profiles.append({
+                "name": name,
+                "format": name.rsplit('.', 1)[1],
+                "bytes": stat.st_size,
+                "created": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        return jsonify({"profiles": profiles})
+
+    @app.route('/admin/profiles/<name>', methods=['GET'])
+    def download_profile(name):
+        _check_admin()
+        if not PROFILE_NAME.match(name):
+            abort(404)
+        return send_from_directory(PROFILE_DIR, name, as_attachment=True)
@@ -0,0 +1,179 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from html.parser import HTMLParser
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Markdown documents indexed next to MODULE_KNOWLEDGE, relative to the repo root
+DOCUMENTS = ['README.md', 'ARCHITECTURE.md']
+TEMPLATE_DIR = os.path.join(ROOT, 'templates')
+
+# Words per chunk; headings start a new chunk
+CHUNK_WORDS = 120
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Score multiplier for chunks about the module the student is on
+MODULE_BOOST = 1.5
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in into is it its me my of on or so
+that the their then there these this to was what when where which who why will with you your
+""".split())
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+Chunk = namedtuple('Chunk', ['source', 'title', 'module', 'text'])
+
+
+def tokenize(text):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# --- Chunking ---
+
+def _window(source, title, module, words):
+    for start in range(0, len(words), CHUNK_WORDS):
+        text = ' '.join(words[start:start + CHUNK_WORDS])
+        if text:
+            yield Chunk(source, title, module, text)
+
+
+def chunk_markdown(source, text):
+    """Split prose at headings, then into CHUNK_WORDS windows titled by the heading."""
+    title, lines, fenced = source, [], False
+    for line in text.splitlines() + ['# ']:
+        if line.startswith('```'):
+            # Code blocks are mostly ASCII diagrams and shell commands
+            fenced = not fenced
+            continue
+        heading = None if fenced else re.match(r'#{1,6}\s+(.*)', line)
+        if heading:
+            yield from _window(source, title, None, ' '.join(lines).split())
+            title, lines = heading.group(1).strip() or source, []
+        elif not fenced and not line.startswith(('<', '[![')):
+            lines.append(line)
+
+
+class _TextExtractor(HTMLParser):
+    """Visible text of a template, without scripts, styles or Jinja tags."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def chunk_template(path):
+    module = os.path.splitext(os.path.basename(path))[0]
+    with open(path, encoding='utf-8') as f:
+        html = re.sub(r'{[{%#].*?[}%#]}', ' ', f.read(), flags=re.S)
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    yield from _window(os.path.relpath(path, ROOT), module, module, ' '.join(extractor.parts).split())
+
+
+def collect_chunks(module_knowledge):
+    chunks = [Chunk('MODULE_KNOWLEDGE', module, module, text) for module, text in module_knowledge.items()]
+    for name in DOCUMENTS:
+        path = os.path.join(ROOT, name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                chunks.extend(chunk_markdown(name, f.read()))
+    if os.path.isdir(TEMPLATE_DIR):
+        for name in sorted(os.listdir(TEMPLATE_DIR)):
+            if name.endswith('.html') and name not in ('base.html', 'index.html'):
+                chunks.extend(chunk_template(os.path.join(TEMPLATE_DIR, name)))
+    return chunks
+
+
+# --- Index ---
+
+class RetrievalIndex:
+    """
+    BM25 index over text chunks.
+
+    The per-term BM25 weights are precomputed into a terms x chunks CSR
+    matrix (float32), so scoring a query is one row slice and a column sum,
+    and picking the top k is an argpartition.
+    """
+
+    def __init__(self, chunks):
+        # scipy.sparse is a noticeable import; only pay for it when indexing
+        from scipy import sparse
+        self.chunks = chunks
+        self.modules = np.array([chunk.module or '' for chunk in chunks])
+        self.vocabulary = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for doc, chunk in enumerate(chunks):
+            tokens = tokenize(f'{chunk.title} {chunk.text}')
+            lengths[doc] = len(tokens)
+            for term, count in Counter(tokens).items():
+                rows.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                cols.append(doc)
+                counts.append(count)
+
+        tf = np.array(counts, dtype=np.float32)
+        cols = np.array(cols, dtype=np.int32)
+        rows = np.array(rows, dtype=np.int32)
+        doc_freq = np.bincount(rows, minlength=len(self.vocabulary))
+        idf = np.log(1 + (len(chunks) - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1))
+        weights = idf[rows] * tf * (BM25_K1 + 1) / (tf + norm[cols])
+        self.weights = sparse.csr_matrix((weights, (rows, cols)), shape=(len(self.vocabulary), len(chunks)))
+
+    def search(self, query, k=3, module=None):
+        """Return [(score, Chunk)] for the k best chunks, best first."""
+        term_ids = sorted({self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary})
+        if not term_ids or not self.chunks:
+            return []
+        scores = np.asarray(self.weights[term_ids].sum(axis=0)).ravel()
+        if module:
+            scores = np.where(self.modules == module, scores * MODULE_BOOST, scores)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunks[i]) for i in top if scores[i] > 0]
+
+    def stats(self):
+        return {
+            'chunks': len(self.chunks),
+            'terms': len(self.vocabulary),
+            'nonzeros': int(self.weights.nnz),
+            'bytes': int(self.weights.data.nbytes + self.weights.indices.nbytes + self.weights.indptr.nbytes)
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+build_seconds = None
+
+
+def get_index(module_knowledge):
+    """Return the shared index, building it on first use (or during warm-up)."""
+    global _index, build_seconds
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                started = time.perf_counter()
+                _index = RetrievalIndex(collect_chunks(module_knowledge))
+                build_seconds = time.perf_counter() - started
+    return _index
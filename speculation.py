@@ -0,0 +1,197 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SPECULATION_ENABLED = os.environ.get('SPECULATION_ENABLED', '1') != '0'
+SPECULATION_QUEUE_SIZE = int(os.environ.get('SPECULATION_QUEUE_SIZE', 32))
+SPECULATION_WORKERS = int(os.environ.get('SPECULATION_WORKERS', 1))
+# Jobs still queued after this many seconds are dropped; the student has
+# moved on or already clicked
+SPECULATION_MAX_AGE = float(os.environ.get('SPECULATION_MAX_AGE', 30))
+
+
+class Job:
+    __slots__ = ('key', 'owner', 'generation', 'args', 'queued_at')
+
+    def __init__(self, key, owner, generation, args):
+        self.key = key
+        self.owner = owner
+        self.generation = generation
+        self.args = args
+        self.queued_at = time.monotonic()
+
+
+class Speculator:
+    """
+    Background precomputation of answers the user is likely to ask for next.
+
+    `generate(*args)` produces and stores an answer; `is_cached(key)` tells
+    whether it is already stored; `has_capacity()` says whether a call may
+    be made without taking capacity from real requests. Jobs go through a
+    bounded queue served by a few daemon threads (started on first use, so
+    after the gunicorn fork). A new submit from the same owner cancels that
+    owner's queued jobs. Real requests can wait() on a job already in flight
+    for their key instead of making the same call again; a job still queued
+    is claimed by the request and skipped.
+    """
+
+    def __init__(self, generate, is_cached, has_capacity=lambda: True,
+                 queue_size=SPECULATION_QUEUE_SIZE, workers=SPECULATION_WORKERS, max_age=SPECULATION_MAX_AGE):
+        self.generate = generate
+        self.is_cached = is_cached
+        self.has_capacity = has_capacity
+        self.workers = workers
+        self.max_age = max_age
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._owners = {}        # owner -> [latest generation, jobs queued, submits in progress]
+        self._pending = set()    # keys queued or running
+        self._inflight = {}      # key -> Event set when the job finishes
+        self._claimed = set()    # queued keys a real request is answering itself
+        self.counts = {'queued': 0, 'generated': 0, 'used': 0, 'cached': 0, 'duplicate': 0, 'dropped': 0,
+                       'cancelled': 0, 'expired': 0, 'busy': 0, 'claimed': 0, 'failed': 0}
+
+    def submit(self, owner, jobs):
+        """
+        Queue (key, args) jobs for one owner (a session or client).
+
+        Earlier queued jobs from the same owner are cancelled. Returns the
+        number of jobs queued.
+        """
+        self._start()
+        with self._lock:
+            # The entry outlives its jobs while this submit is running, so a
+            # worker finishing the owner's last job cannot reset the generation
+            state = self._owners.setdefault(owner, [0, 0, 0])
+            state[0] += 1
+            state[2] += 1
+            generation = state[0]
+        queued = 0
+        for key, args in jobs:
+            if self.is_cached(key):
+                self._count('cached')
+                continue
+            with self._lock:
+                if key in self._pending:
+                    self._count('duplicate', locked=True)
+                    continue
+                self._pending.add(key)
+                state[1] += 1
+            try:
+                self._queue.put_nowait(Job(key, owner, generation, args))
+            except queue.Full:
+                with self._lock:
+                    self._pending.discard(key)
+                    self._release_owner(owner)
+                self._count('dropped')
+                continue
+            self._count('queued')
+            queued += 1
+        with self._lock:
+            state[2] -= 1
+            self._forget_if_idle(owner)
+        return queued
+
+    def cancel(self, owner):
+        """Cancel the owner's queued jobs (running ones finish)."""
+        with self._lock:
+            if owner in self._owners:
+                self._owners[owner][0] += 1
+
+    def record_used(self):
+        """Count a request served from a speculatively generated answer."""
+        self._count('used')
+
+    def wait(self, key, timeout):
+        """
+        If a job for key is running, wait for it; returns True if one was.
+
+        A job for key that is still queued is claimed instead: the worker
+        skips it, and the caller (getting False) makes the call itself.
+        """
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is None and key in self._pending:
+                self._claimed.add(key)
+        if event is None:
+            return False
+        event.wait(timeout)
+        return True
+
+    def _start(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'speculation-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            except Exception:
+                logger.exception('Speculative job failed')
+                self._count('failed')
+            finally:
+                with self._lock:
+                    self._pending.discard(job.key)
+                    self._claimed.discard(job.key)
+                    self._release_owner(job.owner)
+                    event = self._inflight.pop(job.key, None)
+                if event is not None:
+                    event.set()
+
+    def _process(self, job):
+        with self._lock:
+            if self._owners[job.owner][0] != job.generation:
+                self.counts['cancelled'] += 1
+                return
+        if time.monotonic() - job.queued_at > self.max_age:
+            self._count('expired')
+            return
+        if self.is_cached(job.key):
+            self._count('cached')
+            return
+        if not self.has_capacity():
+            self._count('busy')
+            return
+        with self._lock:
+            # Checked together with going in flight, so a wait() either
+            # claims the job or finds it running
+            if job.key in self._claimed:
+                self.counts['claimed'] += 1
+                return
+            self._inflight[job.key] = threading.Event()
+        if self.generate(*job.args):
+            self._count('generated')
+        else:
+            self._count('failed')
+
+    def _release_owner(self, owner):
+        # Owners are only remembered while they have jobs queued
+        self._owners[owner][1] -= 1
+        self._forget_if_idle(owner)
+
+    def _forget_if_idle(self, owner):
+        state = self._owners[owner]
+        if state[1] == 0 and state[2] == 0:
+            del self._owners[owner]
+
+    def _count(self, outcome, locked=False):
+        if locked:
+            self.counts[outcome] += 1
+            return
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, queue_depth=self._queue.qsize(), inflight=len(self._inflight))
@@ -6,6 +6,8 @@ class AIChatbot {
         this.currentModule = this.detectCurrentModule();
         this.activityLog = [];
         this.sessionId = this.getOrCreateSessionId();
+        this.streamController = null;
+        this.lastSentContext = null;
         this.init();
         
         // Listen for page navigation to update module context
@@ -270,6 +272,7 @@ class AIChatbot {
 
     newChatSession() {
         if (confirm('Start a new chat session? Current conversation will be saved.')) {
+            if (this.streamController) this.streamController.abort();
             // Save current session with timestamp
             const timestamp = new Date().toISOString();
             const sessionBackup = {
@@ -284,9 +287,15 @@ class AIChatbot {
             archivedSessions.push(sessionBackup);
             localStorage.setItem('archivedSessions', JSON.stringify(archivedSessions));
             
-            // Clear current session
+            // Clear current session (the server drops its copy too)
+            fetch('/api/chat/clear', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ session_id: this.sessionId })
+            }).catch(() => {});
             this.conversationHistory = [];
             this.chatHistory = [];
+            this.lastSentContext = null;
             this.sessionId = 'session_' + Date.now() + '_' + Math.random().toString(36).substr(2, 9);
             localStorage.setItem('chatSessionId', this.sessionId);
             localStorage.removeItem('chatHistory');
@@ -323,46 +332,132 @@ class AIChatbot {
         // Show typing indicator
         this.showTypingIndicator();
 
-        // Get enhanced context
-        const context = this.getEnhancedContext();
+        // The server keeps the conversation for this session; only send the
+        // page context when it changed since the last message
+        const payload = {
+            message: message,
+            module: this.currentModule,
+            session_id: this.sessionId
+        };
+        const { timestamp, ...context } = this.getEnhancedContext();
+        const contextKey = JSON.stringify(context);
+        if (contextKey !== this.lastSentContext) payload.context = context;
+
+        // A newer question supersedes an answer still streaming in
+        if (this.streamController) this.streamController.abort();
+        const controller = new AbortController();
+        this.streamController = controller;
+
+        let contentDiv = null;
+        let answer = '';
 
         try {
-            const response = await fetch('/api/chat', {
+            const response = await fetch('/api/chat/stream', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    message: message,
-                    module: this.currentModule,
-                    context: context,
-                    history: this.conversationHistory
-                })
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
+                },
+                body: JSON.stringify(payload),
+                signal: controller.signal
+            });
+            if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+            let done = null;
+            await this.readEventStream(response.body, (event, data) => {
+                if (event === 'token') {
+                    if (!contentDiv) {
+                        this.removeTypingIndicator();
+                        contentDiv = this.startAssistantMessage();
+                    }
+                    answer += data.content;
+                    contentDiv.innerHTML = this.renderLatex(answer);
+                    this.scrollToBottom();
+                } else if (event === 'done') {
+                    done = data;
+                } else if (event === 'error') {
+                    throw new Error(data.error);
+                }
             });
-
-            const data = await response.json();
             this.removeTypingIndicator();
 
-            if (data.success) {
-                this.addMessage(data.response, 'assistant');
-                
+            if (done && done.success) {
+                if (!contentDiv) contentDiv = this.startAssistantMessage();
+                answer = done.response;
+                contentDiv.innerHTML = this.renderLatex(answer);
+                this.chatHistory.push({ role: 'assistant', content: answer, timestamp: Date.now() });
+
+                // The server only keeps the context once the turn is saved; a
+                // new (or expired) session without it needs it sent again
+                this.lastSentContext = (done.new_session && !payload.context) ? null : contextKey;
+
                 // Update conversation history
                 this.conversationHistory.push(
                     { role: 'user', content: message },
-                    { role: 'assistant', content: data.response }
+                    { role: 'assistant', content: answer }
                 );
-                
+
                 // Update suggestions dynamically
-                this.updateDynamicSuggestions(message, data.response);
+                this.updateDynamicSuggestions(message, answer);
             } else {
-                this.addMessage('Sorry, I encountered an error. Please try again.', 'assistant');
+                throw new Error('Stream ended early');
             }
         } catch (error) {
             this.removeTypingIndicator();
-            this.addMessage('Connection error. Please check your internet.', 'assistant');
+            if (error.name === 'AbortError') return;
+            if (contentDiv) contentDiv.closest('.chat-message').remove();
+            this.addMessage('Sorry, I encountered an error. Please try again.', 'assistant');
+        } finally {
+            if (this.streamController === controller) this.streamController = null;
         }
 
         this.saveChatHistory();
     }
 
+    async readEventStream(body, onEvent) {
+        // EventSource cannot POST, so parse the text/event-stream body by hand
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    let event = 'message';
+                    const data = [];
+                    for (const line of block.split('\n')) {
+                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+                    }
+                    if (data.length) onEvent(event, JSON.parse(data.join('\n')));
+                }
+            }
+        } finally {
+            reader.releaseLock();
+        }
+    }
+
+    startAssistantMessage() {
+        const messagesContainer = document.getElementById('chat-messages');
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'chat-message assistant';
+        messageDiv.innerHTML = `
+            <div class="message-avatar">AI</div>
+            <div class="message-content"></div>`;
+        messagesContainer.appendChild(messageDiv);
+        return messageDiv.querySelector('.message-content');
+    }
+
+    scrollToBottom() {
+        const messagesContainer = document.getElementById('chat-messages');
+        messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    }
+
     getEnhancedContext() {
         const context = {
             module: this.currentModule,
@@ -448,6 +543,8 @@ class AIChatbot {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ 
                     module: this.currentModule,
+                    session_id: this.sessionId,
+                    context: (({ timestamp, ...context }) => context)(this.getEnhancedContext()),
                     recent_messages: recentMessages,
                     last_user_message: lastUserMessage?.content || '',
                     has_conversation: this.conversationHistory.length > 0
@@ -0,0 +1,94 @@
+// Decoder for the compact ndarray response encodings (see array_codec.py).
+// Usage:
+//   fetch(url, { method: 'POST', headers: { 'Accept': NDArray.BINARY, ... }, body })
+//       .then(NDArray.decodeResponse)
+// Arrays come back as typed arrays with a `shape` property; use
+// NDArray.toNested() where a library (e.g. Plotly heatmaps) wants nested lists.
+
+const NDArray = (() => {
+    const JSON_TYPE = 'application/vnd.mathai.ndarray+json';
+    const BINARY = 'application/vnd.mathai.ndarray';
+
+    const VIEWS = {
+        float64: Float64Array,
+        float32: Float32Array,
+        int32: Int32Array,
+        uint8: Uint8Array
+    };
+
+    function makeView(buffer, meta, offset) {
+        const View = VIEWS[meta.dtype];
+        const length = meta.shape.reduce((a, b) => a * b, 1);
+        const view = new View(buffer, offset, length);
+        view.shape = meta.shape;
+        return view;
+    }
+
+    function base64ToBuffer(data) {
+        const binary = atob(data);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        return bytes.buffer;
+    }
+
+    // Replace {"__ndarray__": ...} markers using the given resolver
+    function revive(value, resolve) {
+        if (Array.isArray(value)) {
+            return value.map(v => revive(v, resolve));
+        }
+        if (value && typeof value === 'object') {
+            if ('__ndarray__' in value) {
+                return resolve(value.__ndarray__);
+            }
+            const out = {};
+            for (const key of Object.keys(value)) {
+                out[key] = revive(value[key], resolve);
+            }
+            return out;
+        }
+        return value;
+    }
+
+    function decodeJSON(payload) {
+        return revive(payload, meta => makeView(base64ToBuffer(meta.data), meta, 0));
+    }
+
+    function decodeBinary(buffer) {
+        const header = new DataView(buffer, 0, 8);
+        const headerLength = header.getUint32(4, true);
+        const text = new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength));
+        const { payload, arrays } = JSON.parse(text);
+        return revive(payload, index => makeView(buffer, arrays[index], arrays[index].offset));
+    }
+
+    function decodeResponse(res) {
+        const type = (res.headers.get('Content-Type') || '').split(';')[0].trim();
+        if (type === BINARY) {
+            return res.arrayBuffer().then(decodeBinary);
+        }
+        if (type === JSON_TYPE) {
+            return res.json().then(decodeJSON);
+        }
+        return res.json();
+    }
+
+    // Convert a typed array with a shape back into nested JS arrays
+    function toNested(view) {
+        if (!view.shape || view.shape.length <= 1) {
+            return Array.from(view);
+        }
+        const [rows, ...rest] = view.shape;
+        const stride = rest.reduce((a, b) => a * b, 1);
+        const out = [];
+        for (let i = 0; i < rows; i++) {
+            const sub = view.subarray(i * stride, (i + 1) * stride);
+            sub.shape = rest;
+            out.push(toNested(sub));
+        }
+        return out;
+    }
+
+    return { JSON: JSON_TYPE, BINARY, decodeResponse, decodeJSON, decodeBinary, toNested };
+})();
@@ -45,10 +45,19 @@ function createSystemInputs() {
     if (size === 2) {
         document.getElementById('a_0_0').value = 1; document.getElementById('a_0_1').value = 1; document.getElementById('b_0').value = 5;
         document.getElementById('a_1_0').value = 1; document.getElementById('a_1_1').value = -1; document.getElementById('b_1').value = 1;
-    } else {
+    } else if (size === 3) {
         document.getElementById('a_0_0').value = 1; document.getElementById('a_0_1').value = 2; document.getElementById('a_0_2').value = 3; document.getElementById('b_0').value = 10;
         document.getElementById('a_1_0').value = 2; document.getElementById('a_1_1').value = -1; document.getElementById('a_1_2').value = 1; document.getElementById('b_1').value = 5;
         document.getElementById('a_2_0').value = 3; document.getElementById('a_2_1').value = 1; document.getElementById('a_2_2').value = -1; document.getElementById('b_2').value = 2;
+    } else {
+        // Random integers with a dominant diagonal, so the system is solvable
+        for (let i = 0; i < size; i++) {
+            for (let j = 0; j < size; j++) {
+                const value = Math.floor(Math.random() * 19) - 9;
+                document.getElementById(`a_${i}_${j}`).value = i === j ? 10 * size : value;
+            }
+            document.getElementById(`b_${i}`).value = Math.floor(Math.random() * 41) - 20;
+        }
     }
 }
 
@@ -76,24 +85,55 @@ function solveSystem() {
             if (data.error) {
                 alert(data.error);
             } else {
-                renderSteps(data.steps);
+                stepSystem = { A: A, b: b, total: data.steps.length, loaded: 0 };
+                document.getElementById('steps-container').innerHTML = '';
+                loadSteps();
                 renderSystemPlot(data, size);
             }
         });
 }
 
+// --- Step pages ---
+// /api/solve_system returns the elimination as compact row operations; the
+// matrices after each step are fetched a page at a time.
+
+const STEP_PAGE = 10;
+
+let stepSystem = null;
+
+function loadSteps() {
+    const system = stepSystem;
+    fetch('/api/solve_system/steps', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ A: system.A, b: system.b, offset: system.loaded, limit: STEP_PAGE })
+    })
+        .then(res => res.json())
+        .then(data => {
+            // Ignore pages of a system that has since been replaced
+            if (data.error || system !== stepSystem) {
+                return;
+            }
+            system.loaded += data.steps.length;
+            renderSteps(data.steps);
+        });
+}
+
 function renderSteps(steps) {
     const container = document.getElementById('steps-container');
-    container.innerHTML = '';
+    const more = document.getElementById('moreSteps');
+    if (more) {
+        more.remove();
+    }
 
-    steps.forEach((step, idx) => {
+    steps.forEach(step => {
         const div = document.createElement('div');
         div.style.background = 'rgba(0,0,0,0.3)';
         div.style.padding = '0.8rem';
         div.style.borderRadius = '8px';
         div.style.borderLeft = '3px solid var(--primary)';
 
-        div.innerHTML = `<strong>Step ${idx}: ${step.description}</strong>`;
+        div.innerHTML = `<strong>Step ${step.index}: ${step.description}</strong>`;
 
         // Simple matrix print
         const matDiv = document.createElement('div');
@@ -107,6 +147,15 @@ function renderSteps(steps) {
         div.appendChild(matDiv);
         container.appendChild(div);
     });
+
+    if (stepSystem.loaded < stepSystem.total) {
+        const button = document.createElement('button');
+        button.id = 'moreSteps';
+        button.className = 'btn-primary';
+        button.textContent = `Load more steps (${stepSystem.loaded} of ${stepSystem.total})`;
+        button.onclick = loadSteps;
+        container.appendChild(button);
+    }
 }
 
 function renderSystemPlot(data, size) {
@@ -234,6 +283,23 @@ function renderSystemPlot(data, size) {
             font: { color: 'white' }
         };
         Plotly.newPlot('systemPlot', traces, layout);
+    } else {
+        // No geometry to draw beyond 3D; show the solution components
+        traces.push({
+            x: data.solution.map((_, i) => `x${i + 1}`),
+            y: data.solution,
+            type: 'bar',
+            marker: { color: '#facc15' },
+            name: 'Solution'
+        });
+
+        const layout = {
+            title: 'Solution',
+            paper_bgcolor: 'rgba(0,0,0,0)',
+            plot_bgcolor: 'rgba(0,0,0,0)',
+            font: { color: 'white' }
+        };
+        Plotly.newPlot('systemPlot', traces, layout);
     }
 }
 
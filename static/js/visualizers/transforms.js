@@ -26,11 +26,15 @@ function setPreset(type) {
     updateTransform();
 }
 
-function updateTransform() {
-    const matrix = [
+function currentMatrix() {
+    return [
         [parseFloat(document.getElementById('t00').value), parseFloat(document.getElementById('t01').value)],
         [parseFloat(document.getElementById('t10').value), parseFloat(document.getElementById('t11').value)]
     ];
+}
+
+function updateTransform() {
+    const matrix = currentMatrix();
     const shape = document.getElementById('shapeSelect').value;
 
     fetch('/api/transform', {
@@ -109,3 +113,86 @@ function renderTransformPlot(data) {
 document.addEventListener('DOMContentLoaded', () => {
     updateTransform();
 });
+
+// --- Animation ---
+// The whole animation comes back from /api/transform/pipeline as one
+// frames x 2 x N array and is played locally, without a request per frame.
+
+const ANIMATION_FRAMES = 60;
+const ANIMATION_MS_PER_STEP = 1200;
+
+let pipeline = [];
+let animationId = null;
+
+function renderPipeline() {
+    const list = document.getElementById('pipelineSteps');
+    list.innerHTML = '';
+    pipeline.forEach(matrix => {
+        const item = document.createElement('li');
+        item.textContent = `[${matrix[0].join(', ')}; ${matrix[1].join(', ')}]`;
+        list.appendChild(item);
+    });
+}
+
+function addPipelineStep() {
+    pipeline.push(currentMatrix());
+    renderPipeline();
+}
+
+function clearPipeline() {
+    pipeline = [];
+    renderPipeline();
+}
+
+function animateTransform() {
+    // With no steps added, animate from the identity to the current matrix
+    const steps = pipeline.length ? pipeline : [currentMatrix()];
+    const shape = document.getElementById('shapeSelect').value;
+
+    fetch('/api/transform/pipeline', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': `${NDArray.BINARY}; dtype=float32`
+        },
+        body: JSON.stringify({
+            transforms: steps,
+            shape: shape,
+            frames: ANIMATION_FRAMES * steps.length,
+            mode: 'sequential'
+        })
+    })
+        .then(NDArray.decodeResponse)
+        .then(data => {
+            if (!data.error) {
+                playFrames(data, steps.length * ANIMATION_MS_PER_STEP);
+            }
+        });
+}
+
+function playFrames(data, duration) {
+    if (animationId !== null) {
+        cancelAnimationFrame(animationId);
+    }
+    const frames = data.frames;
+    const [count, , n] = frames.shape;
+    const frameAt = k => ({
+        x: frames.subarray(2 * k * n, (2 * k + 1) * n),
+        y: frames.subarray((2 * k + 1) * n, (2 * k + 2) * n)
+    });
+
+    const first = frameAt(0);
+    renderTransformPlot({
+        original: NDArray.toNested(data.original),
+        transformed: [Array.from(first.x), Array.from(first.y)]
+    });
+
+    const start = performance.now();
+    const step = now => {
+        const k = Math.min(count - 1, Math.floor((now - start) / duration * (count - 1)));
+        const frame = frameAt(k);
+        Plotly.restyle('transformPlot', { x: [Array.from(frame.x)], y: [Array.from(frame.y)] }, [1]);
+        animationId = k < count - 1 ? requestAnimationFrame(step) : null;
+    };
+    animationId = requestAnimationFrame(step);
+}
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import array_store
+from admission import MAX_CPU_SECONDS, AdmissionError, controller, estimate_array_operation
+
+
+def test_blocked_add_of_20k_rows_is_admitted(tmp_path, monkeypatch):
+    monkeypatch.setattr(array_store, 'ARRAY_STORE_DIR', str(tmp_path))
+    a_id, b_id = 'a' * 32, 'b' * 32
+    for array_id in (a_id, b_id):
+        # Sparse on disk: only the header is actually written
+        np.lib.format.open_memmap(tmp_path / f'{array_id}.npy', mode='w+', dtype=np.float64, shape=(20000, 20000))
+
+    cost = estimate_array_operation({'operation': 'add', 'a': a_id, 'b': b_id})
+
+    assert cost.cpu_seconds > MAX_CPU_SECONDS
+    controller.check(cost, 'api_array_operation')
+    with pytest.raises(AdmissionError):
+        controller.check(cost, 'api_calculate_matrices')
@@ -0,0 +1,15 @@
+from math_engine.expression_logic import evaluate_expression
+
+SINGULAR = [[1.0, 2.0], [2.0, 4.0]]
+
+
+def test_logdet_of_zeroth_power_of_singular_matrix_is_zero():
+    result = evaluate_expression('logdet(A^0)', {'A': SINGULAR})
+
+    assert result['result']['value'] == 0.0
+
+
+def test_det_of_zeroth_power_of_singular_matrix_is_one():
+    result = evaluate_expression('det(A^0)', {'A': SINGULAR})
+
+    assert result['result']['value'] == 1.0
@@ -0,0 +1,128 @@
+import logging
+import os
+import threading
+import time
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '0') == '1'
+# Rounds over the request list; the second round mostly exercises the caches
+WARMUP_ROUNDS = int(os.environ.get('WARMUP_ROUNDS', 1))
+
+# Representative requests for every /api/* route, using the defaults the
+# templates send. A body may be a function of the earlier responses (by
+# path) so training routes get the same generated data the UI would post.
+WARMUP_REQUESTS = [
+    ('POST', '/api/calculate_vectors', {'v1': [1, 2, 3], 'v2': [3, 1, 0]}),
+    ('POST', '/api/calculate_matrices', {'operation': 'multiply', 'm1': [[1, 2], [3, 4]], 'm2': [[5, 6], [7, 8]]}),
+    ('POST', '/api/calculate_matrices', {'operation': 'inverse', 'm1': [[1, 2], [3, 4]], 'm2': None}),
+    ('POST', '/api/transform', {'matrix': [[1, 0], [0, 1]], 'shape': 'square'}),
+    ('POST', '/api/solve_system', {'A': [[2, 1], [1, 3]], 'b': [3, 5]}),
+    ('POST', '/api/calculate_eigen', {'matrix': [[2, 1], [1, 2]]}),
+    ('POST', '/api/gradient_descent', {'start_x': 0, 'learning_rate': 0.1, 'steps': 50, 'function_type': 'quadratic'}),
+    ('POST', '/api/neural_forward', {'inputs': [1, 1], 'activation': 'relu'}),
+    ('GET', '/api/neural_structure', None),
+    ('POST', '/api/pca_analyze', {'data_type': 'ellipse', 'n_points': 100, 'n_components': 1}),
+    ('POST', '/api/generate_classification', {'n_samples': 100, 'pattern': 'linear', 'separation': 2.0, 'noise': 0.5}),
+    ('POST', '/api/train_classifier', lambda previous: {
+        'X': previous['/api/generate_classification']['X'],
+        'y': previous['/api/generate_classification']['y'],
+        'classifier_type': 'logistic'
+    }),
+    ('POST', '/api/apply_filter', {'image_type': 'checkerboard', 'kernel_type': 'edge_detect'}),
+    ('GET', '/api/get_kernels', None),
+    ('POST', '/api/generate_dataset', {'dataset_type': 'linear', 'n_samples': 100, 'noise': 10}),
+    ('POST', '/api/train_model', lambda previous: {
+        'X': previous['/api/generate_dataset']['X'],
+        'y': previous['/api/generate_dataset']['y']
+    }),
+    ('POST', '/api/train_iterative', lambda previous: {
+        'X': previous['/api/generate_dataset']['X'],
+        'y': previous['/api/generate_dataset']['y'],
+        'n_iterations': 50
+    }),
+    # Builds the chatbot's docs retrieval index
+    ('GET', '/api/chat/index/stats', None),
+    ('POST', '/api/batch', {'operations': [
+        {'op': 'vector_properties', 'v1': [1, 2, 3], 'v2': [3, 1, 0]},
+        {'op': 'matrix', 'operation': 'determinant', 'm1': [[1, 2], [3, 4]]},
+        {'op': 'eigen', 'matrix': [[2, 1], [1, 2]]},
+    ]}),
+]
+
+# Marker in the WSGI environ so metrics can leave warm-up traffic out
+WARMUP_ENVIRON_KEY = 'mathai.warmup'
+
+
+class WarmupState:
+    """Readiness of this worker process."""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self.results = []  # (method, path, status, seconds)
+
+    def as_dict(self):
+        status = 'ready' if self.ready.is_set() else ('warming' if self.started_at else 'starting')
+        info = {'status': status}
+        if self.started_at and self.finished_at:
+            info['warmup_seconds'] = round(self.finished_at - self.started_at, 3)
+        if self.results:
+            info['failed'] = [f'{method} {path}' for method, path, code, _ in self.results if code >= 400]
+        return info
+
+
+state = WarmupState()
+
+
+def run_warmup(app, rounds=WARMUP_ROUNDS):
+    """
+    Send every warm-up request through the app, then mark the worker ready.
+
+    Requests go through the full Flask stack (admission, caches, executor),
+    so lazy imports, BLAS initialisation, pool start-up and the response
+    cache for the default parameters are all paid here. Failures are logged
+    and do not block readiness.
+    """
+    state.started_at = time.perf_counter()
+    client = app.test_client()
+    for _ in range(max(1, rounds)):
+        previous = {}
+        for method, path, body in WARMUP_REQUESTS:
+            started = time.perf_counter()
+            try:
+                if callable(body):
+                    body = body(previous)
+                response = client.open(path, method=method, json=body,
+                                       environ_overrides={WARMUP_ENVIRON_KEY: True})
+                status = response.status_code
+                if status == 200 and response.is_json:
+                    previous[path] = response.get_json()
+            except Exception:
+                logger.exception('Warm-up request %s %s failed', method, path)
+                status = 500
+            state.results.append((method, path, status, time.perf_counter() - started))
+    state.finished_at = time.perf_counter()
+    state.ready.set()
+    logger.info('Worker %d warmed up in %.2fs', os.getpid(), state.finished_at - state.started_at)
+
+
+def start_warmup(app):
+    """Run the warm-up in a background thread so /health answers meanwhile."""
+    thread = threading.Thread(target=run_warmup, args=(app,), name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_warmup(app):
+    """Register the /ready endpoint"""
+
+    if not WARMUP_ENABLED:
+        state.ready.set()
+
+    @app.route('/ready')
+    def ready():
+        return jsonify(state.as_dict()), 200 if state.ready.is_set() else 503